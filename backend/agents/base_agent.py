@@ -10,13 +10,29 @@ All specialized agents inherit from this base class which provides:
 """
 
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 import json
 import time
 
+from sqlalchemy.orm import Session
+
+from core.config import settings
 from database.database import SessionLocal
-from database.models import Task, TaskStatus, AgentLog
+from database.models import Task, TaskStatus
+from services.agent_log import agent_log_sink
+from tasks.task_events import task_events
+from tasks.task_queue import record_failure, task_queue
+from tasks.workflow import WorkflowStep, workflow_engine
+
+# Session of the task being processed in the current asyncio task. Agents
+# are shared by all pool workers, so the session can't live on the agent.
+_task_session: ContextVar[Optional[Session]] = ContextVar("agent_task_session", default=None)
+
+# Log entries held for the task's final commit (set while execute() runs in
+# unit-of-work mode)
+_pending_logs: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("agent_pending_logs", default=None)
 
 
 class BaseAgent(ABC):
@@ -30,7 +46,6 @@ class BaseAgent(ABC):
 
     def __init__(self, name: str):
         self.name = name
-        self.db = None
 
     @property
     @abstractmethod
@@ -70,22 +85,42 @@ class BaseAgent(ABC):
         """
         pass
 
+    @property
+    def db(self) -> Optional[Session]:
+        """The current task's session, if one is open"""
+        return _task_session.get()
+
     def get_db(self):
-        """Get database session"""
-        if not self.db:
-            self.db = SessionLocal()
-        return self.db
+        """Get database session (one per running task, see _task_session)"""
+        db = _task_session.get()
+        if db is None:
+            db = SessionLocal()
+            _task_session.set(db)
+        return db
 
     def close_db(self):
         """Close database session"""
-        if self.db:
-            self.db.close()
-            self.db = None
+        db = _task_session.get()
+        if db is not None:
+            db.close()
+            _task_session.set(None)
 
     async def execute(self, task: Task) -> Dict[str, Any]:
         """
         Execute the task with proper error handling and logging
 
+        With AGENT_UNIT_OF_WORK the task's status, results and log entries
+        are committed together once processing ends (one commit per task,
+        besides the claim). The task stays detached while the agent runs,
+        so its row isn't locked for the duration and the lease heartbeat
+        isn't blocked; changes made to it meanwhile are tracked and written
+        by the final commit.
+
+        The final write only happens while the worker still holds the
+        task's lease (same owner, still IN_PROGRESS); if it was recovered by
+        another worker meanwhile, the outcome is dropped and nothing is
+        published.
+
         Args:
             task: Task to execute
 
@@ -93,14 +128,22 @@ class BaseAgent(ABC):
             Dictionary with execution results
         """
         start_time = time.time()
+        # Read before processing: the claim's lease, checked before the final commit
+        task_id, lease_owner = task.id, task.lease_owner
         db = self.get_db()
+        unit_of_work = settings.AGENT_UNIT_OF_WORK
+        pending_logs = _pending_logs.set([] if unit_of_work else None)
 
         try:
-            # Update task status to in_progress
-            task.status = TaskStatus.IN_PROGRESS
-            task.started_at = datetime.now()
+            # Claimed tasks are already in progress
+            task.started_at = task.started_at or datetime.now()
             task.assigned_agent = self.agent_type
-            db.commit()
+            if not unit_of_work:
+                # The task was loaded (or claimed) in another session; attach
+                # it here so the status and results below are persisted
+                db.add(task)
+                task.status = TaskStatus.IN_PROGRESS
+                db.commit()
 
             # Log agent action
             self.log_action(task.id, 'started', {'message': 'Task processing started'})
@@ -110,36 +153,63 @@ class BaseAgent(ABC):
             # Process the task
             result = await self.process(task)
 
+            db.add(task)
+
             # Update task with results
             task.output_data = json.dumps(result.get('data', {}))
 
-            if result.get('success'):
+            if result.get('success') and result.get('waiting'):
+                # Started a workflow: resumed once its steps complete
+                task.status = TaskStatus.WAITING_INPUT
+                self.log_action(task.id, 'waiting', result)
+                print(f"⏸️ [{self.agent_type}] Task #{task.id} waiting on its workflow steps")
+            elif result.get('success'):
                 task.status = TaskStatus.COMPLETED
                 task.completed_at = datetime.now()
                 self.log_action(task.id, 'completed', result)
                 print(f"✅ [{self.agent_type}] Task #{task.id} completed successfully")
             else:
-                task.status = TaskStatus.FAILED
-                task.error_message = result.get('error', 'Unknown error')
+                # Retried after a backoff, or dead-lettered when out of retries
+                record_failure(task, result.get('error', 'Unknown error'))
                 self.log_action(task.id, 'failed', result)
-                print(f"❌ [{self.agent_type}] Task #{task.id} failed: {task.error_message}")
-
-            db.commit()
+                print(f"❌ [{self.agent_type}] Task #{task.id} failed ({task.status.value}): {task.error_message}")
 
             # Calculate duration
             duration_ms = int((time.time() - start_time) * 1000)
             self.log_action(task.id, 'duration', {'duration_ms': duration_ms})
 
+            if self._lease_lost(db, task_id, lease_owner):
+                return self._abandon(db, task_id)
+
+            workflow_changes = workflow_engine.on_task_finished(db, task)
+            self._add_pending_logs(db)
+            task_id, outcome = task.id, (task.status, task.task_type, task.error_message)
+            db.commit()
+            task_events.publish(task_id, outcome[0], outcome[1], error_message=outcome[2], agent=self.agent_type)
+            self._announce(workflow_changes)
+            if outcome[0] == TaskStatus.WAITING_INPUT:
+                task_queue.notify()  # Its first workflow steps were just queued
+
             return result
 
         except Exception as e:
             # Handle unexpected errors
-            task.status = TaskStatus.FAILED
-            task.error_message = str(e)
-            db.commit()
+            db.rollback()
+            if self._lease_lost(db, task_id, lease_owner):
+                return self._abandon(db, task_id)
+
+            db.add(task)
+            record_failure(task, str(e))
 
             self.log_action(task.id, 'error', {'error': str(e)})
-            print(f"❌ [{self.agent_type}] Task #{task.id} error: {e}")
+            workflow_changes = workflow_engine.on_task_finished(db, task)
+            self._add_pending_logs(db)
+            task_id, outcome = task.id, (task.status, task.task_type, task.error_message)
+            db.commit()
+            task_events.publish(task_id, outcome[0], outcome[1], error_message=outcome[2], agent=self.agent_type)
+            self._announce(workflow_changes)
+
+            print(f"❌ [{self.agent_type}] Task #{task_id} error: {e}")
 
             import traceback
             traceback.print_exc()
@@ -150,33 +220,89 @@ class BaseAgent(ABC):
                 'response': f"An error occurred while processing your request: {str(e)}"
             }
         finally:
+            _pending_logs.reset(pending_logs)
             self.close_db()
 
+    def _lease_lost(self, db: Session, task_id: int, lease_owner: Optional[str]) -> bool:
+        """
+        Whether the task's lease was lost while it was processed
+
+        Locks the row (on PostgreSQL) so the lease can't be recovered
+        between this check and the final commit. Tasks run outside the queue
+        carry no lease and are never considered lost.
+        """
+        if lease_owner is None:
+            return False
+        held = db.query(Task.id).filter(
+            Task.id == task_id,
+            Task.lease_owner == lease_owner,
+            Task.status == TaskStatus.IN_PROGRESS
+        ).with_for_update().first()
+        return held is None
+
+    def _abandon(self, db: Session, task_id: int) -> Dict[str, Any]:
+        """Drop the outcome of a task whose lease was lost (its new owner will write one)"""
+        db.rollback()
+        held = _pending_logs.get()
+        if held:
+            held.clear()
+        print(f"⚠️ [{self.agent_type}] Dropped result of task #{task_id}: its lease was lost")
+        return {
+            'success': False,
+            'error': 'Task lease lost',
+            'response': 'The task was taken over by another worker'
+        }
+
     def log_action(self, task_id: int, action: str, details: Dict[str, Any]):
         """
         Log an agent action
 
+        Entries are written in batches by the agent log sink (sampled per
+        AGENT_LOG_SAMPLE_RATES), not in the task's transaction. In
+        unit-of-work mode entries made while a task runs are held until
+        execute() commits them with the task instead.
+
         Args:
             task_id: Task ID
             action: Action performed
             details: Additional details
         """
         try:
-            db = self.get_db()
-
-            log_entry = AgentLog(
+            entry = dict(
                 task_id=task_id,
                 agent_name=self.agent_type,
                 action=action,
-                details=json.dumps(details),
-                duration_ms=details.get('duration_ms')
+                details=details,
+                duration_ms=details.get('duration_ms'),
+                created_at=datetime.now()
             )
-
-            db.add(log_entry)
-            db.commit()
+            held = _pending_logs.get()
+            if held is not None:
+                held.append(entry)
+            else:
+                agent_log_sink.log(**entry)
         except Exception as e:
             print(f"Failed to log action: {e}")
 
+    def _add_pending_logs(self, db: Session):
+        """Add the held log entries to the task's transaction (unit-of-work mode)"""
+        held = _pending_logs.get()
+        if not held:
+            return
+        for entry in held:
+            try:
+                agent_log_sink.log(**entry, db=db)
+            except Exception as e:
+                print(f"Failed to log action: {e}")
+        held.clear()
+
+    def _announce(self, changes: List[Tuple[int, TaskStatus]]):
+        """Publish committed workflow changes and wake workers for queued steps"""
+        for task_id, status in changes:
+            task_events.publish(task_id, status)
+        if any(status == TaskStatus.PENDING for _, status in changes):
+            task_queue.notify()
+
     def parse_input_data(self, task: Task) -> Dict[str, Any]:
         """
         Parse task input data from JSON string
@@ -206,30 +332,38 @@ class BaseAgent(ABC):
         """
         db = self.get_db()
         context = self.parse_input_data(task)
+        if not (task.chat_id or task.message_id):
+            return context
+
+        # Chat and message in one round-trip
+        from database.models import Chat, Message
+        row = (
+            db.query(Chat, Message)
+            .select_from(Task)
+            .outerjoin(Chat, Chat.id == Task.chat_id)
+            .outerjoin(Message, Message.id == Task.message_id)
+            .filter(Task.id == task.id)
+            .first()
+        )
+        chat, message = row if row else (None, None)
 
         # Add chat information if available
-        if task.chat_id:
-            from database.models import Chat
-            chat = db.query(Chat).filter(Chat.id == task.chat_id).first()
-            if chat:
-                context['chat'] = {
-                    'id': chat.id,
-                    'name': chat.name,
-                    'phone_number': chat.phone_number,
-                    'is_group': chat.is_group
-                }
+        if chat:
+            context['chat'] = {
+                'id': chat.id,
+                'name': chat.name,
+                'phone_number': chat.phone_number,
+                'is_group': chat.is_group
+            }
 
         # Add message information if available
-        if task.message_id:
-            from database.models import Message
-            message = db.query(Message).filter(Message.id == task.message_id).first()
-            if message:
-                context['message'] = {
-                    'id': message.id,
-                    'body': message.body,
-                    'timestamp': message.timestamp.isoformat() if message.timestamp else None,
-                    'from_me': message.from_me
-                }
+        if message:
+            context['message'] = {
+                'id': message.id,
+                'body': message.body,
+                'timestamp': message.timestamp.isoformat() if message.timestamp else None,
+                'from_me': message.from_me
+            }
 
         return context
 
@@ -245,8 +379,9 @@ class BaseAgent(ABC):
             Delegation result
         """
         task.assigned_agent = agent_type
-        db = self.get_db()
-        db.commit()
+        if _pending_logs.get() is None:
+            # Otherwise committed with the task by execute()
+            self.get_db().commit()
 
         self.log_action(task.id, 'delegated', {'to_agent': agent_type})
         print(f"↪️ [{self.agent_type}] Delegating task #{task.id} to {agent_type}")
@@ -294,6 +429,7 @@ class BaseAgent(ABC):
             db.add(subtask)
             db.commit()
             db.refresh(subtask)
+            task_queue.notify()
 
             self.log_action(parent_task.id, 'subtask_created', {'subtask_id': subtask.id})
             print(f"➕ [{self.agent_type}] Created subtask #{subtask.id} for task #{parent_task.id}")
@@ -302,3 +438,45 @@ class BaseAgent(ABC):
         except Exception as e:
             print(f"Failed to create subtask: {e}")
             return None
+
+    async def start_workflow(self, task: Task, steps: List[WorkflowStep]) -> Dict[str, Any]:
+        """
+        Split the task into a DAG of subtasks (see tasks/workflow.py)
+
+        The steps are committed together with the task, which then waits
+        until they have all completed and is processed again; use
+        get_workflow_results() to tell the two runs apart. Return the
+        result from process().
+
+        Args:
+            task: Task being processed
+            steps: Workflow steps; independent ones run concurrently
+
+        Returns:
+            Processing result that puts the task in WAITING_INPUT
+
+        Raises:
+            ValueError: If steps is empty or its dependencies are invalid
+                (nothing is created)
+        """
+        db = self.get_db()
+        ids = workflow_engine.start(db, task, steps)
+
+        self.log_action(task.id, 'workflow_started', {'steps': ids})
+        print(f"🔀 [{self.agent_type}] Task #{task.id} started a workflow of {len(ids)} steps")
+
+        return {
+            'success': True,
+            'waiting': True,
+            'response': f"Processing in {len(ids)} steps",
+            'data': {'workflow': ids}
+        }
+
+    def get_workflow_results(self, task: Task) -> Optional[Dict[str, Any]]:
+        """
+        Outputs of the task's workflow steps, by step name
+
+        Returns:
+            None unless the task is being resumed after its workflow completed
+        """
+        return workflow_engine.results(self.get_db(), task)
@@ -17,6 +17,8 @@ import gzip
 import os
 
 from agents.base_agent import BaseAgent
+from services.chat_state import mark_message_read
+from services.stats_service import stats_service
 from database.models import (
     Task, TaskType, TaskStatus,
     Message, Chat, MessageArchive, SyncStatus
@@ -143,6 +145,7 @@ class ConversationManagerAgent(BaseAgent):
                 archived_count += 1
 
             db.commit()
+            stats_service.record_chats_archived(archived_count, messages_archived)
 
             response = (
                 f"✅ Archived {archived_count} conversation(s) with {messages_archived} messages. "
@@ -619,7 +622,7 @@ Tags (comma-separated):"""
                     if 'processed' in changes:
                         message.processed = changes['processed']
                     if 'read' in changes and changes['read']:
-                        message.read_at = datetime.now()
+                        mark_message_read(db, message)
                     if 'llm_processed' in changes:
                         message.llm_processed = changes['llm_processed']
 
@@ -23,9 +23,14 @@ from services.whatsapp_service import WhatsAppService
 from services.llm_service import LLMService
 from services.agent_service import initialize_agent_service, get_agent_service
 from core.config import settings
+from core.serialization import ORJSONResponse
 from database.database import engine, Base
 from tasks.scheduled_tasks import start_scheduled_tasks, stop_scheduled_tasks
 from tasks.task_manager import TaskManager
+from services.write_behind import conversation_history_sink
+from services.agent_log import agent_log_sink
+from services.reminders import reminder_dispatcher
+from tasks.task_events import task_events
 
 # Global services
 whatsapp_service = None
@@ -68,10 +73,20 @@ async def lifespan(app: FastAPI):
     whatsapp.whatsapp_service = whatsapp_service
     llm.llm_service = llm_service
 
+    # Start write-behind sinks
+    conversation_history_sink.start()
+    agent_log_sink.start()
+
+    # Push task state changes to WebSocket clients ("task_update" messages)
+    task_events.subscribe(connection_manager.broadcast)
+
     # Start scheduled tasks
     start_scheduled_tasks()
 
-    # Start agent service task processing in background
+    # Send appointment reminders (also recovers ones missed while down)
+    reminder_dispatcher.start(whatsapp_service.send_message)
+
+    # Start the agent worker pool in background
     asyncio.create_task(agent_service.start_processing(task_manager))
 
     print("🚀 WhatsApp Secretary backend started")
@@ -80,13 +95,18 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     if agent_service:
-        agent_service.stop_processing()
+        await agent_service.stop_processing()
 
     if whatsapp_service:
         await whatsapp_service.cleanup()
 
     # Stop scheduled tasks
     stop_scheduled_tasks()
+    await reminder_dispatcher.stop()
+
+    # Drain write-behind sinks
+    await conversation_history_sink.stop()
+    await agent_log_sink.stop()
 
     print("🛑 WhatsApp Secretary backend stopped")
 
@@ -94,6 +114,7 @@ app = FastAPI(
     title="WhatsApp Secretary",
     description="AI-powered WhatsApp assistant with appointment booking",
     version="2.0.0",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
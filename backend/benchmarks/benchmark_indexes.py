@@ -0,0 +1,414 @@
+#!/usr/bin/env python3
+"""
+Index Benchmark
+
+Seeds a scratch database with a realistic volume of rows (1M messages by
+default), then runs EXPLAIN on every hot router/agent query and asserts
+that each one is served by the expected index.
+
+Where the application builds a statement in a reusable function, the
+benchmark EXPLAINs that exact statement: keyset pages come from
+database/pagination.py (with a cursor, so the keyset condition is in the
+plan) over the routers' column lists, the task claim and priority-class
+walk from TaskQueue, and the dashboard aggregates from
+services/stats_service.py. Exact totals read every row whatever the
+indexes; their plans are printed but not asserted.
+
+Usage:
+    python benchmarks/benchmark_indexes.py                      # scratch SQLite file
+    python benchmarks/benchmark_indexes.py --messages 200000    # smaller run
+    DATABASE_URL=postgresql://... python benchmarks/benchmark_indexes.py --keep
+
+Never point this at a production database: it creates and fills tables.
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Seed data and verify index usage via EXPLAIN")
+    parser.add_argument("--messages", type=int, default=1_000_000, help="Number of messages to seed")
+    parser.add_argument("--chats", type=int, default=5_000, help="Number of chats to seed")
+    parser.add_argument("--files", type=int, default=500_000, help="Number of file records to seed")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch SQLite file")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_index_benchmark.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from sqlalchemy import select, func, insert, text
+from sqlalchemy.orm import Session
+
+from database.database import engine, Base, SessionLocal
+from database.models import (
+    Chat, Message, MessageType, Appointment, AppointmentStatus, Task, TaskType, TaskStatus,
+    PendingAuthorization, ConversationHistory, LLMProvider, FileRecord, FileUsage
+)
+from database.pagination import encode_cursor, keyset_page_query
+from database.serializers import APPOINTMENT_COLUMNS, CHAT_LIST_COLUMNS, FILE_COLUMNS, MESSAGE_COLUMNS
+from services.file_usage import ALL_FAMILIES
+from services.stats_service import reconcile_queries
+from tasks.task_queue import TaskQueue
+
+BATCH = 50_000
+NOW = datetime.now()
+
+
+def seed(conn, table, rows_fn, total):
+    """Insert generated rows in batches"""
+    for start in range(0, total, BATCH):
+        conn.execute(insert(table), [rows_fn(i) for i in range(start, min(start + BATCH, total))])
+    conn.commit()
+
+
+def seed_database(n_messages: int, n_chats: int, n_files: int):
+    print(f"🌱 Seeding {n_messages:,} messages across {n_chats:,} chats...")
+    started = time.time()
+    rnd = random.Random(42)
+
+    with engine.connect() as conn:
+        seed(conn, Chat.__table__, lambda i: {
+            "id": f"chat_{i}@c.us",
+            "name": f"Contact {i}",
+            "phone_number": str(85200000000 + i),
+            "is_active": i % 10 != 0,
+            "archived_at": NOW - timedelta(days=i % 30) if i % 10 == 0 else None,
+            "last_activity_at": NOW - timedelta(minutes=i),
+            "unread_count": 0,
+            "message_count": 0
+        }, n_chats)
+
+        seed(conn, Message.__table__, lambda i: {
+            "id": f"msg_{i}",
+            "chat_id": f"chat_{rnd.randrange(n_chats)}@c.us",
+            "body": f"Message body {i}",
+            "message_type": MessageType.TEXT,
+            "from_me": i % 3 == 0,
+            "timestamp": NOW - timedelta(seconds=n_messages - i),
+            "llm_processed": i % 5 != 0,
+            "archived_at": NOW - timedelta(days=1) if i % 50 == 0 else None
+        }, n_messages)
+
+        statuses = list(AppointmentStatus)
+        seed(conn, Appointment.__table__, lambda i: {
+            "external_id": f"apt_{i}",
+            "chat_id": f"chat_{i % n_chats}@c.us",
+            "customer_name": f"Customer {i}",
+            "title": "Consultation",
+            "appointment_date": NOW + timedelta(hours=i - 25_000),
+            "duration_minutes": 60,
+            "status": statuses[i % len(statuses)]
+        }, 50_000)
+
+        task_statuses = [TaskStatus.COMPLETED] * 8 + [TaskStatus.FAILED, TaskStatus.PENDING]
+        seed(conn, Task.__table__, lambda i: {
+            "task_type": TaskType.TRIAGE,
+            "status": task_statuses[i % len(task_statuses)],
+            "priority": [1, 3, 5, 7, 9][i % 5],
+            "chat_id": f"chat_{i % n_chats}@c.us",
+            "created_at": NOW - timedelta(seconds=i),
+            "deadline": NOW + timedelta(minutes=i % 600) if i % 3 == 0 else None
+        }, 200_000)
+
+        seed(conn, PendingAuthorization.__table__, lambda i: {
+            "request_id": f"req_{i}",
+            "chat_id": f"chat_{i % n_chats}@c.us",
+            "requester_phone": "85200000000",
+            "action_type": "database_query",
+            "status": "pending" if i % 20 == 0 else "expired",
+            "expires_at": NOW + timedelta(minutes=i % 60 - 30),
+            "created_at": NOW - timedelta(minutes=i)
+        }, 50_000)
+
+        seed(conn, ConversationHistory.__table__, lambda i: {
+            "chat_id": f"chat_{i % n_chats}@c.us",
+            "user_input": "hi",
+            "llm_response": "hello",
+            "provider": LLMProvider.GEMINI,
+            "model_name": "gemini",
+            "created_at": NOW - timedelta(seconds=i)
+        }, 200_000)
+
+        families = ["image", "document", "video", "audio", "other"]
+        seed(conn, FileRecord.__table__, lambda i: {
+            "filename": f"file_{i}",
+            "original_filename": f"file_{i}.bin",
+            "file_path": f"data/media_store/{i}",
+            "file_size": 1000 + i % 5_000_000,
+            "mime_type": "application/octet-stream",
+            "mime_family": families[i % len(families)],
+            "chat_id": f"chat_{i % n_chats}@c.us" if i % 4 else None,
+            "message_id": f"msg_{i}" if i % 2 else None,
+            "created_at": NOW - timedelta(seconds=i)
+        }, n_files)
+
+        # Per-chat usage summary, as maintained by services/file_usage.py
+        conn.execute(text(
+            "INSERT INTO file_usage (chat_key, mime_family, file_count, total_size) "
+            "SELECT COALESCE(chat_id, ''), mime_family, COUNT(*), SUM(file_size) FROM files "
+            "GROUP BY COALESCE(chat_id, ''), mime_family"
+        ))
+        conn.execute(text(
+            "INSERT INTO file_usage (chat_key, mime_family, file_count, total_size) "
+            "SELECT chat_key, :all_families, SUM(file_count), SUM(total_size) FROM file_usage GROUP BY chat_key"
+        ), {"all_families": ALL_FAMILIES})
+
+        # Refresh planner statistics so the plans reflect the seeded volume
+        conn.execute(text("ANALYZE"))
+        conn.commit()
+
+    print(f"✅ Seeded in {time.time() - started:.1f}s")
+
+
+def page(query, columns, types, cursor: str, descending: bool = True):
+    """The statement keyset_paginate() runs for a page after the first"""
+    return keyset_page_query(query, columns, types, cursor, 50, descending)[0].statement
+
+
+def hot_queries(db: Session):
+    """(description, statement, indexes the plan must use) for each router/agent query"""
+    chat_id = "chat_42@c.us"
+    stats = reconcile_queries(NOW)
+    queue = TaskQueue(worker_id="benchmark")
+
+    return [
+        (
+            "routers/whatsapp.py get_chat_messages",
+            page(
+                db.query(*MESSAGE_COLUMNS).filter(Message.chat_id == chat_id),
+                (Message.timestamp, Message.id), (datetime.fromisoformat, str),
+                encode_cursor("next", NOW - timedelta(hours=1), "msg_0")
+            ),
+            ("ix_messages_chat_timestamp_id",)
+        ),
+        (
+            "routers/whatsapp.py get_chats",
+            page(
+                db.query(*CHAT_LIST_COLUMNS).filter(Chat.is_active == True),
+                (Chat.last_activity_at, Chat.id), (datetime.fromisoformat, str),
+                encode_cursor("next", NOW - timedelta(minutes=100), "chat_100@c.us")
+            ),
+            ("ix_chats_active_activity",)
+        ),
+        (
+            "unprocessed incoming messages per chat",
+            select(func.count()).select_from(Message).where(
+                Message.chat_id == chat_id,
+                Message.from_me == False,
+                Message.llm_processed == False
+            ),
+            ("ix_messages_chat_from_me_processed",)
+        ),
+        (
+            "routers/conversations.py get_archived_conversations",
+            page(
+                db.query(Chat).filter(Chat.archived_at.isnot(None)),
+                (Chat.archived_at, Chat.id), (datetime.fromisoformat, str),
+                encode_cursor("next", NOW - timedelta(days=10), "chat_10@c.us")
+            ),
+            ("ix_chats_archived_at",)
+        ),
+        (
+            "agents/conversation_manager.py archive: chat messages not archived",
+            select(Message).where(Message.chat_id == chat_id, Message.archived_at.is_(None)),
+            ("ix_messages_chat",)
+        ),
+        (
+            "routers/appointments.py get_appointments date range",
+            page(
+                db.query(*APPOINTMENT_COLUMNS).filter(
+                    Appointment.appointment_date >= NOW,
+                    Appointment.appointment_date <= NOW + timedelta(days=7)
+                ),
+                (Appointment.appointment_date, Appointment.id), (datetime.fromisoformat, int),
+                encode_cursor("next", NOW + timedelta(days=1), 25_024),
+                descending=False
+            ),
+            ("ix_appointments_date_status",)
+        ),
+        (
+            "tasks/task_queue.py priority_heads",
+            queue.priority_heads_statement([], NOW),
+            ("ix_tasks_status_priority_created",)
+        ),
+        (
+            "tasks/task_queue.py claim (one class)",
+            queue.claim_statement([], 5, NOW),
+            ("ix_tasks_status_priority_deadline",)
+        ),
+        (
+            "tasks/task_queue.py claim (most urgent class)",
+            queue.claim_statement([TaskType.DOCUMENT_ANALYSIS], None, NOW),
+            ("ix_tasks_status_priority_deadline",)
+        ),
+        (
+            "tasks/task_manager.py get_pending_tasks",
+            select(Task).where(Task.status == TaskStatus.PENDING)
+            .order_by(Task.priority.asc(), Task.created_at.asc()).limit(10),
+            ("ix_tasks_status_priority_created",)
+        ),
+        (
+            "services/authorization_service.py pending authorization",
+            select(PendingAuthorization).where(
+                PendingAuthorization.status == "pending",
+                PendingAuthorization.expires_at > NOW
+            ).order_by(PendingAuthorization.created_at.desc()).limit(1),
+            ("ix_pending_authorizations_status_expires",)
+        ),
+        (
+            "services/authorization_service.py expiry sweep",
+            select(func.count()).select_from(PendingAuthorization).where(
+                PendingAuthorization.status == "pending",
+                PendingAuthorization.expires_at < NOW
+            ),
+            ("ix_pending_authorizations_status_expires",)
+        ),
+        (
+            "conversation history per chat",
+            select(ConversationHistory).where(ConversationHistory.chat_id == chat_id)
+            .order_by(ConversationHistory.created_at.desc()).limit(20),
+            ("ix_conversation_history_chat_created",)
+        ),
+        (
+            "routers/files.py list_files",
+            page(
+                db.query(*FILE_COLUMNS),
+                (FileRecord.created_at, FileRecord.id), (datetime.fromisoformat, int),
+                encode_cursor("next", NOW - timedelta(hours=1), 3600)
+            ),
+            ("ix_files_created_id",)
+        ),
+        (
+            "routers/files.py list_files by chat",
+            page(
+                db.query(*FILE_COLUMNS).filter(FileRecord.chat_id == chat_id),
+                (FileRecord.created_at, FileRecord.id), (datetime.fromisoformat, int),
+                encode_cursor("next", NOW - timedelta(hours=1), 3600)
+            ),
+            ("ix_files_chat_created_id",)
+        ),
+        (
+            "routers/files.py list_files by family and date range",
+            page(
+                db.query(*FILE_COLUMNS).filter(
+                    FileRecord.mime_family == "video",
+                    FileRecord.created_at >= NOW - timedelta(days=3),
+                    FileRecord.created_at <= NOW - timedelta(days=1)
+                ),
+                (FileRecord.created_at, FileRecord.id), (datetime.fromisoformat, int),
+                encode_cursor("next", NOW - timedelta(days=2), 172_800)
+            ),
+            ("ix_files_family_created_id",)
+        ),
+        (
+            "routers/files.py list_files by message",
+            select(FileRecord.id).where(FileRecord.message_id == "msg_4201"),
+            ("ix_files_message_id",)
+        ),
+        (
+            "routers/files.py get_file_usage",
+            select(FileUsage.chat_key, FileUsage.file_count, FileUsage.total_size)
+            .where(FileUsage.mime_family == ALL_FAMILIES)
+            .order_by(FileUsage.total_size.desc(), FileUsage.chat_key.desc()).limit(50),
+            ("ix_file_usage_family_size",)
+        ),
+        (
+            "routers/files.py get_file_usage by family",
+            select(FileUsage.chat_key, FileUsage.file_count, FileUsage.total_size)
+            .where(FileUsage.mime_family == "video")
+            .order_by(FileUsage.total_size.desc(), FileUsage.chat_key.desc()).limit(50),
+            ("ix_file_usage_family_size",)
+        ),
+        ("services/stats_service.py stats: chat counts", stats["chats"], ()),
+        ("services/stats_service.py stats: total messages", stats["total_messages"], ()),
+        ("services/stats_service.py stats: archived messages", stats["archived_messages"], ("ix_messages_archived_at",)),
+        ("services/stats_service.py stats: oldest/newest message", stats["message_range"], ("ix_messages_timestamp",)),
+        ("services/stats_service.py stats: messages today", stats["messages_today"], ("ix_messages_timestamp",)),
+        (
+            "services/stats_service.py stats: upcoming appointments",
+            stats["upcoming_appointments"],
+            ("ix_appointments_date_status",)
+        ),
+        ("services/stats_service.py stats: total files", stats["total_files"], ()),
+    ]
+
+
+def explain(conn, statement) -> str:
+    """Return the query plan as text"""
+    sql = str(statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+    if engine.dialect.name == "sqlite":
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).fetchall()
+        return "\n".join(str(row[-1]) for row in rows)
+
+    rows = conn.execute(text(f"EXPLAIN {sql}")).fetchall()
+    return "\n".join(str(row[0]) for row in rows)
+
+
+def run_checks() -> bool:
+    print(f"\n🔎 Checking query plans ({engine.dialect.name})")
+    print("=" * 80)
+
+    failures = 0
+    db = SessionLocal()
+    try:
+        for description, statement, expected_indexes in hot_queries(db):
+            plan = explain(db.connection(), statement)
+
+            started = time.perf_counter()
+            db.execute(statement).fetchall()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            db.rollback()  # The claim is an UPDATE; leave the seeded rows as they were
+
+            missing = [index for index in expected_indexes if index not in plan]
+            failures += 1 if missing else 0
+            marker = "ℹ️" if not expected_indexes else ("❌" if missing else "✅")
+            print(f"{marker} {description} [{elapsed_ms:.1f} ms]")
+            if missing:
+                print(f"   expected index: {', '.join(missing)}")
+            print("   " + plan.replace("\n", "\n   "))
+    finally:
+        db.close()
+
+    print("=" * 80)
+    if failures:
+        print(f"❌ {failures} query(s) not using the expected index")
+    else:
+        print("✅ All hot queries use an index")
+    return failures == 0
+
+
+def main():
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+    Base.metadata.create_all(bind=engine)
+    seed_database(args.messages, args.chats, args.files)
+    ok = run_checks()
+
+    if scratch_file and not args.keep:
+        engine.dispose()
+        scratch_file.unlink(missing_ok=True)
+
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
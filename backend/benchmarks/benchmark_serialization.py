@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Serialization Benchmark
+
+Serializes the same messages two ways and compares the time:
+- before: ORM query, hand-written dict with .isoformat()/.value per row,
+  FastAPI's jsonable_encoder, stdlib json
+- after: column-tuple query (database/serializers.py) encoded with orjson
+  (core/serialization.py)
+
+Usage:
+    python benchmarks/benchmark_serialization.py
+    python benchmarks/benchmark_serialization.py --messages 50000 --rounds 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add backend directory to Python path
+backend_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(backend_dir))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare message serialization paths")
+    parser.add_argument("--messages", type=int, default=10_000, help="Number of messages to serialize")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed rounds per path")
+    return parser.parse_args()
+
+
+args = parse_args()
+
+# Always use a scratch database
+scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_serialization_benchmark.db"
+if scratch_file.exists():
+    scratch_file.unlink()
+os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import insert
+
+from core.serialization import dumps
+from database.database import engine, Base, SessionLocal
+from database.models import Chat, Message, MessageType
+from database.serializers import MESSAGE_COLUMNS, message_to_dict
+
+CHAT_ID = "benchmark@c.us"
+
+
+def seed(n_messages: int):
+    now = datetime.now()
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Chat.__table__), [{"id": CHAT_ID, "name": "Benchmark"}])
+        conn.execute(insert(Message.__table__), [
+            {
+                "id": f"msg_{i}",
+                "chat_id": CHAT_ID,
+                "body": f"Hello, this is message number {i} with a typical length body text.",
+                "message_type": MessageType.TEXT,
+                "from_me": i % 2 == 0,
+                "timestamp": now - timedelta(seconds=i),
+                "has_media": False,
+                "llm_processed": i % 3 == 0,
+                "llm_response": "Thanks, noted!" if i % 3 == 0 else None
+            }
+            for i in range(n_messages)
+        ])
+
+
+def serialize_before(limit: int) -> bytes:
+    """The hand-written path the routers used to take"""
+    db = SessionLocal()
+    try:
+        messages = db.query(Message).filter(Message.chat_id == CHAT_ID).order_by(
+            Message.timestamp.desc()
+        ).limit(limit).all()
+
+        message_list = []
+        for msg in messages:
+            message_list.append({
+                "id": msg.id,
+                "chat_id": msg.chat_id,
+                "body": msg.body,
+                "message_type": msg.message_type.value if msg.message_type else "text",
+                "from_me": msg.from_me,
+                "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
+                "has_media": msg.has_media,
+                "media_path": msg.media_path,
+                "llm_processed": msg.llm_processed,
+                "llm_response": msg.llm_response
+            })
+
+        content = jsonable_encoder({"success": True, "messages": message_list})
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    finally:
+        db.close()
+
+
+def serialize_after(limit: int) -> bytes:
+    """Column tuples + orjson"""
+    db = SessionLocal()
+    try:
+        rows = db.query(*MESSAGE_COLUMNS).filter(Message.chat_id == CHAT_ID).order_by(
+            Message.timestamp.desc()
+        ).limit(limit).all()
+
+        return dumps({"success": True, "messages": [message_to_dict(row) for row in rows]})
+    finally:
+        db.close()
+
+
+def timed(fn, limit: int, rounds: int):
+    fn(limit)  # warm-up
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        body = fn(limit)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples), body
+
+
+def main():
+    print(f"🌱 Seeding {args.messages:,} messages...")
+    seed(args.messages)
+
+    before_ms, before_body = timed(serialize_before, args.messages, args.rounds)
+    after_ms, after_body = timed(serialize_after, args.messages, args.rounds)
+
+    # Both paths must produce the same payload
+    assert json.loads(before_body) == json.loads(after_body), "Payloads differ"
+
+    print("=" * 60)
+    print(f"📦 Serialized {args.messages:,} messages ({len(after_body) / 1024:.0f} KB), median of {args.rounds}")
+    print(f"   before (ORM + jsonable_encoder + json): {before_ms:8.1f} ms")
+    print(f"   after  (columns + orjson):              {after_ms:8.1f} ms")
+    print(f"   speedup: {before_ms / after_ms:.1f}x")
+    print("=" * 60)
+
+    engine.dispose()
+    scratch_file.unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+# backend/core/cache.py
+"""
+Resource versions and conditional/cached GET responses
+
+Every committed write bumps a version counter for each table it touched.
+Session events on SessionLocal do the bookkeeping (ORM flushes plus bulk
+UPDATE/DELETE/INSERT statements), so write paths don't have to remember to.
+
+List endpoints decorated with @versioned_response declare which tables they
+read. Their ETag is derived from (path, query params, versions of those
+tables), so:
+- a request whose If-None-Match matches gets an empty 304
+- otherwise the rendered body is served from a small LRU keyed the same way
+- only when a relevant table changed is the endpoint actually executed
+
+Versions are per process; the ETag includes a per-process epoch so a
+restart never produces a false 304. Writes made by other processes (or
+through raw engine connections) don't bump them, so every ETag and cached
+body also expires after RESPONSE_CACHE_TTL_SECONDS (or the endpoint's
+shorter max_age_seconds): that bounds how stale such a response can get.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy import event
+
+from core.config import settings
+from core.serialization import dumps
+
+
+class ResourceVersions:
+    """Monotonic per-table version counters with last-modified times"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[str, int] = {}
+        self._started_at = datetime.now(timezone.utc)
+        self._modified: Dict[str, datetime] = {}
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def bump(self, resources: Iterable[str]):
+        """Increment the version of each resource"""
+        now = datetime.now(timezone.utc)
+        with self._lock:
+            for resource in resources:
+                self._versions[resource] = self._versions.get(resource, 0) + 1
+                self._modified[resource] = now
+
+    def get(self, resources: Sequence[str]) -> Tuple[Tuple[int, ...], datetime]:
+        """
+        Current versions and last-modified time for a set of resources
+
+        Returns:
+            Tuple of (versions in the given order, latest modification time)
+        """
+        with self._lock:
+            versions = tuple(self._versions.get(r, 0) for r in resources)
+            modified = max(
+                (self._modified.get(r, self._started_at) for r in resources),
+                default=self._started_at
+            )
+        return versions, modified
+
+
+class ResponseCache:
+    """Thread-safe LRU of rendered response bodies"""
+
+    def __init__(self, max_entries: int, max_entry_bytes: int):
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.max_entries = max_entries
+        self.max_entry_bytes = max_entry_bytes
+        self.stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            body = self._entries.get(key)
+            if body is None:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return body
+
+    def put(self, key: str, body: bytes):
+        if len(body) > self.max_entry_bytes:
+            return
+        with self._lock:
+            self._entries[key] = body
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Global instances
+resource_versions = ResourceVersions()
+response_cache = ResponseCache(
+    max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+    max_entry_bytes=settings.RESPONSE_CACHE_MAX_ENTRY_BYTES
+)
+
+
+# ==================== Write tracking ====================
+
+def _changed_tables(session) -> set:
+    return session.info.setdefault("changed_tables", set())
+
+
+def track_writes(session_factory):
+    """
+    Bump resource versions for every table a committed transaction wrote to
+
+    Args:
+        session_factory: sessionmaker (or Session class) to attach events to
+    """
+
+    @event.listens_for(session_factory, "after_flush")
+    def _after_flush(session, flush_context):
+        changed = _changed_tables(session)
+        for obj in (*session.new, *session.dirty, *session.deleted):
+            table = getattr(obj, "__tablename__", None)
+            if table:
+                changed.add(table)
+
+    @event.listens_for(session_factory, "do_orm_execute")
+    def _do_orm_execute(orm_execute_state):
+        # Bulk query.update()/delete() and insert()/update() statements skip the flush
+        if orm_execute_state.is_select:
+            return
+        table = getattr(orm_execute_state.statement, "table", None)
+        if table is not None:
+            _changed_tables(orm_execute_state.session).add(table.name)
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        changed = session.info.pop("changed_tables", None)
+        if changed:
+            resource_versions.bump(changed)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("changed_tables", None)
+
+
+# ==================== Conditional responses ====================
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: ignore W/ prefixes
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def versioned_response(
+    *resources: str,
+    max_age_seconds: Optional[int] = None,
+    bypass_params: Sequence[str] = ()
+) -> Callable:
+    """
+    Decorator adding ETag/Last-Modified, 304 handling and body caching to a GET endpoint
+
+    The endpoint must take a `request: Request` parameter and return
+    JSON-serializable data or a JSONResponse (other Responses pass through).
+
+    Args:
+        *resources: Table names the response is derived from
+        max_age_seconds: Expire the ETag sooner than RESPONSE_CACHE_TTL_SECONDS,
+            for responses that change with the clock (e.g. "upcoming" counts)
+        bypass_params: Query parameters that, when truthy, skip the cache
+            entirely (e.g. ones that trigger a refresh with side effects)
+
+    Returns:
+        Decorator
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            request: Request = kwargs["request"]
+            params = request.query_params
+
+            if any(params.get(name, "").lower() not in ("", "0", "false") for name in bypass_params):
+                return await func(*args, **kwargs)
+
+            versions, modified = resource_versions.get(resources)
+            ttl = max(min(max_age_seconds or settings.RESPONSE_CACHE_TTL_SECONDS,
+                          settings.RESPONSE_CACHE_TTL_SECONDS), 1)
+            key = "|".join([
+                resource_versions.epoch,
+                request.url.path,
+                "&".join(f"{k}={v}" for k, v in sorted(params.multi_items())),
+                ",".join(map(str, versions)),
+                # Expiry bucket: a new ETag (and cache entry) every ttl seconds
+                str(int(time.time() // ttl))
+            ])
+            etag = f'W/"{hashlib.sha1(key.encode()).hexdigest()[:20]}"'
+            headers = {
+                "ETag": etag,
+                "Last-Modified": format_datetime(modified, usegmt=True),
+                "Cache-Control": "no-cache"
+            }
+
+            if _etag_matches(request.headers.get("if-none-match"), etag):
+                response_cache.stats["not_modified"] += 1
+                return Response(status_code=304, headers=headers)
+
+            body = response_cache.get(key)
+            if body is None:
+                result = await func(*args, **kwargs)
+                if isinstance(result, JSONResponse):
+                    if result.status_code != 200:
+                        return result
+                    body = result.body
+                elif isinstance(result, Response):
+                    return result
+                else:
+                    body = dumps(jsonable_encoder(result))
+                response_cache.put(key, body)
+
+            return Response(content=body, media_type="application/json", headers=headers)
+
+        return wrapper
+    return decorator
@@ -1,6 +1,6 @@
 # backend/app/core/config.py
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 class Settings(BaseSettings):
@@ -19,6 +19,7 @@ class Settings(BaseSettings):
     WHATSAPP_SESSION_PATH: str = "data/whatsapp-session"
     WHATSAPP_NODE_SCRIPT_PATH: str = "whatsapp_client/whatsapp_client.js"
     MEDIA_DOWNLOAD_PATH: str = "data/media"
+    MEDIA_STORE_PATH: str = "data/media_store"  # Content-addressed (sha256) blobs
     
     # LLM Settings
     # Ollama (Llama 4)
@@ -47,6 +48,51 @@ class Settings(BaseSettings):
     BUSINESS_HOURS_START: str = "09:00"
     BUSINESS_HOURS_END: str = "17:00"
     DEFAULT_APPOINTMENT_DURATION: int = 60  # minutes
+    AVAILABILITY_SLOT_INTERVAL_MINUTES: int = 0  # Slot start spacing; 0 = the appointment duration
+    DEFAULT_ADVANCE_BOOKING_HOURS: int = 0  # Used when no service type is given
+    DEFAULT_MAX_ADVANCE_BOOKING_DAYS: int = 90
+    AVAILABILITY_MAX_RANGE_DAYS: int = 30
+    BOOKING_MAX_RETRIES: int = 5  # Attempts on lock/serialization failures
+    BOOKING_RETRY_BASE_MS: int = 50  # Backoff doubles per attempt, plus jitter
+
+    # Appointment reminders
+    REMINDER_WINDOW_MINUTES: int = 60  # Reminders due within this window are held in memory
+    REMINDER_BATCH_SIZE: int = 20
+    REMINDER_SENDS_PER_MINUTE: int = 30
+    REMINDER_RETRY_MINUTES: int = 5  # Delay before retrying a failed send
+
+    # Agent task queue
+    TASK_LEASE_SECONDS: int = 300  # Claimed tasks without a heartbeat this long are recovered
+    TASK_HEARTBEAT_SECONDS: int = 30
+    TASK_QUEUE_POLL_SECONDS: float = 2.0  # Idle workers re-check for tasks queued by other processes
+    TASK_PRIORITY_AGING_SECONDS: int = 120  # Waiting this long counts as one priority level more urgent; 0 = strict priority
+    TASK_RETRY_BASE_SECONDS: int = 30  # First retry delay; doubles per retry, with jitter
+    TASK_RETRY_MAX_SECONDS: int = 3600
+    TASK_RETRY_CHECK_SECONDS: int = 10  # How often due retries are re-queued
+    TASK_WAIT_MAX_SECONDS: int = 60  # Longest ?wait= long-poll on a task
+    TASK_WAIT_POLL_SECONDS: float = 5.0  # Long-polls re-read the task this often (completions in other processes)
+    TASK_STATS_CACHE_SECONDS: int = 15
+    TASK_STATS_WINDOW_HOURS: int = 24  # Processing-time percentiles cover tasks completed this recently
+    AGENT_WORKERS: int = 4  # Tasks processed concurrently per process
+    TASK_TYPE_CONCURRENCY: Dict[str, int] = {"document_analysis": 2}  # TaskType value -> max running per process
+    AGENT_DRAIN_TIMEOUT_SECONDS: int = 30  # Shutdown waits this long for running tasks
+    TASK_TIMEOUT_SECONDS: int = 600  # Running tasks are cancelled and failed after this; 0 = no limit
+    TASK_TYPE_TIMEOUTS: Dict[str, int] = {  # TaskType value -> timeout override
+        "document_analysis": 900,
+        "conversation_archive": 1800,
+        "database_cleanup": 1800,
+    }
+    AGENT_UNIT_OF_WORK: bool = True  # Commit a task's status, results and logs once, when it finishes
+
+    # Agent action log (agent_logs table)
+    AGENT_LOG_ENABLED: bool = True  # False: keep only the in-memory recent entries
+    # Action -> fraction written; unlisted = 1.0. Off by default; e.g.
+    # {"started": 0.1, "duration": 0.1} (duration analytics then see a sample)
+    AGENT_LOG_SAMPLE_RATES: Dict[str, float] = {}
+    AGENT_LOG_BATCH_SIZE: int = 200
+    AGENT_LOG_FLUSH_INTERVAL_SECONDS: float = 2.0
+    AGENT_LOG_MAX_BUFFER: int = 10000
+    AGENT_LOG_RECENT_SIZE: int = 500  # Entries kept in memory for the admin UI
 
     # Conversation Manager Settings
     # Archive settings
@@ -71,6 +117,12 @@ class Settings(BaseSettings):
     REMOVE_ORPHANS: bool = True
     COMPRESS_OLD_MESSAGES: bool = True
     COMPRESS_AFTER_DAYS: int = 30
+    TASK_RETENTION_DAYS: int = 30  # Finished tasks (and their agent logs) are deleted after this
+    AGENT_LOG_RETENTION_DAYS: int = 14
+    RETENTION_INTERVAL_MINUTES: int = 60
+    RETENTION_CHUNK_SIZE: int = 500  # Rows per delete transaction
+    RETENTION_TIME_BUDGET_SECONDS: float = 30.0  # Per run; the rest waits for the next run
+    RETENTION_PAUSE_SECONDS: float = 0.05  # Between chunks, so other writers get the lock
 
     # Metadata settings
     AUTO_SENTIMENT_ANALYSIS: bool = True
@@ -83,6 +135,28 @@ class Settings(BaseSettings):
     AUTO_MARK_READ: bool = False
     MARK_PROCESSED_AFTER_RESPONSE: bool = True
 
+    # Conversation history write-behind sink
+    HISTORY_SINK_BATCH_SIZE: int = 100
+    HISTORY_SINK_FLUSH_INTERVAL_SECONDS: float = 1.0
+    HISTORY_SINK_MAX_BUFFER: int = 5000  # Oldest rows are dropped beyond this
+
+    # Dashboard stats snapshot
+    STATS_RECONCILE_INTERVAL_MINUTES: int = 15
+
+    # Conditional GET / response cache
+    RESPONSE_CACHE_MAX_ENTRIES: int = 256
+    RESPONSE_CACHE_MAX_ENTRY_BYTES: int = 1024 * 1024  # Larger bodies are not cached
+    # Upper bound on how stale a cached body or 304 can be when the write
+    # came from another process or bypassed SessionLocal
+    RESPONSE_CACHE_TTL_SECONDS: int = 30
+
+    # File uploads
+    MAX_UPLOAD_SIZE_MB: int = 100
+    UPLOAD_CHUNK_SIZE_KB: int = 1024
+
+    # Pagination
+    PAGINATION_APPROX_COUNT_CAP: int = 10000  # SQLite approximate counts stop here
+
     model_config = {
         "env_file": "../.env",  # .env file is in parent directory
         "case_sensitive": True,
@@ -95,5 +169,6 @@ settings = Settings()
 os.makedirs(os.path.dirname(settings.DATABASE_PATH), exist_ok=True)
 os.makedirs(settings.WHATSAPP_SESSION_PATH, exist_ok=True)
 os.makedirs(settings.MEDIA_DOWNLOAD_PATH, exist_ok=True)
+os.makedirs(settings.MEDIA_STORE_PATH, exist_ok=True)
 os.makedirs(os.path.dirname(settings.WHATSAPP_NODE_SCRIPT_PATH), exist_ok=True)
 os.makedirs(settings.ARCHIVE_STORAGE_PATH, exist_ok=True)
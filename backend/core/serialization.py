@@ -0,0 +1,51 @@
+# backend/core/serialization.py
+"""
+Fast JSON encoding
+
+orjson encodes datetimes (ISO 8601, same text as .isoformat()), enums (by
+value), dicts and lists natively, so API payloads can carry raw column
+values and skip the per-field conversion jsonable_encoder would do.
+"""
+
+from decimal import Decimal
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def _default(obj: Any) -> Any:
+    """Fallback for types orjson doesn't handle natively"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump()
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    Encode content as JSON bytes
+
+    Args:
+        content: Data to encode (dicts, lists, datetimes, enums, pydantic models...)
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    return orjson.dumps(content, default=_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response rendered with orjson
+
+    Used as the application's default response class. Returning it directly
+    from an endpoint also skips FastAPI's jsonable_encoder pass.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,9 +1,22 @@
 # app/database/database.py
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, ARRAY
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool, NullPool
 
 from core.config import settings
+from core.cache import track_writes
+
+# The models use PostgreSQL-only column types; render them as JSON on SQLite
+# so create_all() works against the default SQLite database
+@compiles(JSONB, "sqlite")
+def _compile_jsonb_sqlite(type_, compiler, **kw):
+    return "JSON"
+
+@compiles(ARRAY, "sqlite")
+def _compile_array_sqlite(type_, compiler, **kw):
+    return "JSON"
 
 # Configure engine based on database type
 is_sqlite = settings.DATABASE_URL.startswith("sqlite")
@@ -32,6 +45,9 @@ else:
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Bump resource versions (ETags, response cache) on every committed write
+track_writes(SessionLocal)
+
 # Import Base from separate file to avoid circular imports
 from database.base import Base
 
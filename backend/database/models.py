@@ -1,5 +1,5 @@
 # backend/app/database/models.py
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum, ARRAY
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Float, ForeignKey, Enum, ARRAY, Index, text
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.sql import func
@@ -50,6 +50,11 @@ class Chat(Base):
     extra_data = Column(JSONB, default={})
     auto_archive_after_days = Column(Integer, default=90)
 
+    # Denormalized last message (maintained by services/chat_state.py)
+    last_message_body = Column(Text)
+    last_message_at = Column(DateTime)
+    last_message_from_me = Column(Boolean, default=False)
+
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
@@ -57,6 +62,13 @@ class Chat(Base):
     messages = relationship("Message", back_populates="chat")
     appointments = relationship("Appointment", back_populates="chat")
 
+    __table_args__ = (
+        # Chat list: active chats ordered by recent activity (keyset on id)
+        Index("ix_chats_active_activity", "is_active", "last_activity_at", "id"),
+        # Archive listing (keyset on id)
+        Index("ix_chats_archived_at", "archived_at", "id"),
+    )
+
 class Message(Base):
     __tablename__ = "messages"
 
@@ -87,6 +99,23 @@ class Message(Base):
     # Relationships
     chat = relationship("Chat", back_populates="messages")
 
+    __table_args__ = (
+        # Chat history ordered by time (keyset on id)
+        Index("ix_messages_chat_timestamp_id", "chat_id", "timestamp", "id"),
+        # Unprocessed incoming messages per chat
+        Index("ix_messages_chat_from_me_processed", "chat_id", "from_me", "llm_processed"),
+        # Archive listings and cleanup
+        Index("ix_messages_archived_at", "archived_at"),
+        # Dashboard stats: messages today, oldest/newest message
+        Index("ix_messages_timestamp", "timestamp"),
+        # Media store reference counting (only messages with media)
+        Index(
+            "ix_messages_media_path", "media_path",
+            postgresql_where=text("media_path IS NOT NULL"),
+            sqlite_where=text("media_path IS NOT NULL")
+        ),
+    )
+
 # Appointment System
 class Appointment(Base):
     __tablename__ = "appointments"
@@ -124,6 +153,11 @@ class Appointment(Base):
     chat = relationship("Chat", back_populates="appointments")
     reminders = relationship("AppointmentReminder", back_populates="appointment")
 
+    __table_args__ = (
+        # Availability, conflict checks and upcoming-appointment stats
+        Index("ix_appointments_date_status", "appointment_date", "status"),
+    )
+
 class AppointmentReminder(Base):
     __tablename__ = "appointment_reminders"
     
@@ -140,6 +174,13 @@ class AppointmentReminder(Base):
     # Relationships
     appointment = relationship("Appointment", back_populates="reminders")
 
+    __table_args__ = (
+        # Reminder dispatcher window loads
+        Index("ix_appointment_reminders_sent_time", "is_sent", "reminder_time"),
+        # Replacing an appointment's unsent reminders
+        Index("ix_appointment_reminders_appointment", "appointment_id"),
+    )
+
 # File Management
 class FileRecord(Base):
     __tablename__ = "files"
@@ -150,6 +191,8 @@ class FileRecord(Base):
     file_path = Column(String, nullable=False)
     file_size = Column(Integer)
     mime_type = Column(String)
+    mime_family = Column(String)  # image, document, video, audio, other
+    content_hash = Column(String(64), index=True)  # Hex SHA-256 of the file contents
     
     # Associated with message/chat
     message_id = Column(String, ForeignKey("messages.id"))
@@ -162,6 +205,32 @@ class FileRecord(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # File listing, newest first (keyset on id)
+        Index("ix_files_created_id", "created_at", "id"),
+        # File listing per chat / per family
+        Index("ix_files_chat_created_id", "chat_id", "created_at", "id"),
+        Index("ix_files_family_created_id", "mime_family", "created_at", "id"),
+        # Files attached to a message
+        Index("ix_files_message_id", "message_id"),
+        # Per-chat size totals (covering)
+        Index("ix_files_chat_size", "chat_id", "file_size"),
+    )
+
+class FileUsage(Base):
+    """Per-chat file count and bytes, kept in step with files (services/file_usage.py)"""
+    __tablename__ = "file_usage"
+
+    chat_key = Column(String, primary_key=True)  # files.chat_id, '' for files not attached to a chat
+    mime_family = Column(String, primary_key=True)  # A MIME family, or '*' for all of the chat's files
+    file_count = Column(Integer, nullable=False, default=0)
+    total_size = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        # Largest chats first, per family
+        Index("ix_file_usage_family_size", "mime_family", "total_size", "chat_key"),
+    )
+
 # User Management
 class User(Base):
     __tablename__ = "users"
@@ -255,6 +324,10 @@ class ConversationHistory(Base):
     
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        Index("ix_conversation_history_chat_created", "chat_id", "created_at"),
+    )
+
 # System Configuration
 class SystemConfig(Base):
     __tablename__ = "system_config"
@@ -333,6 +406,11 @@ class PendingAuthorization(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+    __table_args__ = (
+        # Pending-approval lookup and expiry sweep
+        Index("ix_pending_authorizations_status_expires", "status", "expires_at"),
+    )
+
 # Agentic Task System
 class TaskType(enum.Enum):
     APPOINTMENT_BOOKING = "appointment_booking"
@@ -361,8 +439,10 @@ class TaskStatus(enum.Enum):
     WAITING_INPUT = "waiting_input"
     WAITING_APPROVAL = "waiting_approval"
     COMPLETED = "completed"
-    FAILED = "failed"
+    FAILED = "failed"  # Retried automatically after next_retry_at
     CANCELLED = "cancelled"
+    DEAD_LETTER = "dead_letter"  # Out of retries; replayed manually
+    EXPIRED = "expired"  # Deadline passed while still queued
 
 class TaskPriority(enum.Enum):
     URGENT = 1
@@ -402,10 +482,41 @@ class Task(Base):
     deadline = Column(DateTime)
     retry_count = Column(Integer, default=0)
     max_retries = Column(Integer, default=3)
+    next_retry_at = Column(DateTime)  # When a FAILED task is re-queued
+
+    # Queue lease (tasks/task_queue.py)
+    lease_owner = Column(String)  # Worker that claimed the task
+    heartbeat_at = Column(DateTime)  # Refreshed while the worker is alive
+
+    # Coalescing key: at most one PENDING task per key (cleared when claimed)
+    dedup_key = Column(String)
 
     # Relationships
     subtasks = relationship("Task", backref=backref("parent", remote_side=[id]))
 
+    __table_args__ = (
+        # Queue dispatch: pending tasks by priority, oldest first
+        Index("ix_tasks_status_priority_created", "status", "priority", "created_at"),
+        # Earliest deadline first within a priority class
+        Index("ix_tasks_status_priority_deadline", "status", "priority", "deadline", "created_at"),
+        # Overdue pending task sweep
+        Index("ix_tasks_status_deadline", "status", "deadline"),
+        # Abandoned-lease recovery sweep
+        Index("ix_tasks_status_heartbeat", "status", "heartbeat_at"),
+        # Due-retry sweep
+        Index("ix_tasks_status_next_retry", "status", "next_retry_at"),
+        # Processing-time stats over recently completed tasks
+        Index("ix_tasks_status_completed", "status", "completed_at"),
+        # Retention skips tasks that still have subtasks
+        Index("ix_tasks_parent_task_id", "parent_task_id"),
+        # Recurring tasks coalesce into the pending one with the same key
+        Index(
+            "ux_tasks_pending_dedup_key", "dedup_key", unique=True,
+            postgresql_where=text("status = 'PENDING' AND dedup_key IS NOT NULL"),
+            sqlite_where=text("status = 'PENDING' AND dedup_key IS NOT NULL")
+        ),
+    )
+
 class AgentLog(Base):
     """Log of agent actions for debugging and analytics"""
     __tablename__ = "agent_logs"
@@ -419,6 +530,11 @@ class AgentLog(Base):
 
     created_at = Column(DateTime, default=func.now())
 
+    __table_args__ = (
+        # Retention deletes a task's logs with it
+        Index("ix_agent_logs_task_id", "task_id"),
+    )
+
 # Conversation Management Tables
 class MessageArchive(Base):
     """Archive storage for old messages"""
@@ -0,0 +1,226 @@
+# backend/database/pagination.py
+"""
+Keyset (cursor) pagination helpers
+
+Cursors are opaque, URL-safe strings wrapping the sort-key values of the
+last row on a page, e.g. (last_activity_at, id). Clients pass them back
+unchanged; the server turns them into a WHERE clause instead of an OFFSET.
+
+Also provides approximate row counts so listings don't have to run an
+exact COUNT(*) over large tables on every page.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_, func, select, text, literal_column
+from sqlalchemy.orm import Session
+
+from core.config import settings
+
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Encode sort-key values into an opaque cursor
+
+    Args:
+        *values: Sort-key values (datetimes are stored as ISO strings)
+
+    Returns:
+        URL-safe cursor string
+    """
+    payload = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, types: Sequence[Callable[[Any], Any]]) -> Tuple[Any, ...]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from the client
+        types: One converter per value, e.g. (datetime.fromisoformat, str)
+
+    Returns:
+        Tuple of converted values
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError("wrong number of values")
+        return tuple(
+            None if value is None else convert(value)
+            for convert, value in zip(types, values)
+        )
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+
+def _keyset_condition(columns: Sequence[Any], values: Sequence[Any], descending: bool):
+    """
+    Build "(c1, c2, ...) < (v1, v2, ...)" (or ">") as an OR of ANDs
+
+    Spelled out rather than using a row-value comparison so that both
+    SQLite and PostgreSQL can drive it from a leading-column index.
+    """
+    clauses = []
+    for i, (column, value) in enumerate(zip(columns, values)):
+        prefix = [c == v for c, v in zip(columns[:i], values[:i])]
+        clauses.append(and_(*prefix, column < value if descending else column > value))
+    return or_(*clauses)
+
+
+def keyset_page_query(
+    query,
+    columns: Sequence[Any],
+    types: Sequence[Callable[[Any], Any]],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True
+) -> Tuple[Any, bool, Optional[List[Any]]]:
+    """
+    The query keyset_paginate() runs for one page
+
+    Adds the cursor's keyset condition, the ORDER BY in the scan direction
+    and LIMIT limit + 1 (the extra row tells whether another page exists).
+
+    Args:
+        query: Filtered SQLAlchemy query (no ORDER BY / LIMIT)
+        columns: Sort-key columns; the last one must be unique (e.g. id)
+        types: One converter per column used to decode cursor values
+        cursor: Cursor from a previous response, or None for the first page
+        limit: Page size
+        descending: Canonical sort direction
+
+    Returns:
+        Tuple of (page query, whether it walks forward, cursor values or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    direction = "next"
+    values = None
+    if cursor:
+        direction, *values = decode_cursor(cursor, (str, *types))
+        if direction not in ("next", "prev"):
+            raise ValueError(f"Invalid cursor: unknown direction {direction!r}")
+
+    forward = direction == "next"
+    # Walking backwards means scanning the index the other way round
+    scan_descending = descending if forward else not descending
+
+    if values:
+        query = query.filter(_keyset_condition(columns, values, scan_descending))
+
+    order = [c.desc() if scan_descending else c.asc() for c in columns]
+    return query.order_by(*order).limit(limit + 1), forward, values
+
+
+def keyset_paginate(
+    query,
+    columns: Sequence[Any],
+    types: Sequence[Callable[[Any], Any]],
+    cursor: Optional[str],
+    limit: int,
+    descending: bool = True
+) -> Tuple[List[Any], Dict[str, Any]]:
+    """
+    Fetch one page of a query with bidirectional keyset pagination
+
+    The page is always returned in the canonical order (`columns`, descending
+    or ascending). `next_cursor` continues in that order, `prev_cursor` walks
+    back towards the first page. Both cursors carry their direction, so the
+    client only ever passes one of them back as `cursor`.
+
+    Args:
+        query: Filtered SQLAlchemy query (no ORDER BY / LIMIT)
+        columns: Sort-key columns; the last one must be unique (e.g. id)
+        types: One converter per column used to decode cursor values
+        cursor: Cursor from a previous response, or None for the first page
+        limit: Page size
+        descending: Canonical sort direction
+
+    Returns:
+        Tuple of (rows, pagination dict)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    page_query, forward, values = keyset_page_query(query, columns, types, cursor, limit, descending)
+    rows = page_query.all()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not forward:
+        rows.reverse()
+
+    def key_of(row):
+        return [getattr(row, c.key) for c in columns]
+
+    next_cursor = None
+    prev_cursor = None
+    if rows:
+        # Arriving through a prev cursor means a later page exists
+        if has_more or not forward:
+            next_cursor = encode_cursor("next", *key_of(rows[-1]))
+        # Anything but the first page has an earlier page
+        if (forward and values) or (not forward and has_more):
+            prev_cursor = encode_cursor("prev", *key_of(rows[0]))
+
+    return rows, {
+        "limit": limit,
+        "has_more": next_cursor is not None,
+        "next_cursor": next_cursor,
+        "prev_cursor": prev_cursor
+    }
+
+
+def count_rows(db: Session, query, mode: str) -> Dict[str, Any]:
+    """
+    Count the rows matched by a query without paying for an exact COUNT
+
+    Modes:
+        "none": skip counting
+        "exact": SELECT COUNT(*)
+        "approximate": planner row estimate on PostgreSQL; on SQLite a COUNT
+            capped at PAGINATION_APPROX_COUNT_CAP rows
+
+    Args:
+        db: Database session
+        query: Filtered SQLAlchemy query
+        mode: One of "none", "exact", "approximate"
+
+    Returns:
+        Dict with "total" and "total_is_estimate" (empty for "none")
+    """
+    if mode == "none":
+        return {}
+
+    query = query.order_by(None)
+
+    if mode == "exact":
+        return {"total": query.count(), "total_is_estimate": False}
+
+    if db.get_bind().dialect.name == "postgresql":
+        statement = query.statement.compile(
+            dialect=db.get_bind().dialect,
+            compile_kwargs={"literal_binds": True}
+        )
+        plan = db.execute(text(f"EXPLAIN (FORMAT JSON) {statement}")).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return {"total": int(plan[0]["Plan"]["Plan Rows"]), "total_is_estimate": True}
+
+    cap = settings.PAGINATION_APPROX_COUNT_CAP
+    capped = query.with_entities(literal_column("1")).limit(cap + 1).subquery()
+    total = db.execute(select(func.count()).select_from(capped)).scalar() or 0
+    if total > cap:
+        return {"total": cap, "total_is_estimate": True}
+    return {"total": total, "total_is_estimate": False}
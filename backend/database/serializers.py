@@ -0,0 +1,159 @@
+# backend/database/serializers.py
+"""
+Shared API payloads for messages, chats, appointments and files
+
+Each resource has a column tuple to select with db.query(*COLUMNS) -
+returning plain rows instead of ORM instances, so nothing is added to the
+identity map - and a to_dict function producing the API shape. The
+to_dict functions also accept ORM instances, since they only use
+attribute access.
+
+Datetimes and enums are left as-is; core.serialization.dumps (orjson)
+encodes them to the same text .isoformat() / .value would produce.
+"""
+
+from typing import Any, Dict
+
+from database.models import Message, MessageType, Chat, Appointment, FileRecord
+
+
+# ==================== Messages ====================
+
+MESSAGE_COLUMNS = (
+    Message.id,
+    Message.chat_id,
+    Message.body,
+    Message.message_type,
+    Message.from_me,
+    Message.timestamp,
+    Message.has_media,
+    Message.media_path,
+    Message.llm_processed,
+    Message.llm_response
+)
+
+
+def message_to_dict(row) -> Dict[str, Any]:
+    """Message payload from a MESSAGE_COLUMNS row or a Message"""
+    return {
+        "id": row.id,
+        "chat_id": row.chat_id,
+        "body": row.body,
+        "message_type": row.message_type or MessageType.TEXT,
+        "from_me": row.from_me,
+        "timestamp": row.timestamp,
+        "has_media": row.has_media,
+        "media_path": row.media_path,
+        "llm_processed": row.llm_processed,
+        "llm_response": row.llm_response
+    }
+
+
+# ==================== Chats ====================
+
+CHAT_LIST_COLUMNS = (
+    Chat.id,
+    Chat.name,
+    Chat.phone_number,
+    Chat.is_group,
+    Chat.ai_enabled,
+    Chat.is_whitelisted,
+    Chat.unread_count,
+    Chat.last_message_body,
+    Chat.last_message_at,
+    Chat.last_message_from_me,
+    Chat.last_activity_at,
+    Chat.updated_at
+)
+
+
+def chat_to_dict(row) -> Dict[str, Any]:
+    """Chat list payload from a CHAT_LIST_COLUMNS row or a Chat"""
+    return {
+        "id": row.id,
+        "name": row.name,
+        "phone_number": row.phone_number,
+        "is_group": row.is_group,
+        "ai_enabled": row.ai_enabled,
+        "is_whitelisted": row.is_whitelisted,
+        "unread_count": row.unread_count or 0,
+        "last_message": {
+            "body": row.last_message_body,
+            "timestamp": row.last_message_at,
+            "from_me": bool(row.last_message_from_me)
+        } if row.last_message_at else None,
+        "last_activity_at": row.last_activity_at,
+        "updated_at": row.updated_at
+    }
+
+
+# ==================== Appointments ====================
+
+APPOINTMENT_COLUMNS = (
+    Appointment.id,
+    Appointment.external_id,
+    Appointment.chat_id,
+    Appointment.customer_name,
+    Appointment.customer_phone,
+    Appointment.customer_email,
+    Appointment.title,
+    Appointment.description,
+    Appointment.service_type,
+    Appointment.appointment_date,
+    Appointment.duration_minutes,
+    Appointment.status,
+    Appointment.notes,
+    Appointment.price,
+    Appointment.created_at,
+    Appointment.updated_at
+)
+
+
+def appointment_to_dict(row) -> Dict[str, Any]:
+    """Appointment payload from an APPOINTMENT_COLUMNS row or an Appointment"""
+    return {
+        "id": row.id,
+        "external_id": row.external_id,
+        "chat_id": row.chat_id,
+        "customer_name": row.customer_name,
+        "customer_phone": row.customer_phone,
+        "customer_email": row.customer_email,
+        "title": row.title,
+        "description": row.description,
+        "service_type": row.service_type,
+        "appointment_date": row.appointment_date,
+        "duration_minutes": row.duration_minutes,
+        "status": row.status,
+        "notes": row.notes,
+        "price": row.price,
+        "created_at": row.created_at,
+        "updated_at": row.updated_at
+    }
+
+
+# ==================== Files ====================
+
+FILE_COLUMNS = (
+    FileRecord.id,
+    FileRecord.original_filename,
+    FileRecord.file_size,
+    FileRecord.mime_type,
+    FileRecord.mime_family,
+    FileRecord.created_at,
+    FileRecord.chat_id,
+    FileRecord.message_id
+)
+
+
+def file_to_dict(row) -> Dict[str, Any]:
+    """File listing payload from a FILE_COLUMNS row or a FileRecord"""
+    return {
+        "id": row.id,
+        "filename": row.original_filename,
+        "size": row.file_size,
+        "mime_type": row.mime_type,
+        "mime_family": row.mime_family,
+        "created_at": row.created_at,
+        "chat_id": row.chat_id,
+        "message_id": row.message_id
+    }
@@ -0,0 +1,93 @@
+"""
+Migration: Add denormalized last-message columns to Chat table
+
+Adds the following columns to the chats table:
+- last_message_body (Text, nullable)
+- last_message_at (DateTime, nullable)
+- last_message_from_me (Boolean, default false)
+
+and backfills them together with message_count, unread_count and
+last_activity_at, which were previously never maintained.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running chat last-message migration on {db_type} database...")
+
+    with engine.connect() as conn:
+        # Check if columns already exist
+        try:
+            conn.execute(text("SELECT last_message_at FROM chats LIMIT 1"))
+            print("✅ Columns already exist, skipping migration")
+            return
+        except Exception:
+            conn.rollback()
+            print("Columns don't exist, proceeding with migration...")
+
+        migrations = [
+            "ALTER TABLE chats ADD COLUMN last_message_body TEXT",
+            "ALTER TABLE chats ADD COLUMN last_message_at TIMESTAMP",
+            "ALTER TABLE chats ADD COLUMN last_message_from_me BOOLEAN DEFAULT FALSE",
+
+            # Backfill counters and last-message time
+            """
+            UPDATE chats SET
+                last_message_at = (SELECT MAX(m.timestamp) FROM messages m WHERE m.chat_id = chats.id),
+                message_count = (SELECT COUNT(*) FROM messages m WHERE m.chat_id = chats.id),
+                unread_count = (
+                    SELECT COUNT(*) FROM messages m
+                    WHERE m.chat_id = chats.id AND m.from_me = FALSE AND m.read_at IS NULL
+                )
+            """,
+
+            # Backfill preview from the latest message
+            """
+            UPDATE chats SET
+                last_message_body = (
+                    SELECT SUBSTR(m.body, 1, 200) FROM messages m
+                    WHERE m.chat_id = chats.id ORDER BY m.timestamp DESC LIMIT 1
+                ),
+                last_message_from_me = (
+                    SELECT m.from_me FROM messages m
+                    WHERE m.chat_id = chats.id ORDER BY m.timestamp DESC LIMIT 1
+                )
+            WHERE last_message_at IS NOT NULL
+            """,
+
+            # The chat list sorts on last_activity_at, so it must never be NULL
+            """
+            UPDATE chats SET
+                last_activity_at = COALESCE(last_message_at, updated_at, created_at, CURRENT_TIMESTAMP)
+            WHERE last_activity_at IS NULL
+               OR (last_message_at IS NOT NULL AND last_activity_at < last_message_at)
+            """,
+
+            "CREATE INDEX IF NOT EXISTS ix_chats_active_activity ON chats (is_active, last_activity_at, id)"
+        ]
+
+        for migration_sql in migrations:
+            try:
+                conn.execute(text(migration_sql))
+                conn.commit()
+                print(f"✅ Executed: {' '.join(migration_sql.split())[:60]}...")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Skipped: {' '.join(migration_sql.split())[:60]}... - {e}")
+
+        print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,64 @@
+"""
+Migration: Add composite indexes for hot query paths
+
+Creates the indexes declared in database/models.py on existing databases:
+- messages(chat_id, from_me, llm_processed)
+- messages(archived_at)
+- appointments(appointment_date, status)
+- tasks(status, priority, created_at)
+- pending_authorizations(status, expires_at)
+- conversation_history(chat_id, created_at)
+
+On PostgreSQL the indexes are built CONCURRENTLY so large tables stay writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    # messages(chat_id, timestamp) is created with id appended by migration 005
+    ("ix_messages_chat_from_me_processed", "messages", "chat_id, from_me, llm_processed"),
+    ("ix_messages_archived_at", "messages", "archived_at"),
+    ("ix_appointments_date_status", "appointments", "appointment_date, status"),
+    ("ix_tasks_status_priority_created", "tasks", "status, priority, created_at"),
+    ("ix_pending_authorizations_status_expires", "pending_authorizations", "status, expires_at"),
+    ("ix_conversation_history_chat_created", "conversation_history", "chat_id, created_at"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running index migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for index_name, table, columns in INDEXES:
+            if db_type == 'postgresql':
+                sql = f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table} ({columns})"
+            else:
+                sql = f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+
+            try:
+                conn.execute(text(sql))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+        if db_type == 'sqlite':
+            # Cheap, incremental planner statistics refresh
+            conn.execute(text("PRAGMA optimize"))
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,63 @@
+"""
+Migration: Add indexes for keyset pagination
+
+- messages(chat_id, timestamp, id) replaces messages(chat_id, timestamp) so
+  message history pages on (timestamp, id) straight from the index
+- chats(archived_at, id) for the archive listing
+
+On PostgreSQL the indexes are built CONCURRENTLY so large tables stay writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    ("ix_messages_chat_timestamp_id", "messages", "chat_id, timestamp, id"),
+    ("ix_chats_archived_at", "chats", "archived_at, id"),
+]
+
+# Superseded by the indexes above
+DROPPED_INDEXES = [
+    "ix_messages_chat_timestamp",
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running keyset pagination index migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+
+        for index_name, table, columns in INDEXES:
+            try:
+                conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+        for index_name in DROPPED_INDEXES:
+            try:
+                conn.execute(text(f"DROP INDEX {concurrently}IF EXISTS {index_name}"))
+                print(f"  🗑️  {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+        if db_type == 'sqlite':
+            conn.execute(text("PRAGMA optimize"))
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
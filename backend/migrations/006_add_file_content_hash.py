@@ -0,0 +1,52 @@
+"""
+Migration: Add content_hash column to files table
+
+Adds files.content_hash (hex SHA-256, computed while uploads are streamed to
+disk) and an index on it. Existing rows are left NULL.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running file content hash migration on {db_type} database...")
+
+    with engine.connect() as conn:
+        # Check if column already exists
+        try:
+            conn.execute(text("SELECT content_hash FROM files LIMIT 1"))
+            print("✅ Column already exists, skipping migration")
+            return
+        except Exception:
+            conn.rollback()
+            print("Column doesn't exist, proceeding with migration...")
+
+        migrations = [
+            "ALTER TABLE files ADD COLUMN content_hash VARCHAR(64)",
+            "CREATE INDEX IF NOT EXISTS ix_files_content_hash ON files (content_hash)"
+        ]
+
+        for migration_sql in migrations:
+            try:
+                conn.execute(text(migration_sql))
+                conn.commit()
+                print(f"✅ Executed: {migration_sql[:60]}...")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Skipped: {migration_sql[:60]}... - {e}")
+
+        print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,106 @@
+"""
+Migration: Move existing files and message media into the media store
+
+Adds a partial index on messages.media_path (used to count references to a
+stored blob), then moves every file and downloaded media item that is not
+yet in the content-addressed store into it, collapsing duplicate copies:
+- files rows get file_path/filename/content_hash pointing at the blob
+- messages rows get media_path pointing at the blob
+
+Rows whose file is missing on disk are left untouched. Safe to re-run:
+rows already pointing into the store are skipped.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from pathlib import Path
+
+from database.database import engine
+from sqlalchemy import text
+
+from services.media_store import media_store
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def _adopt(path_value, totals):
+    """Move one legacy file into the store, returning the blob or None if missing"""
+    source = Path(path_value)
+    if not source.is_file():
+        totals["missing"] += 1
+        return None
+
+    blob = media_store.store_path(source)
+    if blob.deduplicated:
+        totals["deduplicated"] += 1
+        totals["reclaimed_bytes"] += blob.size
+    else:
+        totals["stored"] += 1
+    return blob
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running media store migration on {db_type} database...")
+    totals = {"stored": 0, "deduplicated": 0, "missing": 0, "reclaimed_bytes": 0}
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text(
+                "CREATE INDEX IF NOT EXISTS ix_messages_media_path ON messages (media_path) "
+                "WHERE media_path IS NOT NULL"
+            ))
+            conn.commit()
+            print("✅ Executed: CREATE INDEX IF NOT EXISTS ix_messages_media_path...")
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Skipped: CREATE INDEX ix_messages_media_path... - {e}")
+
+        # Uploaded files
+        files = conn.execute(text(
+            "SELECT id, file_path, content_hash FROM files WHERE file_path IS NOT NULL"
+        )).fetchall()
+        for file_id, file_path, content_hash in files:
+            if media_store.is_blob_path(file_path):
+                continue
+            blob = _adopt(file_path, totals)
+            if blob is None:
+                continue
+            if content_hash and content_hash != blob.digest:
+                print(f"⚠️  File {file_id}: stored hash differs from content, using content hash")
+            conn.execute(
+                text("UPDATE files SET file_path = :path, filename = :digest, content_hash = :digest WHERE id = :id"),
+                {"path": str(blob.path), "digest": blob.digest, "id": file_id}
+            )
+            conn.commit()
+
+        # Media downloaded by the WhatsApp bridge
+        messages = conn.execute(text(
+            "SELECT id, media_path FROM messages WHERE media_path IS NOT NULL"
+        )).fetchall()
+        for message_id, media_path in messages:
+            if media_store.is_blob_path(media_path):
+                continue
+            blob = _adopt(media_path, totals)
+            if blob is None:
+                continue
+            conn.execute(
+                text("UPDATE messages SET media_path = :path WHERE id = :id"),
+                {"path": str(blob.path), "id": message_id}
+            )
+            conn.commit()
+
+    print(
+        f"✅ Media store: {totals['stored']} stored, {totals['deduplicated']} duplicates collapsed, "
+        f"{totals['missing']} missing on disk"
+    )
+    print(f"✅ Reclaimed {totals['reclaimed_bytes'] / (1024 * 1024):.1f} MB")
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,90 @@
+"""
+Migration: File listing filters and indexes
+
+Adds files.mime_family (image, document, video, audio, other), backfills it
+from the stored MIME type and filename, and creates the indexes used by
+the paginated file listing and per-chat usage totals.
+Safe to re-run: only rows without a family are backfilled.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+from services.file_storage import get_mime_family
+
+BACKFILL_BATCH = 5000
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def backfill_mime_family(conn):
+    """Classify rows without a family, in id-ordered batches"""
+    updated = 0
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            text(
+                "SELECT id, mime_type, original_filename FROM files "
+                "WHERE mime_family IS NULL AND id > :last_id ORDER BY id LIMIT :batch"
+            ),
+            {"last_id": last_id, "batch": BACKFILL_BATCH}
+        ).fetchall()
+        if not rows:
+            break
+
+        conn.execute(
+            text("UPDATE files SET mime_family = :family WHERE id = :id"),
+            [{"id": row[0], "family": get_mime_family(row[1], row[2])} for row in rows]
+        )
+        conn.commit()
+        updated += len(rows)
+        last_id = rows[-1][0]
+
+    print(f"✅ Backfilled mime_family on {updated} files")
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running file listing migration on {db_type} database...")
+
+    with engine.connect() as conn:
+        # Add the column unless it already exists
+        try:
+            conn.execute(text("SELECT mime_family FROM files LIMIT 1"))
+            print("Column mime_family already exists")
+        except Exception:
+            conn.rollback()
+            conn.execute(text("ALTER TABLE files ADD COLUMN mime_family VARCHAR"))
+            conn.commit()
+            print("✅ Executed: ALTER TABLE files ADD COLUMN mime_family...")
+
+        migrations = [
+            "CREATE INDEX IF NOT EXISTS ix_files_created_id ON files (created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_files_chat_created_id ON files (chat_id, created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_files_family_created_id ON files (mime_family, created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_files_message_id ON files (message_id)",
+            "CREATE INDEX IF NOT EXISTS ix_files_chat_size ON files (chat_id, file_size)"
+        ]
+
+        for migration_sql in migrations:
+            try:
+                conn.execute(text(migration_sql))
+                conn.commit()
+                print(f"✅ Executed: {migration_sql[:60]}...")
+            except Exception as e:
+                conn.rollback()
+                print(f"⚠️  Skipped: {migration_sql[:60]}... - {e}")
+
+        backfill_mime_family(conn)
+
+        print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
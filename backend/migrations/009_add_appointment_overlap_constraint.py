@@ -0,0 +1,84 @@
+"""
+Migration: Prevent overlapping active appointments (PostgreSQL)
+
+Adds an exclusion constraint so no two scheduled/confirmed appointments can
+have overlapping [appointment_date, appointment_date + duration) ranges.
+services/booking.py already serializes bookings per day; the constraint is
+a backstop for writes that bypass it.
+
+If existing rows already overlap, the constraint can't be created: the
+overlapping pairs are listed and the migration is skipped until they are
+resolved. SQLite has no exclusion constraints; there the booking service's
+writer lock is the only guard.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+CONSTRAINT_NAME = "ex_appointments_no_overlap"
+
+
+def appointment_range(alias: str = "") -> str:
+    """SQL for an appointment's [start, end) time range"""
+    prefix = f"{alias}." if alias else ""
+    return (
+        f"tsrange({prefix}appointment_date, "
+        f"{prefix}appointment_date + make_interval(mins => COALESCE({prefix}duration_minutes, 60)), '[)')"
+    )
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running appointment overlap constraint migration on {db_type} database...")
+
+    if db_type != 'postgresql':
+        print("✅ SQLite: no exclusion constraints, bookings are serialized in-process")
+        return
+
+    with engine.connect() as conn:
+        exists = conn.execute(
+            text("SELECT 1 FROM pg_constraint WHERE conname = :name"),
+            {"name": CONSTRAINT_NAME}
+        ).first()
+        if exists:
+            print("✅ Constraint already exists, skipping migration")
+            return
+
+        overlapping = conn.execute(text(f"""
+            SELECT a.id, b.id
+            FROM appointments a
+            JOIN appointments b ON a.id < b.id AND {appointment_range('a')} && {appointment_range('b')}
+            WHERE a.status IN ('SCHEDULED', 'CONFIRMED') AND b.status IN ('SCHEDULED', 'CONFIRMED')
+            LIMIT 20
+        """)).fetchall()
+        if overlapping:
+            print("⚠️  Skipped: overlapping active appointments found (up to 20 pairs shown), resolve them first:")
+            for first_id, second_id in overlapping:
+                print(f"   - appointments {first_id} and {second_id}")
+            return
+
+        try:
+            conn.execute(text(f"""
+                ALTER TABLE appointments ADD CONSTRAINT {CONSTRAINT_NAME}
+                EXCLUDE USING gist ({appointment_range()} WITH &&)
+                WHERE (status IN ('SCHEDULED', 'CONFIRMED'))
+            """))
+            conn.commit()
+            print(f"✅ Executed: ADD CONSTRAINT {CONSTRAINT_NAME}...")
+        except Exception as e:
+            conn.rollback()
+            print(f"⚠️  Skipped: ADD CONSTRAINT {CONSTRAINT_NAME}... - {e}")
+
+        print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,49 @@
+"""
+Migration: Add indexes for the appointment reminder dispatcher
+
+- appointment_reminders(is_sent, reminder_time) for the dispatcher's
+  sliding-window loads of unsent reminders
+- appointment_reminders(appointment_id) for replacing an appointment's
+  unsent reminders when it is moved or cancelled
+
+On PostgreSQL the indexes are built CONCURRENTLY so the table stays writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    ("ix_appointment_reminders_sent_time", "appointment_reminders", "is_sent, reminder_time"),
+    ("ix_appointment_reminders_appointment", "appointment_reminders", "appointment_id"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running reminder index migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+
+        for index_name, table, columns in INDEXES:
+            try:
+                conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
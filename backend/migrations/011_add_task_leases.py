@@ -0,0 +1,69 @@
+"""
+Migration: Add lease columns to the tasks table
+
+The agent task queue (tasks/task_queue.py) is the tasks table itself.
+Workers claim PENDING rows and hold a lease on them while they run:
+- tasks.lease_owner: worker that claimed the task
+- tasks.heartbeat_at: refreshed while the worker is alive
+- tasks(status, heartbeat_at) index for the expired-lease recovery sweep
+
+Existing IN_PROGRESS rows are left as they are; recovery falls back to
+their started_at, so ones orphaned by the old in-memory queue are re-queued
+on the first sweep.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+COLUMNS = [
+    ("lease_owner", "VARCHAR"),
+    ("heartbeat_at", "TIMESTAMP"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running task lease migration on {db_type} database...")
+
+    with engine.connect() as conn:
+        for col_name, col_type in COLUMNS:
+            try:
+                if db_type == 'postgresql':
+                    conn.execute(text(f"ALTER TABLE tasks ADD COLUMN IF NOT EXISTS {col_name} {col_type}"))
+                else:
+                    conn.execute(text(f"ALTER TABLE tasks ADD COLUMN {col_name} {col_type}"))
+                conn.commit()
+                print(f"  ✅ {col_name}")
+            except Exception as e:
+                conn.rollback()
+                error_msg = str(e).lower()
+                if 'duplicate' in error_msg or 'already exists' in error_msg:
+                    print(f"  ⚠️  {col_name} exists")
+                else:
+                    print(f"  ❌ {col_name}: {e}")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+        try:
+            conn.execute(text(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS ix_tasks_status_heartbeat ON tasks (status, heartbeat_at)"
+            ))
+            print("  ✅ ix_tasks_status_heartbeat")
+        except Exception as e:
+            print(f"  ❌ ix_tasks_status_heartbeat: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,73 @@
+"""
+Migration: Automatic task retries and dead-lettering
+
+- TaskStatus gains DEAD_LETTER (PostgreSQL enum value; SQLite stores the
+  name as text)
+- tasks.next_retry_at: when a FAILED task is re-queued
+- tasks(status, next_retry_at) index for the due-retry sweep
+
+FAILED tasks from before automatic retries have no retry time and would
+never be picked up again, so they are moved to DEAD_LETTER, where they can
+be replayed (POST /api/admin/tasks/dead-letter/replay) or cleaned up.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running task retry migration on {db_type} database...")
+
+    # ALTER TYPE ... ADD VALUE and CREATE INDEX CONCURRENTLY can't run in a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if db_type == 'postgresql':
+            try:
+                conn.execute(text("ALTER TYPE taskstatus ADD VALUE IF NOT EXISTS 'DEAD_LETTER'"))
+                print("  ✅ taskstatus.DEAD_LETTER")
+            except Exception as e:
+                print(f"  ❌ taskstatus.DEAD_LETTER: {e}")
+
+        try:
+            if db_type == 'postgresql':
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS next_retry_at TIMESTAMP"))
+            else:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN next_retry_at TIMESTAMP"))
+            print("  ✅ next_retry_at")
+        except Exception as e:
+            error_msg = str(e).lower()
+            if 'duplicate' in error_msg or 'already exists' in error_msg:
+                print("  ⚠️  next_retry_at exists")
+            else:
+                print(f"  ❌ next_retry_at: {e}")
+
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+        try:
+            conn.execute(text(
+                f"CREATE INDEX {concurrently}IF NOT EXISTS ix_tasks_status_next_retry ON tasks (status, next_retry_at)"
+            ))
+            print("  ✅ ix_tasks_status_next_retry")
+        except Exception as e:
+            print(f"  ❌ ix_tasks_status_next_retry: {e}")
+
+        try:
+            moved = conn.execute(text(
+                "UPDATE tasks SET status = 'DEAD_LETTER' WHERE status = 'FAILED' AND next_retry_at IS NULL"
+            )).rowcount
+            print(f"  ✅ {moved} earlier FAILED task(s) moved to DEAD_LETTER")
+        except Exception as e:
+            print(f"  ❌ Dead-lettering earlier FAILED tasks: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,46 @@
+"""
+Migration: Add index for task processing-time statistics
+
+- tasks(status, completed_at) so the stats aggregate only reads tasks
+  completed inside its window (tasks/task_stats.py)
+
+On PostgreSQL the index is built CONCURRENTLY so the table stays writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    ("ix_tasks_status_completed", "tasks", "status, completed_at"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running task stats index migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+
+        for index_name, table, columns in INDEXES:
+            try:
+                conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
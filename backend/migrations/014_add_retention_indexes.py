@@ -0,0 +1,49 @@
+"""
+Migration: Add indexes for chunked task / agent log retention
+
+- agent_logs(task_id) so each chunk's dependent logs are found without
+  scanning the table (tasks/retention.py)
+- tasks(parent_task_id) so tasks that still have subtasks are skipped
+  cheaply
+
+On PostgreSQL the indexes are built CONCURRENTLY so the tables stay writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    ("ix_agent_logs_task_id", "agent_logs", "task_id"),
+    ("ix_tasks_parent_task_id", "tasks", "parent_task_id"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running retention index migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+
+        for index_name, table, columns in INDEXES:
+            try:
+                conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
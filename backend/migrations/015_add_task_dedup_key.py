@@ -0,0 +1,58 @@
+"""
+Migration: Coalescing keys for recurring tasks
+
+- tasks.dedup_key: TaskManager.create_task merges a new task into the
+  PENDING task with the same key instead of queueing a duplicate
+- ux_tasks_pending_dedup_key: unique partial index over PENDING tasks with
+  a key, so concurrent creators can't both insert. The key is cleared when
+  a task is claimed, so only the queued task holds it.
+
+On PostgreSQL the index is built CONCURRENTLY so the table stays writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running task dedup key migration on {db_type} database...")
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        try:
+            if db_type == 'postgresql':
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN IF NOT EXISTS dedup_key VARCHAR"))
+            else:
+                conn.execute(text("ALTER TABLE tasks ADD COLUMN dedup_key VARCHAR"))
+            print("  ✅ dedup_key")
+        except Exception as e:
+            error_msg = str(e).lower()
+            if 'duplicate' in error_msg or 'already exists' in error_msg:
+                print("  ⚠️  dedup_key exists")
+            else:
+                print(f"  ❌ dedup_key: {e}")
+
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+        try:
+            conn.execute(text(
+                f"CREATE UNIQUE INDEX {concurrently}IF NOT EXISTS ux_tasks_pending_dedup_key ON tasks (dedup_key) "
+                "WHERE status = 'PENDING' AND dedup_key IS NOT NULL"
+            ))
+            print("  ✅ ux_tasks_pending_dedup_key")
+        except Exception as e:
+            print(f"  ❌ ux_tasks_pending_dedup_key: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,57 @@
+"""
+Migration: Deadline-aware dispatch and task expiry
+
+- TaskStatus gains EXPIRED (PostgreSQL enum value; SQLite stores the name
+  as text): PENDING tasks whose deadline passed before they started
+- tasks(status, priority, deadline, created_at) so the claim finds the
+  earliest deadline in a priority class with one index seek
+- tasks(status, deadline) for the overdue task sweep
+
+On PostgreSQL the indexes are built CONCURRENTLY so the table stays writable.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from sqlalchemy import text
+
+
+INDEXES = [
+    ("ix_tasks_status_priority_deadline", "tasks", "status, priority, deadline, created_at"),
+    ("ix_tasks_status_deadline", "tasks", "status, deadline"),
+]
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running task deadline migration on {db_type} database...")
+
+    # ALTER TYPE ... ADD VALUE and CREATE INDEX CONCURRENTLY can't run in a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if db_type == 'postgresql':
+            try:
+                conn.execute(text("ALTER TYPE taskstatus ADD VALUE IF NOT EXISTS 'EXPIRED'"))
+                print("  ✅ taskstatus.EXPIRED")
+            except Exception as e:
+                print(f"  ❌ taskstatus.EXPIRED: {e}")
+
+        concurrently = "CONCURRENTLY " if db_type == 'postgresql' else ""
+
+        for index_name, table, columns in INDEXES:
+            try:
+                conn.execute(text(f"CREATE INDEX {concurrently}IF NOT EXISTS {index_name} ON {table} ({columns})"))
+                print(f"  ✅ {index_name}")
+            except Exception as e:
+                print(f"  ❌ {index_name}: {e}")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
@@ -0,0 +1,54 @@
+"""
+Migration: Per-chat file usage summary
+
+Creates file_usage (file count and total bytes per chat, per MIME family
+and over all families under '*'), kept in step by the upload and delete
+endpoints (services/file_usage.py), and fills it from the files table.
+GET /api/files/usage then reads the largest chats with one index seek
+instead of aggregating every file row.
+
+Safe to re-run: the summary is rebuilt from scratch.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from database.database import engine
+from database.models import FileUsage
+from sqlalchemy import text
+
+from services.file_usage import ALL_FAMILIES
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running file usage summary migration on {db_type} database...")
+
+    # Creates the table and ix_file_usage_family_size
+    FileUsage.__table__.create(bind=engine, checkfirst=True)
+    print("  ✅ file_usage")
+
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM file_usage"))
+        per_family = conn.execute(text(
+            "INSERT INTO file_usage (chat_key, mime_family, file_count, total_size) "
+            "SELECT COALESCE(chat_id, ''), COALESCE(mime_family, 'other'), COUNT(*), COALESCE(SUM(file_size), 0) "
+            "FROM files GROUP BY COALESCE(chat_id, ''), COALESCE(mime_family, 'other')"
+        )).rowcount
+        conn.execute(text(
+            "INSERT INTO file_usage (chat_key, mime_family, file_count, total_size) "
+            "SELECT chat_key, :all_families, SUM(file_count), SUM(total_size) "
+            "FROM file_usage GROUP BY chat_key"
+        ), {"all_families": ALL_FAMILIES})
+        print(f"  ✅ Summarized files into {per_family} chat/family row(s)")
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
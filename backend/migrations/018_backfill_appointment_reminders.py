@@ -0,0 +1,79 @@
+"""
+Migration: Reminders for appointments booked before the dispatcher
+
+Reminder rows are created when an appointment is booked or moved, so
+upcoming appointments that existed before the reminder dispatcher have
+none. This creates them (services/reminders.py sync_reminders) for every
+active appointment still ahead that has no reminder rows yet, skipping
+reminder types the appointment's reminder_*_sent flags show were already
+sent. The dispatcher's next window load picks them up.
+
+Safe to re-run: appointments that have reminder rows are left alone.
+"""
+
+import sys
+sys.path.insert(0, '.')
+
+from datetime import datetime
+
+from sqlalchemy import exists
+
+from database.database import engine, SessionLocal
+from database.models import Appointment, AppointmentReminder
+from services.availability import BLOCKING_STATUSES
+from services.reminders import sync_reminders
+
+BACKFILL_BATCH = 500
+
+
+def get_db_type():
+    """Determine if we're using SQLite or PostgreSQL"""
+    return 'postgresql' if engine.dialect.name == 'postgresql' else 'sqlite'
+
+
+def backfill_reminders(db, now: datetime) -> int:
+    """Create reminder rows for upcoming active appointments without any, in id-ordered batches"""
+    created = 0
+    last_id = 0
+    while True:
+        appointments = db.query(Appointment).filter(
+            Appointment.id > last_id,
+            Appointment.status.in_(BLOCKING_STATUSES),
+            Appointment.appointment_date > now,
+            ~exists().where(AppointmentReminder.appointment_id == Appointment.id)
+        ).order_by(Appointment.id).limit(BACKFILL_BATCH).all()
+        if not appointments:
+            break
+
+        for appointment in appointments:
+            for reminder in sync_reminders(db, appointment, now):
+                if (reminder.reminder_type == "24h" and appointment.reminder_24h_sent) or \
+                        (reminder.reminder_type == "1h" and appointment.reminder_1h_sent):
+                    db.expunge(reminder)
+                else:
+                    created += 1
+        db.commit()
+        last_id = appointments[-1].id
+
+    return created
+
+
+def run_migration():
+    db_type = get_db_type()
+    print(f"Running appointment reminder backfill on {db_type} database...")
+
+    db = SessionLocal()
+    try:
+        created = backfill_reminders(db, datetime.now())
+        print(f"  ✅ Created {created} reminder(s) for upcoming appointments")
+    except Exception as e:
+        db.rollback()
+        print(f"  ❌ Reminder backfill: {e}")
+    finally:
+        db.close()
+
+    print("✅ Migration completed successfully!")
+
+
+if __name__ == "__main__":
+    run_migration()
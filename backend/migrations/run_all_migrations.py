@@ -4,6 +4,7 @@ Main migration runner - executes all pending migrations
 
 import sys
 import os
+import importlib.util
 from pathlib import Path
 
 # Add parent directory to path for imports
@@ -20,6 +21,39 @@ def get_db_type():
         return 'postgresql'
     return 'sqlite'
 
+# Numbered migration modules run after the inline column migrations below
+NUMBERED_MIGRATIONS = [
+    "003_add_chat_last_message_columns",
+    "004_add_composite_indexes",
+    "005_add_keyset_pagination_indexes",
+    "006_add_file_content_hash",
+    "007_dedup_media_store",
+    "008_add_file_listing_indexes",
+    "009_add_appointment_overlap_constraint",
+    "010_add_reminder_indexes",
+    "011_add_task_leases",
+    "012_add_task_retries",
+    "013_add_task_stats_index",
+    "014_add_retention_indexes",
+    "015_add_task_dedup_key",
+    "016_add_task_deadlines",
+    "017_add_file_usage_summary",
+    "018_backfill_appointment_reminders",
+    "019_add_message_timestamp_index",
+]
+
+def run_numbered_migrations():
+    """Run each numbered migration module's run_migration()"""
+    migrations_dir = Path(__file__).parent
+    for name in NUMBERED_MIGRATIONS:
+        try:
+            spec = importlib.util.spec_from_file_location(name, migrations_dir / f"{name}.py")
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            module.run_migration()
+        except Exception as e:
+            print(f'  ❌ {name}: {e}')
+
 def run_all_migrations():
     """Run all database migrations"""
     db_type = get_db_type()
@@ -82,7 +116,10 @@ def run_all_migrations():
                 else:
                     print(f'  ❌ {col_name}: {e}')
 
-        print("✅ All migrations completed!")
+    print("📦 Running numbered migrations...")
+    run_numbered_migrations()
+
+    print("✅ All migrations completed!")
 
 if __name__ == "__main__":
     run_all_migrations()
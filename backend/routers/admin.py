@@ -1,12 +1,127 @@
 """Admin endpoints for maintenance tasks"""
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
+from pydantic import BaseModel, Field
 from sqlalchemy import text
+from sqlalchemy.orm import Session
+from typing import List, Optional
 import os
 
-from database.database import engine
+from database.database import engine, get_db
+from database.models import Task, TaskStatus, TaskType
+from services.agent_log import get_agent_log_sink
+from services.agent_service import get_agent_service
+from tasks.retention import retention_engine
+from tasks.task_manager import TaskManager
 
 router = APIRouter()
+task_manager = TaskManager()
+
+
+class DeadLetterReplayRequest(BaseModel):
+    task_ids: Optional[List[int]] = None  # Default: all dead-lettered tasks (up to limit)
+    task_type: Optional[TaskType] = None
+    limit: int = Field(default=100, ge=1, le=1000)
+
+
+@router.get("/tasks/stats")
+async def get_task_stats(refresh: bool = False):
+    """Task counts per status and processing-time percentiles (cached for a few seconds)"""
+    try:
+        return await task_manager.get_task_stats(refresh=refresh)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/tasks/dead-letter")
+async def list_dead_letter_tasks(
+    task_type: Optional[TaskType] = None,
+    limit: int = Query(default=50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Dead-lettered tasks (out of retries), most recent first, with their last error"""
+    try:
+        query = db.query(
+            Task.id, Task.task_type, Task.chat_id, Task.retry_count,
+            Task.error_message, Task.created_at, Task.completed_at
+        ).filter(Task.status == TaskStatus.DEAD_LETTER)
+        if task_type:
+            query = query.filter(Task.task_type == task_type)
+
+        tasks = [
+            {
+                "id": row.id,
+                "type": row.task_type.value,
+                "chat_id": row.chat_id,
+                "retries": row.retry_count,
+                "error_message": row.error_message,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+                "dead_lettered_at": row.completed_at.isoformat() if row.completed_at else None,
+            }
+            for row in query.order_by(Task.id.desc()).limit(limit).all()
+        ]
+        return {"success": True, "tasks": tasks, "count": len(tasks)}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/tasks/dead-letter/replay")
+async def replay_dead_letter_tasks(request: DeadLetterReplayRequest):
+    """Re-queue dead-lettered tasks with a fresh set of retries"""
+    try:
+        replayed = await task_manager.replay_dead_letters(
+            task_ids=request.task_ids,
+            task_type=request.task_type,
+            limit=request.limit
+        )
+        return {"success": True, "replayed": len(replayed), "task_ids": replayed}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/retention/run")
+async def run_retention(
+    task_days: Optional[int] = Query(default=None, ge=1),
+    log_days: Optional[int] = Query(default=None, ge=1)
+):
+    """Delete old tasks and agent logs now (chunked, within the retention time budget)"""
+    try:
+        return await retention_engine.run(task_days=task_days, log_days=log_days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/retention")
+async def get_retention_report():
+    """Rows deleted per table by the last retention run"""
+    return {"last_run": retention_engine.last_report}
+
+
+@router.get("/workers")
+async def get_worker_pool_stats():
+    """Agent worker pool utilization (per worker and per capped task type)"""
+    agent_service = get_agent_service()
+    if not agent_service:
+        raise HTTPException(status_code=503, detail="Agent service not initialized")
+    return agent_service.get_pool_stats()
+
+
+@router.get("/agent-logs/recent")
+async def get_recent_agent_logs(
+    limit: int = Query(default=100, ge=1, le=1000),
+    task_id: Optional[int] = None,
+    action: Optional[str] = None,
+    agent_name: Optional[str] = None
+):
+    """Most recent agent actions from memory (including ones sampled out of agent_logs)"""
+    sink = get_agent_log_sink()
+    entries = [
+        {**entry, "created_at": entry["created_at"].isoformat()}
+        for entry in sink.recent(limit=limit, task_id=task_id, action=action, agent_name=agent_name)
+    ]
+    return {"success": True, "entries": entries, "count": len(entries), "sink": sink.get_stats()}
 
 @router.post("/run-migrations")
 async def run_migrations():
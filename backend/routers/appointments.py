@@ -1,12 +1,19 @@
 # backend/app/routers/appointments.py
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from pydantic import BaseModel
 
+from core.cache import versioned_response
+from core.config import settings
+from core.serialization import ORJSONResponse
 from database.database import get_db
-from database.models import Appointment, AppointmentStatus, Chat
+from database.pagination import keyset_paginate, count_rows
+from database.serializers import APPOINTMENT_COLUMNS, appointment_to_dict
+from services.availability import availability_engine
+from services.booking import booking_service, BookingConflictError
+from database.models import Appointment, AppointmentStatus
 from services.llm_service import LLMService
 
 router = APIRouter()
@@ -42,40 +49,20 @@ async def create_appointment(
     appointment_data: AppointmentCreate,
     db: Session = Depends(get_db)
 ):
-    """Create a new appointment"""
+    """
+    Create a new appointment
+
+    Rejected with 409 if it overlaps any scheduled/confirmed appointment
+    (see services/booking.py).
+    """
     try:
-        # Check for conflicts
-        conflicts = db.query(Appointment).filter(
-            Appointment.appointment_date == appointment_data.appointment_date,
-            Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-        ).all()
-        
-        if conflicts:
+        try:
+            appointment, _ = await booking_service.book(**appointment_data.dict())
+        except BookingConflictError as e:
             raise HTTPException(
-                status_code=409, 
-                detail=f"Time slot conflict. Existing appointments: {[apt.id for apt in conflicts]}"
-            )
-        
-        # Ensure chat exists
-        chat = db.query(Chat).filter(Chat.id == appointment_data.chat_id).first()
-        if not chat:
-            chat = Chat(
-                id=appointment_data.chat_id,
-                name=appointment_data.customer_name,
-                phone_number=appointment_data.customer_phone
+                status_code=409,
+                detail=f"Time slot conflict. Existing appointments: {[apt['id'] for apt in e.conflicts]}"
             )
-            db.add(chat)
-            db.commit()
-        
-        # Create appointment
-        appointment = Appointment(
-            external_id=f"apt_{int(datetime.now().timestamp())}_{appointment_data.chat_id[-4:]}",
-            **appointment_data.dict()
-        )
-        
-        db.add(appointment)
-        db.commit()
-        db.refresh(appointment)
         
         return {
             "success": True,
@@ -96,17 +83,27 @@ async def create_appointment(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/")
+@versioned_response("appointments")
 async def get_appointments(
+    request: Request,
     chat_id: Optional[str] = Query(None),
     status: Optional[AppointmentStatus] = Query(None),
     date_from: Optional[date] = Query(None),
     date_to: Optional[date] = Query(None),
-    limit: int = Query(50, le=100),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("none", pattern="^(none|approximate|exact)$"),
     db: Session = Depends(get_db)
 ):
-    """Get appointments with optional filters"""
+    """
+    Get appointments with optional filters
+
+    Ordered by appointment date and keyset-paginated on
+    (appointment_date, id): pass `next_cursor` or `prev_cursor` from the
+    response as `cursor`.
+    """
     try:
-        query = db.query(Appointment)
+        query = db.query(*APPOINTMENT_COLUMNS)
         
         if chat_id:
             query = query.filter(Appointment.chat_id == chat_id)
@@ -117,31 +114,28 @@ async def get_appointments(
         if date_to:
             query = query.filter(Appointment.appointment_date <= datetime.combine(date_to, datetime.max.time()))
         
-        appointments = query.order_by(Appointment.appointment_date).limit(limit).all()
-        
-        appointment_list = []
-        for apt in appointments:
-            appointment_list.append({
-                "id": apt.id,
-                "external_id": apt.external_id,
-                "chat_id": apt.chat_id,
-                "customer_name": apt.customer_name,
-                "customer_phone": apt.customer_phone,
-                "customer_email": apt.customer_email,
-                "title": apt.title,
-                "description": apt.description,
-                "service_type": apt.service_type,
-                "appointment_date": apt.appointment_date.isoformat(),
-                "duration_minutes": apt.duration_minutes,
-                "status": apt.status.value,
-                "notes": apt.notes,
-                "price": apt.price,
-                "created_at": apt.created_at.isoformat(),
-                "updated_at": apt.updated_at.isoformat()
-            })
+        try:
+            appointments, pagination = keyset_paginate(
+                query,
+                columns=(Appointment.appointment_date, Appointment.id),
+                types=(datetime.fromisoformat, int),
+                cursor=cursor,
+                limit=limit,
+                descending=False
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        pagination.update(count_rows(db, query, count))
         
-        return {"success": True, "appointments": appointment_list}
+        return ORJSONResponse({
+            "success": True,
+            "appointments": [appointment_to_dict(row) for row in appointments],
+            "pagination": pagination
+        })
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -157,27 +151,7 @@ async def get_appointment(
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
         
-        return {
-            "success": True,
-            "appointment": {
-                "id": appointment.id,
-                "external_id": appointment.external_id,
-                "chat_id": appointment.chat_id,
-                "customer_name": appointment.customer_name,
-                "customer_phone": appointment.customer_phone,
-                "customer_email": appointment.customer_email,
-                "title": appointment.title,
-                "description": appointment.description,
-                "service_type": appointment.service_type,
-                "appointment_date": appointment.appointment_date.isoformat(),
-                "duration_minutes": appointment.duration_minutes,
-                "status": appointment.status.value,
-                "notes": appointment.notes,
-                "price": appointment.price,
-                "created_at": appointment.created_at.isoformat(),
-                "updated_at": appointment.updated_at.isoformat()
-            }
-        }
+        return ORJSONResponse({"success": True, "appointment": appointment_to_dict(appointment)})
         
     except HTTPException:
         raise
@@ -192,33 +166,20 @@ async def update_appointment(
 ):
     """Update appointment"""
     try:
-        appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+        # Overlaps are re-checked if the time, duration or status changes
+        try:
+            appointment = await booking_service.update(
+                appointment_id, appointment_data.dict(exclude_unset=True)
+            )
+        except BookingConflictError as e:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Time slot conflict. Existing appointments: {[apt['id'] for apt in e.conflicts]}"
+            )
         
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
         
-        # Check for conflicts if date/time is being changed
-        if appointment_data.appointment_date and appointment_data.appointment_date != appointment.appointment_date:
-            conflicts = db.query(Appointment).filter(
-                Appointment.id != appointment_id,
-                Appointment.appointment_date == appointment_data.appointment_date,
-                Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-            ).all()
-            
-            if conflicts:
-                raise HTTPException(
-                    status_code=409,
-                    detail=f"Time slot conflict. Existing appointments: {[apt.id for apt in conflicts]}"
-                )
-        
-        # Update fields
-        for field, value in appointment_data.dict(exclude_unset=True).items():
-            setattr(appointment, field, value)
-        
-        appointment.updated_at = datetime.utcnow()
-        db.commit()
-        db.refresh(appointment)
-        
         return {
             "success": True,
             "message": "Appointment updated successfully",
@@ -240,17 +201,13 @@ async def cancel_appointment(
     appointment_id: int,
     db: Session = Depends(get_db)
 ):
-    """Cancel appointment"""
+    """Cancel appointment (its unsent reminders are dropped)"""
     try:
-        appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+        appointment = await booking_service.update(appointment_id, {"status": AppointmentStatus.CANCELLED})
         
         if not appointment:
             raise HTTPException(status_code=404, detail="Appointment not found")
         
-        appointment.status = AppointmentStatus.CANCELLED
-        appointment.updated_at = datetime.utcnow()
-        db.commit()
-        
         return {
             "success": True,
             "message": "Appointment cancelled successfully"
@@ -261,44 +218,79 @@ async def cancel_appointment(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def _availability_rules(db: Session, service_type: Optional[str], duration_minutes: Optional[int]):
+    """Booking rules for the availability endpoints (404 for an unknown service type)"""
+    rules = availability_engine.booking_rules(db, service_type, duration_minutes)
+    if rules is None:
+        raise HTTPException(status_code=404, detail=f"Service type '{service_type}' not found")
+    return rules
+
 @router.get("/availability/slots")
+@versioned_response("appointments", "business_hours", "service_types", max_age_seconds=60)
 async def get_available_slots(
+    request: Request,
     date_param: date = Query(..., alias="date"),
-    duration_minutes: int = Query(60),
+    duration_minutes: Optional[int] = Query(None, ge=5, le=24 * 60),
+    service_type: Optional[str] = Query(None),
     db: Session = Depends(get_db)
 ):
-    """Get available time slots for a specific date"""
+    """
+    Get available time slots for a specific date
+
+    Honors business hours and breaks, and the service type's duration and
+    advance-booking limits (an explicit duration_minutes overrides the
+    service's duration).
+    """
     try:
-        # Business hours (this could come from database configuration)
-        start_hour = 9
-        end_hour = 17
-        slot_duration = duration_minutes
-        
-        # Generate all possible slots
-        available_slots = []
-        current_datetime = datetime.combine(date_param, datetime.min.time().replace(hour=start_hour))
-        end_datetime = datetime.combine(date_param, datetime.min.time().replace(hour=end_hour))
-        
-        while current_datetime < end_datetime:
-            # Check if slot is available
-            conflicts = db.query(Appointment).filter(
-                Appointment.appointment_date <= current_datetime,
-                Appointment.appointment_date + timedelta(minutes=Appointment.duration_minutes) > current_datetime,
-                Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-            ).count()
-            
-            if conflicts == 0:
-                available_slots.append(current_datetime.strftime("%H:%M"))
-            
-            current_datetime += timedelta(minutes=slot_duration)
-        
+        rules = _availability_rules(db, service_type, duration_minutes)
+        day = availability_engine.get_availability(db, date_param, days=1, rules=rules)[0]
+
         return {
             "success": True,
             "date": date_param.isoformat(),
-            "available_slots": available_slots,
-            "duration_minutes": duration_minutes
+            "is_open": day.is_open,
+            "available_slots": [slot.strftime("%H:%M") for slot in day.slots],
+            "duration_minutes": rules.duration_minutes,
+            "service_type": rules.service_type
         }
-        
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/availability/range")
+@versioned_response("appointments", "business_hours", "service_types", max_age_seconds=60)
+async def get_availability_range(
+    request: Request,
+    start_date: date = Query(...),
+    days: int = Query(7, ge=1, le=settings.AVAILABILITY_MAX_RANGE_DAYS),
+    duration_minutes: Optional[int] = Query(None, ge=5, le=24 * 60),
+    service_type: Optional[str] = Query(None),
+    db: Session = Depends(get_db)
+):
+    """Get available time slots for each date in a range (one appointments query)"""
+    try:
+        rules = _availability_rules(db, service_type, duration_minutes)
+        availability = availability_engine.get_availability(db, start_date, days=days, rules=rules)
+
+        return {
+            "success": True,
+            "start_date": start_date.isoformat(),
+            "days": [
+                {
+                    "date": day.date.isoformat(),
+                    "is_open": day.is_open,
+                    "available_slots": [slot.strftime("%H:%M") for slot in day.slots]
+                }
+                for day in availability
+            ],
+            "duration_minutes": rules.duration_minutes,
+            "service_type": rules.service_type
+        }
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
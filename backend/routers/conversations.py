@@ -10,19 +10,24 @@ Provides REST API endpoints for:
 - Scheduled task management
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from pydantic import BaseModel
 
+from core.cache import versioned_response
+from core.config import settings
 from database.database import get_db
+from database.pagination import keyset_paginate, count_rows
 from database.models import (
     Chat, Message, MessageArchive, SyncStatus,
     Task, TaskType, TaskStatus, TaskPriority
 )
 from tasks.task_manager import TaskManager
 from tasks.scheduled_tasks import scheduled_tasks_manager
+from tasks.workflow import workflow_engine
+from services.stats_service import stats_service
 
 
 router = APIRouter(prefix="/api/conversations", tags=["conversations"])
@@ -174,6 +179,7 @@ async def unarchive_conversation(
             message.archive_reason = None
 
         db.commit()
+        stats_service.record_chat_unarchived(len(messages))
 
         return {
             "success": True,
@@ -189,21 +195,33 @@ async def unarchive_conversation(
 
 @router.get("/archives")
 async def get_archived_conversations(
-    page: int = Query(1, ge=1),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    count: str = Query("approximate", pattern="^(none|approximate|exact)$"),
     db: Session = Depends(get_db)
 ):
     """
-    Get paginated list of archived conversations
+    Get archived conversations, most recently archived first
+
+    Keyset-paginated on (archived_at, id): pass `next_cursor` or
+    `prev_cursor` from the response as `cursor`. The total is approximate
+    by default; request `count=exact` for an exact COUNT.
     """
     try:
-        offset = (page - 1) * limit
-
-        archived_chats = db.query(Chat).filter(
-            Chat.archived_at.isnot(None)
-        ).order_by(Chat.archived_at.desc()).offset(offset).limit(limit).all()
+        query = db.query(Chat).filter(Chat.archived_at.isnot(None))
+
+        try:
+            archived_chats, pagination = keyset_paginate(
+                query,
+                columns=(Chat.archived_at, Chat.id),
+                types=(datetime.fromisoformat, str),
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
 
-        total = db.query(Chat).filter(Chat.archived_at.isnot(None)).count()
+        pagination.update(count_rows(db, query, count))
 
         return {
             "success": True,
@@ -217,14 +235,11 @@ async def get_archived_conversations(
                 }
                 for chat in archived_chats
             ],
-            "pagination": {
-                "page": page,
-                "limit": limit,
-                "total": total,
-                "pages": (total + limit - 1) // limit
-            }
+            "pagination": pagination
         }
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -250,7 +265,10 @@ async def sync_messages(
                 "chat_id": request.chat_id,
                 "mode": request.mode
             },
-            priority=TaskPriority.NORMAL.value
+            priority=TaskPriority.NORMAL.value,
+            # Repeated requests update the sync still waiting to run
+            dedup_key=f"message_sync:{request.chat_id or 'all'}",
+            replace_payload=True
         )
 
         if not task:
@@ -319,7 +337,9 @@ async def cleanup_database(
                     "compress_after_days": request.compress_after_days
                 }
             },
-            priority=TaskPriority.BACKGROUND.value
+            priority=TaskPriority.BACKGROUND.value,
+            dedup_key="database_cleanup",
+            replace_payload=True
         )
 
         if not task:
@@ -336,33 +356,16 @@ async def cleanup_database(
 
 
 @router.get("/stats", response_model=DatabaseStatsResponse)
-async def get_database_stats(db: Session = Depends(get_db)):
+@versioned_response("chats", "messages", max_age_seconds=60)
+async def get_database_stats(request: Request):
     """
     Get database statistics
+
+    Served from the in-memory stats snapshot (services/stats_service.py);
+    database_size_mb is the real on-disk size as of the last reconcile.
     """
     try:
-        total_chats = db.query(Chat).count()
-        total_messages = db.query(Message).count()
-        archived_chats = db.query(Chat).filter(Chat.archived_at.isnot(None)).count()
-        archived_messages = db.query(Message).filter(Message.archived_at.isnot(None)).count()
-
-        # Get oldest and newest messages
-        oldest_msg = db.query(Message).order_by(Message.timestamp.asc()).first()
-        newest_msg = db.query(Message).order_by(Message.timestamp.desc()).first()
-
-        # Estimate database size (simplified)
-        # In production, you'd query the actual database size
-        estimated_size_mb = (total_messages * 1.5 + archived_messages * 0.5) / 1000  # Rough estimate
-
-        return DatabaseStatsResponse(
-            total_chats=total_chats,
-            total_messages=total_messages,
-            archived_chats=archived_chats,
-            archived_messages=archived_messages,
-            database_size_mb=round(estimated_size_mb, 2),
-            oldest_message=oldest_msg.timestamp if oldest_msg else None,
-            newest_message=newest_msg.timestamp if newest_msg else None
-        )
+        return DatabaseStatsResponse(**stats_service.get_database_stats())
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -490,15 +493,45 @@ async def trigger_scheduled_task(job_id: str):
 
 # ==================== Task Status ====================
 
+@router.get("/tasks/{task_id}/workflow")
+async def get_workflow_progress(
+    task_id: int,
+    db: Session = Depends(get_db)
+):
+    """
+    Progress of a task's workflow: overall completion and each step's status
+    """
+    try:
+        progress = workflow_engine.progress(db, task_id)
+
+        if progress is None:
+            raise HTTPException(status_code=404, detail="Task not found or has no workflow")
+
+        return {"success": True, "workflow": progress}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/tasks/{task_id}")
 async def get_task_status(
     task_id: int,
+    wait: float = Query(default=0, ge=0, le=settings.TASK_WAIT_MAX_SECONDS),
     db: Session = Depends(get_db)
 ):
     """
     Get status of a conversation management task
+
+    With ?wait=N the response is held until the task is completed,
+    dead-lettered, cancelled or expired, or for N seconds, whichever comes
+    first.
     """
     try:
+        if wait:
+            await task_manager.wait_for_task(task_id, timeout=wait)
+
         task = db.query(Task).filter(Task.id == task_id).first()
 
         if not task:
@@ -516,7 +549,9 @@ async def get_task_status(
                 "started_at": task.started_at.isoformat() if task.started_at else None,
                 "completed_at": task.completed_at.isoformat() if task.completed_at else None,
                 "output_data": json.loads(task.output_data) if task.output_data else None,
-                "error_message": task.error_message
+                "error_message": task.error_message,
+                "retry_count": task.retry_count,
+                "next_retry_at": task.next_retry_at.isoformat() if task.next_retry_at else None
             }
         }
 
@@ -1,104 +1,239 @@
 # app/routers/files.py
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
 from fastapi.responses import FileResponse
+from fastapi.routing import APIRoute
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 import os
-import uuid
 from pathlib import Path
-from datetime import datetime
+from typing import Optional
+from datetime import datetime, date
 
+from core.cache import versioned_response
+from core.serialization import ORJSONResponse
 from database.database import get_db
 from database.models import FileRecord
+from database.pagination import keyset_paginate, count_rows
+from database.serializers import FILE_COLUMNS, file_to_dict
+from services.stats_service import stats_service
+from services.file_storage import (
+    max_upload_bytes, UploadTooLargeError, get_file_type, get_mime_family, MIME_FAMILIES
+)
+from services.media_store import media_store
+from services.file_usage import largest_chats, record_file_added, record_file_deleted
 
-router = APIRouter()
+# Room for multipart boundaries and part headers on top of the file itself
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
 
-# Configure upload directory
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
 
-# Allowed file types
-ALLOWED_EXTENSIONS = {
-    'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp'],
-    'document': ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx'],
-    'video': ['.mp4', '.avi', '.mov', '.mkv'],
-    'audio': ['.mp3', '.wav', '.ogg', '.m4a']
-}
+class UploadSizeLimitRoute(APIRoute):
+    """
+    Route that rejects oversized request bodies before they are parsed
+
+    A Content-Length over the cap is refused up front; otherwise the body
+    is counted as it is received and the request aborted with 413 as soon
+    as it goes over, instead of after the whole upload was spooled.
+    """
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request: Request) -> Response:
+            if request.method not in ("POST", "PUT"):
+                return await handler(request)
+
+            limit = max_upload_bytes() + MULTIPART_OVERHEAD_BYTES
+            content_length = request.headers.get("content-length", "")
+            if content_length.isdigit() and int(content_length) > limit:
+                raise HTTPException(status_code=413, detail=str(UploadTooLargeError(max_upload_bytes())))
+
+            received = 0
+            receive = request.receive
+
+            async def limited_receive():
+                nonlocal received
+                message = await receive()
+                if message["type"] == "http.request":
+                    received += len(message.get("body", b""))
+                    if received > limit:
+                        raise HTTPException(status_code=413, detail=str(UploadTooLargeError(max_upload_bytes())))
+                return message
+
+            return await handler(Request(request.scope, limited_receive))
+
+        return limited_handler
+
+
+router = APIRouter(route_class=UploadSizeLimitRoute)
+
+MIME_FAMILY_PATTERN = f"^({'|'.join(MIME_FAMILIES)})$"
 
-def get_file_type(filename: str) -> str:
-    """Determine file type based on extension"""
-    ext = Path(filename).suffix.lower()
-    for file_type, extensions in ALLOWED_EXTENSIONS.items():
-        if ext in extensions:
-            return file_type
-    return 'other'
 
 @router.post("/upload")
 async def upload_file(
     file: UploadFile = File(...),
     db: Session = Depends(get_db)
 ):
-    """Upload a file and save to database"""
+    """
+    Upload a file and save to database
+
+    The content is streamed into the content-addressed media store, so
+    uploading a file that is already stored adds a record but no new blob.
+    """
     try:
-        # Generate unique filename
-        file_ext = Path(file.filename).suffix
-        unique_filename = f"{uuid.uuid4()}{file_ext}"
-        file_path = UPLOAD_DIR / unique_filename
-
-        # Save file to disk
-        contents = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(contents)
-
-        # Create database record
-        file_record = FileRecord(
-            filename=unique_filename,
-            original_filename=file.filename,
-            file_path=str(file_path),
-            file_size=len(contents),
-            mime_type=file.content_type or get_file_type(file.filename)
-        )
+        # Hold the store lock until the record referencing the blob is committed
+        async with media_store.lock:
+            try:
+                blob = await media_store.store_upload(file)
+            except UploadTooLargeError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+
+            file_record = FileRecord(
+                filename=blob.digest,
+                original_filename=file.filename,
+                file_path=str(blob.path),
+                file_size=blob.size,
+                content_hash=blob.digest,
+                mime_type=file.content_type or get_file_type(file.filename),
+                mime_family=get_mime_family(file.content_type, file.filename)
+            )
+
+            db.add(file_record)
+            record_file_added(db, file_record.chat_id, file_record.mime_family, file_record.file_size)
+            db.commit()
+            db.refresh(file_record)
 
-        db.add(file_record)
-        db.commit()
-        db.refresh(file_record)
+        stats_service.record_file_added()
 
         return {
             "id": file_record.id,
             "filename": file_record.original_filename,
             "size": file_record.file_size,
             "mime_type": file_record.mime_type,
+            "content_hash": file_record.content_hash,
+            "deduplicated": blob.deduplicated,
             "created_at": file_record.created_at.isoformat(),
             "status": "uploaded"
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Failed to upload file: {str(e)}")
 
+def _filter_files(query, mime_family: Optional[str], date_from: Optional[date], date_to: Optional[date]):
+    """Apply the family and created_at range filters shared by the file endpoints"""
+    if mime_family:
+        query = query.filter(FileRecord.mime_family == mime_family)
+    if date_from:
+        query = query.filter(FileRecord.created_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        query = query.filter(FileRecord.created_at <= datetime.combine(date_to, datetime.max.time()))
+    return query
+
+
 @router.get("/list")
-async def list_files(db: Session = Depends(get_db)):
-    """List all uploaded files"""
+@versioned_response("files")
+async def list_files(
+    request: Request,
+    chat_id: Optional[str] = Query(None),
+    message_id: Optional[str] = Query(None),
+    mime_family: Optional[str] = Query(None, pattern=MIME_FAMILY_PATTERN),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = Query(None),
+    count: str = Query("none", pattern="^(none|approximate|exact)$"),
+    db: Session = Depends(get_db)
+):
+    """
+    List uploaded files with optional filters
+
+    Newest first, keyset-paginated on (created_at, id): pass `next_cursor`
+    or `prev_cursor` from the response as `cursor`.
+    """
     try:
-        files = db.query(FileRecord).order_by(FileRecord.created_at.desc()).all()
+        query = db.query(*FILE_COLUMNS)
 
-        return {
-            "files": [
-                {
-                    "id": f.id,
-                    "filename": f.original_filename,
-                    "size": f.file_size,
-                    "mime_type": f.mime_type,
-                    "created_at": f.created_at.isoformat(),
-                    "chat_id": f.chat_id,
-                    "message_id": f.message_id
-                }
-                for f in files
-            ]
-        }
+        if chat_id:
+            query = query.filter(FileRecord.chat_id == chat_id)
+        if message_id:
+            query = query.filter(FileRecord.message_id == message_id)
+        query = _filter_files(query, mime_family, date_from, date_to)
+
+        try:
+            files, pagination = keyset_paginate(
+                query,
+                columns=(FileRecord.created_at, FileRecord.id),
+                types=(datetime.fromisoformat, int),
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        pagination.update(count_rows(db, query, count))
+
+        return ORJSONResponse({
+            "files": [file_to_dict(row) for row in files],
+            "pagination": pagination
+        })
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
+@router.get("/usage")
+@versioned_response("files")
+async def get_file_usage(
+    request: Request,
+    mime_family: Optional[str] = Query(None, pattern=MIME_FAMILY_PATTERN),
+    date_from: Optional[date] = Query(None),
+    date_to: Optional[date] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """
+    File count and total size per chat, largest first
+
+    Files not attached to a chat are grouped under chat_id null. Totals
+    come from the file_usage summary (one index seek); only a date range
+    needs an aggregate over the matching files.
+    """
+    try:
+        if not date_from and not date_to:
+            return ORJSONResponse({"chats": largest_chats(db, mime_family, limit)})
+
+        total_size = func.coalesce(func.sum(FileRecord.file_size), 0)
+        query = db.query(
+            FileRecord.chat_id,
+            func.count(FileRecord.id).label("file_count"),
+            total_size.label("total_size")
+        )
+        query = _filter_files(query, mime_family, date_from, date_to)
+
+        rows = query.group_by(FileRecord.chat_id).order_by(
+            total_size.desc(), FileRecord.chat_id
+        ).limit(limit).all()
+
+        return ORJSONResponse({
+            "chats": [
+                {"chat_id": row.chat_id, "file_count": row.file_count, "total_size": row.total_size}
+                for row in rows
+            ]
+        })
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get file usage: {str(e)}")
+
 @router.get("/download/{file_id}")
-async def download_file(file_id: int, db: Session = Depends(get_db)):
-    """Download a file by ID"""
+async def download_file(file_id: int, inline: bool = False, db: Session = Depends(get_db)):
+    """
+    Download a file by ID
+
+    Supports HTTP Range requests (206 Partial Content), so media can be
+    streamed and scrubbed; pass inline=true to display it in the browser
+    instead of downloading. The body is sent with the server's zero-copy
+    file path (ASGI pathsend) when available, else streamed in chunks.
+    """
     try:
         file_record = db.query(FileRecord).filter(FileRecord.id == file_id).first()
 
@@ -109,10 +244,17 @@ async def download_file(file_id: int, db: Session = Depends(get_db)):
         if not file_path.exists():
             raise HTTPException(status_code=404, detail="File not found on disk")
 
+        headers = {}
+        if file_record.content_hash:
+            # Content-addressed ETag keeps If-Range valid across restores/moves
+            headers["ETag"] = f'"{file_record.content_hash}"'
+
         return FileResponse(
             path=file_path,
             filename=file_record.original_filename,
-            media_type=file_record.mime_type
+            media_type=file_record.mime_type,
+            headers=headers,
+            content_disposition_type="inline" if inline else "attachment"
         )
     except HTTPException:
         raise
@@ -121,25 +263,41 @@ async def download_file(file_id: int, db: Session = Depends(get_db)):
 
 @router.delete("/delete/{file_id}")
 async def delete_file(file_id: int, db: Session = Depends(get_db)):
-    """Delete a file"""
+    """
+    Delete a file
+
+    The stored blob is only removed once no other file record or message
+    references the same content.
+    """
     try:
         file_record = db.query(FileRecord).filter(FileRecord.id == file_id).first()
 
         if not file_record:
             raise HTTPException(status_code=404, detail="File not found")
 
-        # Delete file from disk
+        original_filename = file_record.original_filename
+        content_hash = file_record.content_hash
         file_path = Path(file_record.file_path)
-        if file_path.exists():
-            file_path.unlink()
 
-        # Delete from database
-        db.delete(file_record)
-        db.commit()
+        async with media_store.lock:
+            record_file_deleted(db, file_record.chat_id, file_record.mime_family, file_record.file_size)
+            db.delete(file_record)
+            db.commit()
+
+            if content_hash and media_store.is_blob_path(str(file_path)):
+                blob_removed = media_store.release(db, content_hash)
+            else:
+                # Stored before the media store existed: not shared
+                blob_removed = file_path.exists()
+                if blob_removed:
+                    file_path.unlink()
+
+        stats_service.record_file_deleted()
 
         return {
-            "message": f"File {file_record.original_filename} deleted successfully",
-            "id": file_id
+            "message": f"File {original_filename} deleted successfully",
+            "id": file_id,
+            "blob_removed": blob_removed
         }
     except HTTPException:
         raise
@@ -1,12 +1,20 @@
 # backend/app/routers/whatsapp.py
-from fastapi import APIRouter, HTTPException, Depends, Request
-from typing import List, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends, Request, Query
+from typing import List, Dict, Any, Optional
+from datetime import datetime
 from pydantic import BaseModel
+from sqlalchemy import or_
 from sqlalchemy.orm import Session
 import json
 
+from core.cache import versioned_response
+from core.serialization import ORJSONResponse
 from database.database import get_db
+from database.pagination import keyset_paginate, count_rows
+from database.serializers import CHAT_LIST_COLUMNS, MESSAGE_COLUMNS, chat_to_dict, message_to_dict
 from services.whatsapp_service import WhatsAppService
+from services.chat_state import mark_chat_read
+from services.stats_service import stats_service
 from database.models import Chat, Message
 
 router = APIRouter()
@@ -178,51 +186,55 @@ async def send_message(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/chats")
+@versioned_response("chats", bypass_params=("fetch_from_whatsapp",))
 async def get_chats(
+    request: Request,
     db: Session = Depends(get_db),
-    fetch_from_whatsapp: bool = False
+    fetch_from_whatsapp: bool = False,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: Optional[str] = None,
+    search: Optional[str] = None
 ):
-    """Get all chats - optionally fetch fresh data from WhatsApp"""
+    """
+    Get active chats, most recently active first - optionally fetch fresh data from WhatsApp
+
+    Served from a single indexed query on the chats table using the
+    denormalized unread/last-message columns. Pass `next_cursor` (or
+    `prev_cursor`) from the response as `cursor` to move between pages.
+    """
     try:
         if fetch_from_whatsapp:
             # Fetch fresh data from WhatsApp client (requires service)
             service = get_whatsapp_service()
             await service.fetch_chats_from_whatsapp()
 
-        # Get from database
-        db_chats = db.query(Chat).filter(Chat.is_active == True).all()
-
-        chats = []
-        for chat in db_chats:
-            # Get last message
-            last_message = db.query(Message).filter(Message.chat_id == chat.id).order_by(Message.timestamp.desc()).first()
-
-            # Get unread count (messages not from me, created after last read)
-            unread_count = db.query(Message).filter(
-                Message.chat_id == chat.id,
-                Message.from_me == False,
-                Message.llm_processed == False
-            ).count()
-
-            chat_data = {
-                "id": chat.id,
-                "name": chat.name,
-                "phone_number": chat.phone_number,
-                "is_group": chat.is_group,
-                "ai_enabled": chat.ai_enabled,
-                "is_whitelisted": chat.is_whitelisted,
-                "unread_count": unread_count,
-                "last_message": {
-                    "body": last_message.body if last_message else None,
-                    "timestamp": last_message.timestamp.isoformat() if last_message else None,
-                    "from_me": last_message.from_me if last_message else False
-                } if last_message else None,
-                "updated_at": chat.updated_at.isoformat()
-            }
-            chats.append(chat_data)
-
-        return {"success": True, "chats": chats}
+        query = db.query(*CHAT_LIST_COLUMNS).filter(Chat.is_active == True)
+
+        if search:
+            query = query.filter(or_(
+                Chat.name.icontains(search, autoescape=True),
+                Chat.phone_number.icontains(search, autoescape=True)
+            ))
+
+        try:
+            db_chats, pagination = keyset_paginate(
+                query,
+                columns=(Chat.last_activity_at, Chat.id),
+                types=(datetime.fromisoformat, str),
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        return ORJSONResponse({
+            "success": True,
+            "chats": [chat_to_dict(row) for row in db_chats],
+            "pagination": pagination
+        })
 
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         error_details = traceback.format_exc()
@@ -230,6 +242,32 @@ async def get_chats(
         print(error_details)
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/chats/{chat_id}/read")
+async def mark_chat_as_read(
+    chat_id: str,
+    db: Session = Depends(get_db)
+):
+    """Mark all incoming messages in a chat as read and reset its unread counter"""
+    try:
+        chat = db.query(Chat).filter(Chat.id == chat_id).first()
+        if not chat:
+            raise HTTPException(status_code=404, detail="Chat not found")
+
+        marked = mark_chat_read(db, chat_id)
+        db.commit()
+
+        return {
+            "success": True,
+            "chat_id": chat_id,
+            "marked_read": marked
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.post("/chats/{chat_id}/toggle-ai")
 async def toggle_ai_for_chat(
     chat_id: str,
@@ -242,9 +280,13 @@ async def toggle_ai_for_chat(
         if not chat:
             raise HTTPException(status_code=404, detail="Chat not found")
 
+        was_enabled = bool(chat.ai_enabled)
         chat.ai_enabled = enabled
         db.commit()
 
+        if was_enabled != enabled:
+            stats_service.record_chat_ai_toggled(enabled, is_active=bool(chat.is_active))
+
         return {
             "success": True,
             "chat_id": chat_id,
@@ -283,81 +325,69 @@ async def toggle_whitelist_for_chat(
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/chats/{chat_id}/messages")
+@versioned_response("messages", "chats", bypass_params=("fetch_from_whatsapp",))
 async def get_chat_messages(
+    request: Request,
     chat_id: str,
-    limit: int = 50,
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    count: str = Query("none", pattern="^(none|approximate|exact)$"),
     fetch_from_whatsapp: bool = False,
     db: Session = Depends(get_db),
     service: WhatsAppService = Depends(get_whatsapp_service)
 ):
-    """Get messages from a specific chat - optionally fetch fresh data from WhatsApp"""
+    """
+    Get messages from a specific chat - optionally fetch fresh data from WhatsApp
+
+    Pages are keyset-paginated on (timestamp, id), newest page first, and
+    each page is returned oldest-to-newest. `next_cursor` pages back into
+    older history, `prev_cursor` returns towards the latest messages.
+    """
     try:
         if fetch_from_whatsapp:
             # Fetch fresh message history from WhatsApp client
             await service.fetch_chat_messages(chat_id, limit)
 
-        messages = db.query(Message).filter(Message.chat_id == chat_id).order_by(Message.timestamp.desc()).limit(limit).all()
-
-        message_list = []
-        for msg in messages:
-            message_list.append({
-                "id": msg.id,
-                "chat_id": msg.chat_id,
-                "body": msg.body,
-                "message_type": msg.message_type.value if msg.message_type else "text",
-                "from_me": msg.from_me,
-                "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
-                "has_media": msg.has_media,
-                "media_path": msg.media_path,
-                "llm_processed": msg.llm_processed,
-                "llm_response": msg.llm_response
-            })
-
-        return {"success": True, "messages": list(reversed(message_list))}
+        query = db.query(*MESSAGE_COLUMNS).filter(Message.chat_id == chat_id)
 
+        try:
+            messages, pagination = keyset_paginate(
+                query,
+                columns=(Message.timestamp, Message.id),
+                types=(datetime.fromisoformat, str),
+                cursor=cursor,
+                limit=limit
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if count == "approximate":
+            # The denormalized counter is exact enough and costs one PK lookup
+            message_count = db.query(Chat.message_count).filter(Chat.id == chat_id).scalar()
+            pagination.update({"total": message_count or 0, "total_is_estimate": True})
+        else:
+            pagination.update(count_rows(db, query, count))
+
+        # Pages are fetched newest first but returned oldest-to-newest
+        return ORJSONResponse({
+            "success": True,
+            "messages": [message_to_dict(row) for row in reversed(messages)],
+            "pagination": pagination
+        })
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats")
-async def get_stats(db: Session = Depends(get_db)):
-    """Get quick statistics for dashboard"""
+@versioned_response("chats", "messages", "appointments", "files", max_age_seconds=60)
+async def get_stats(request: Request):
+    """Get quick statistics for dashboard (served from the in-memory stats snapshot)"""
     try:
-        from datetime import datetime, timedelta
-        from database.models import Appointment, AppointmentStatus
-
-        # Count active chats
-        active_chats = db.query(Chat).filter(Chat.is_active == True).count()
-
-        # Count messages today
-        today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        messages_today = db.query(Message).filter(Message.timestamp >= today).count()
-
-        # Count upcoming appointments
-        now = datetime.now()
-        upcoming_appointments = db.query(Appointment).filter(
-            Appointment.appointment_date >= now,
-            Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-        ).count()
-
-        # Count total files
-        from database.models import FileRecord
-        total_files = db.query(FileRecord).count()
-
-        # Count AI-enabled chats
-        ai_enabled_chats = db.query(Chat).filter(
-            Chat.is_active == True,
-            Chat.ai_enabled == True
-        ).count()
-
         return {
             "success": True,
-            "stats": {
-                "active_chats": active_chats,
-                "messages_today": messages_today,
-                "upcoming_appointments": upcoming_appointments,
-                "total_files": total_files,
-                "ai_enabled_chats": ai_enabled_chats
-            }
+            "stats": stats_service.get_dashboard_stats()
         }
     except Exception as e:
         import traceback
@@ -0,0 +1,188 @@
+# backend/services/agent_log.py
+"""
+Agent Action Log Sink
+
+BaseAgent.log_action() used to add and commit an AgentLog row per call,
+three or more per task. Entries now go through a WriteBehindSink and are
+inserted in batches (same delivery guarantees: best effort, drained on
+clean shutdown).
+
+- Sampling (opt-in): AGENT_LOG_SAMPLE_RATES gives the fraction of entries
+  written per action; by default every entry is written. The decision is made per task, so a sampled task keeps all
+  of its entries for that action. Failures and errors are always written.
+- AGENT_LOG_ENABLED=False stops writing agent_logs rows entirely.
+- The last AGENT_LOG_RECENT_SIZE entries are kept in memory (whether or
+  not they were written) for the admin UI.
+"""
+
+import json
+import random
+import threading
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import AgentLog
+from services.write_behind import WriteBehindSink
+
+# Actions that are never sampled out
+ALWAYS_LOGGED_ACTIONS = frozenset({"failed", "error", "timeout"})
+
+
+class AgentLogSink:
+    """Sampled, batched AgentLog writes plus a ring of recent entries"""
+
+    def __init__(self):
+        self._sink = WriteBehindSink(
+            AgentLog,
+            name="agent_logs",
+            batch_size=settings.AGENT_LOG_BATCH_SIZE,
+            flush_interval=settings.AGENT_LOG_FLUSH_INTERVAL_SECONDS,
+            max_buffer=settings.AGENT_LOG_MAX_BUFFER
+        )
+        self._lock = threading.Lock()
+        self._recent: Deque[Dict[str, Any]] = deque(maxlen=settings.AGENT_LOG_RECENT_SIZE)
+        self._next_id = 0
+
+        self.stats = {'logged': 0, 'written': 0, 'sampled_out': 0, 'disabled': 0}
+
+    # ==================== Logging ====================
+
+    def log(
+        self,
+        task_id: Optional[int],
+        agent_name: str,
+        action: str,
+        details: Optional[Dict[str, Any]] = None,
+        duration_ms: Optional[int] = None,
+        created_at: Optional[datetime] = None,
+        db: Optional[Session] = None
+    ):
+        """
+        Record an agent action (never blocks on the database)
+
+        Args:
+            task_id: Task the action belongs to
+            agent_name: Agent type
+            action: 'started', 'completed', 'failed', 'delegated', ...
+            details: JSON-serializable details
+            duration_ms: How long the action took
+            created_at: When the action happened (default: now)
+            db: Add the row to this session, to be committed with it,
+                instead of queueing it for a batch insert
+        """
+        now = created_at or datetime.now()
+        with self._lock:
+            self._next_id += 1
+            self._recent.append({
+                "seq": self._next_id,
+                "task_id": task_id,
+                "agent_name": agent_name,
+                "action": action,
+                "details": details,
+                "duration_ms": duration_ms,
+                "created_at": now,
+            })
+            self.stats['logged'] += 1
+
+        if not settings.AGENT_LOG_ENABLED:
+            self.stats['disabled'] += 1
+            return
+
+        if not self._sampled(task_id, action):
+            self.stats['sampled_out'] += 1
+            return
+
+        row = dict(
+            task_id=task_id,
+            agent_name=agent_name,
+            action=action,
+            details=json.dumps(details, default=str) if details is not None else None,
+            duration_ms=duration_ms,
+            created_at=now
+        )
+        if db is not None:
+            db.add(AgentLog(**row))
+        else:
+            self._sink.submit(**row)
+        self.stats['written'] += 1
+
+    def _sampled(self, task_id: Optional[int], action: str) -> bool:
+        """Whether an entry is written under AGENT_LOG_SAMPLE_RATES"""
+        if action in ALWAYS_LOGGED_ACTIONS:
+            return True
+        rate = settings.AGENT_LOG_SAMPLE_RATES.get(action, 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        if task_id is None:
+            return random.random() < rate
+        # Multiplicative hash: the same tasks are kept for every sampled action
+        return ((task_id * 2654435761) % 2 ** 32) / 2 ** 32 < rate
+
+    # ==================== Recent entries ====================
+
+    def recent(
+        self,
+        limit: int = 100,
+        task_id: Optional[int] = None,
+        action: Optional[str] = None,
+        agent_name: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Most recent entries from the in-memory ring, newest first
+
+        Args:
+            limit: Maximum number of entries
+            task_id: Only this task's entries
+            action: Only this action
+            agent_name: Only this agent's entries
+        """
+        with self._lock:
+            entries = list(self._recent)
+
+        matches = []
+        for entry in reversed(entries):
+            if task_id is not None and entry["task_id"] != task_id:
+                continue
+            if action and entry["action"] != action:
+                continue
+            if agent_name and entry["agent_name"] != agent_name:
+                continue
+            matches.append(entry)
+            if len(matches) >= limit:
+                break
+        return matches
+
+    # ==================== Lifecycle ====================
+
+    def start(self):
+        """Start the background flusher"""
+        self._sink.start()
+
+    async def stop(self):
+        """Drain buffered entries and stop"""
+        await self._sink.stop()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Counters for monitoring"""
+        return {
+            **self.stats,
+            'enabled': settings.AGENT_LOG_ENABLED,
+            'sample_rates': settings.AGENT_LOG_SAMPLE_RATES,
+            'recent_size': len(self._recent),
+            'sink': self._sink.get_stats(),
+        }
+
+
+# Global instance
+agent_log_sink = AgentLogSink()
+
+
+def get_agent_log_sink() -> AgentLogSink:
+    """Get the global agent log sink"""
+    return agent_log_sink
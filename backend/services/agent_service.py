@@ -3,19 +3,73 @@
 Agent Service
 
 Central service for managing and routing tasks to appropriate agents.
-Coordinates between TaskManager and specialized agents.
+Coordinates between TaskManager and specialized agents, running queued
+tasks on a pool of concurrent workers.
 """
 
 import asyncio
+from dataclasses import dataclass
 from typing import Dict, Any, Optional, List
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from agents.base_agent import BaseAgent
 from agents.orchestrator import OrchestratorAgent
 from agents.conversation_manager import ConversationManagerAgent
 from agents.document_analyzer import DocumentAnalyzerAgent
+from core.config import settings
+from database.database import SessionLocal
 from database.models import Task, TaskType, TaskStatus
+from services.agent_log import agent_log_sink
 from services.llm_service import LLMService
+from tasks.task_events import task_events
+from tasks.task_queue import record_failure
+from tasks.workflow import workflow_engine
+
+
+@dataclass
+class WorkerStats:
+    """Utilization counters for one pool worker"""
+    worker: int
+    started_at: datetime
+    busy_seconds: float = 0.0
+    processed: int = 0
+    failed: int = 0
+    timed_out: int = 0
+    lease_lost: int = 0
+    current_task_id: Optional[int] = None
+    current_task_type: Optional[str] = None
+    busy_since: Optional[datetime] = None
+
+    def begin(self, task: Task):
+        self.current_task_id = task.id
+        self.current_task_type = task.task_type.value
+        self.busy_since = datetime.now()
+
+    def end(self, success: bool):
+        self.busy_seconds += (datetime.now() - self.busy_since).total_seconds()
+        self.processed += 1
+        if not success:
+            self.failed += 1
+        self.current_task_id = None
+        self.current_task_type = None
+        self.busy_since = None
+
+    def snapshot(self, now: datetime) -> Dict[str, Any]:
+        busy = self.busy_seconds
+        if self.busy_since:
+            busy += (now - self.busy_since).total_seconds()
+        uptime = max((now - self.started_at).total_seconds(), 1e-6)
+        return {
+            "worker": self.worker,
+            "processed": self.processed,
+            "failed": self.failed,
+            "timed_out": self.timed_out,
+            "lease_lost": self.lease_lost,
+            "busy_seconds": round(busy, 3),
+            "utilization": round(min(busy / uptime, 1.0), 3),
+            "current_task_id": self.current_task_id,
+            "current_task_type": self.current_task_type,
+        }
 
 
 class AgentService:
@@ -29,6 +83,15 @@ class AgentService:
         self._processing = False
         self._register_agents()
 
+        # Worker pool state (set up by start_processing)
+        self._queue = None
+        self._claim_lock: Optional[asyncio.Lock] = None
+        self._workers: List[asyncio.Task] = []
+        self._worker_stats: List[WorkerStats] = []
+        self._type_limits: Dict[TaskType, int] = {}
+        self._running_by_type: Dict[TaskType, int] = {}
+        self._timeouts: Dict[TaskType, int] = {}
+
     def _register_agents(self):
         """Register all available agents"""
         print("🤖 Registering agents...")
@@ -58,6 +121,7 @@ class AgentService:
         if not agent:
             error_msg = f"No agent available to handle task type: {task.task_type.value}"
             print(f"❌ {error_msg}")
+            self._fail_task(task.id, error_msg)
             return {
                 "success": False,
                 "error": error_msg,
@@ -79,6 +143,62 @@ class AgentService:
                 "response": f"An error occurred while processing: {str(e)}"
             }
 
+    def _time_out_task(self, task_id: int, timeout: int):
+        """
+        Fail a task whose agent was cancelled for running too long
+
+        Retried after a backoff like any failure, or dead-lettered when out
+        of retries. Skipped if the agent committed a final status before it
+        was cancelled.
+        """
+        error_message = f"Timed out after {timeout}s"
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(
+                Task.id == task_id,
+                Task.status == TaskStatus.IN_PROGRESS,
+                Task.lease_owner == self._queue.worker_id
+            ).first()
+            if task is None:
+                return
+            record_failure(task, error_message)
+            outcome = (task.status, task.task_type)
+            workflow_changes = workflow_engine.on_task_finished(db, task)
+            agent_log_sink.log(task_id, "agent_service", "timeout", {"timeout_seconds": timeout}, db=db)
+            db.commit()
+
+            print(f"⏱️ Task #{task_id} timed out after {timeout}s ({outcome[0].value})")
+            task_events.publish(task_id, outcome[0], outcome[1], error_message=error_message)
+            for changed_id, status in workflow_changes:
+                task_events.publish(changed_id, status)
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Failed to mark task #{task_id} timed out: {e}")
+        finally:
+            db.close()
+
+    def _fail_task(self, task_id: int, error_message: str):
+        """Dead-letter a claimed task without running it (retrying won't find an agent either)"""
+        db = SessionLocal()
+        try:
+            task = db.query(Task).filter(Task.id == task_id).first()
+            if task is None:
+                return
+            task.status = TaskStatus.DEAD_LETTER
+            task.error_message = error_message
+            task.completed_at = datetime.now()
+            workflow_changes = workflow_engine.on_task_finished(db, task)
+            db.commit()
+
+            task_events.publish(task_id, TaskStatus.DEAD_LETTER, error_message=error_message)
+            for changed_id, status in workflow_changes:
+                task_events.publish(changed_id, status)
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Failed to mark task #{task_id} failed: {e}")
+        finally:
+            db.close()
+
     async def _find_agent_for_task(self, task: Task) -> Optional[BaseAgent]:
         """
         Find the appropriate agent for a task
@@ -99,56 +219,225 @@ class AgentService:
         """Get list of registered agent types"""
         return [agent.agent_type for agent in self.agents]
 
+    # ==================== Worker pool ====================
+
     async def start_processing(self, task_manager):
         """
-        Start processing tasks from the task queue
+        Run the worker pool on the durable task queue until stopped
+
+        AGENT_WORKERS workers claim and process tasks concurrently. Types
+        listed in TASK_TYPE_CONCURRENCY are capped per process: while a
+        type is at its cap, workers claim other types instead of holding
+        one they can't run. Each running task is heartbeated so its lease
+        doesn't expire; tasks abandoned by dead workers (in any process)
+        are recovered every half lease, and failed tasks are re-queued
+        once their retry backoff has passed. A task running longer than
+        its timeout (TASK_TYPE_TIMEOUTS, else TASK_TIMEOUT_SECONDS) is
+        cancelled and failed; queued tasks past their deadline are expired.
 
         Args:
-            task_manager: TaskManager instance to get tasks from
+            task_manager: TaskManager whose task_queue to consume
         """
         if self._processing:
             print("⚠️ Agent service already processing tasks")
             return
 
         self._processing = True
-        print("🚀 Agent service started processing tasks")
+        self._queue = task_manager.task_queue
+        self._claim_lock = asyncio.Lock()
+        self._type_limits = self._load_type_limits()
+        self._running_by_type = {}
+        self._timeouts = self._load_timeouts()
+
+        now = datetime.now()
+        self._worker_stats = [WorkerStats(worker=i, started_at=now) for i in range(max(settings.AGENT_WORKERS, 1))]
+        self._workers = [asyncio.create_task(self._worker(stats)) for stats in self._worker_stats]
+        maintenance = asyncio.create_task(self._maintenance_loop())
+
+        limits = ", ".join(f"{t.value}={n}" for t, n in self._type_limits.items()) or "none"
+        print(
+            f"🚀 Agent service started {len(self._workers)} workers "
+            f"(worker {self._queue.worker_id}, type limits: {limits})"
+        )
 
-        while self._processing:
+        try:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        finally:
+            maintenance.cancel()
+
+    def _load_type_limits(self) -> Dict[TaskType, int]:
+        """TASK_TYPE_CONCURRENCY keyed by TaskType (unknown names are ignored)"""
+        limits = {}
+        for name, limit in settings.TASK_TYPE_CONCURRENCY.items():
             try:
-                # Get task ID from queue (with timeout)
-                try:
-                    task_id = await asyncio.wait_for(
-                        task_manager.task_queue.get(),
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
-                    continue
+                limits[TaskType(name)] = max(int(limit), 1)
+            except ValueError:
+                print(f"⚠️ TASK_TYPE_CONCURRENCY: unknown task type '{name}'")
+        return limits
+
+    def _load_timeouts(self) -> Dict[TaskType, int]:
+        """TASK_TYPE_TIMEOUTS keyed by TaskType (unknown names are ignored)"""
+        timeouts = {}
+        for name, timeout in settings.TASK_TYPE_TIMEOUTS.items():
+            try:
+                timeouts[TaskType(name)] = int(timeout)
+            except ValueError:
+                print(f"⚠️ TASK_TYPE_TIMEOUTS: unknown task type '{name}'")
+        return timeouts
+
+    def _timeout_for(self, task_type: TaskType) -> Optional[int]:
+        """Seconds a task of this type may run, or None for no limit"""
+        timeout = self._timeouts.get(task_type, settings.TASK_TIMEOUT_SECONDS)
+        return timeout if timeout > 0 else None
+
+    def _saturated_types(self) -> List[TaskType]:
+        """Task types at their concurrency cap"""
+        return [
+            task_type for task_type, limit in self._type_limits.items()
+            if self._running_by_type.get(task_type, 0) >= limit
+        ]
+
+    async def _worker(self, stats: WorkerStats):
+        """Claim and process tasks one at a time until the pool stops"""
+        queue = self._queue
 
-                # Get task from database
-                task = await task_manager.get_task(task_id)
+        while self._processing:
+            try:
+                # Claims are serialized so two workers can't both take the
+                # last slot of a capped type
+                async with self._claim_lock:
+                    task = await queue.claim(self._saturated_types())
+                    if task:
+                        self._running_by_type[task.task_type] = self._running_by_type.get(task.task_type, 0) + 1
 
                 if not task:
-                    print(f"⚠️ Task #{task_id} not found")
-                    continue
-
-                if task.status != TaskStatus.PENDING:
-                    print(f"⚠️ Task #{task_id} is not pending (status: {task.status.value})")
+                    await queue.wait()
                     continue
 
-                # Process the task
-                await self.process_task(task)
+                await self._run_claimed(task, stats)
 
             except Exception as e:
-                print(f"❌ Error in task processing loop: {e}")
+                print(f"❌ Error in worker {stats.worker}: {e}")
                 import traceback
                 traceback.print_exc()
                 await asyncio.sleep(1)  # Brief pause before retry
 
-    def stop_processing(self):
-        """Stop processing tasks"""
+    async def _run_claimed(self, task: Task, stats: WorkerStats):
+        """
+        Process a claimed task, heartbeating its lease meanwhile and enforcing its timeout
+
+        If the lease is lost (recovered by another worker, or the task was
+        cancelled) the agent coroutine is cancelled too, and nothing is
+        written for the task.
+        """
+        # Read before processing: the agent's commit expires the instance
+        task_id, task_type = task.id, task.task_type
+        timeout = self._timeout_for(task_type)
+        stats.begin(task)
+        task_events.publish(task_id, TaskStatus.IN_PROGRESS, task_type, worker=stats.worker)
+        work = asyncio.create_task(self.process_task(task))
+        heartbeat = asyncio.create_task(self._queue.keep_alive(task_id, on_lost=work.cancel))
+        success = False
+        try:
+            result = await asyncio.wait_for(work, timeout=timeout)
+            success = bool(result.get("success"))
+        except asyncio.TimeoutError:
+            # The agent coroutine has been cancelled; a hung LLM call no
+            # longer holds the worker
+            stats.timed_out += 1
+            self._time_out_task(task_id, timeout)
+        except asyncio.CancelledError:
+            # keep_alive() only returns once the lease is lost; otherwise
+            # this worker itself is being cancelled
+            if not heartbeat.done() or heartbeat.cancelled():
+                raise
+            stats.lease_lost += 1
+            print(f"⚠️ Abandoned task #{task_id}: its lease was lost")
+        finally:
+            heartbeat.cancel()
+            limit = self._type_limits.get(task_type)
+            was_capped = limit is not None and self._running_by_type[task_type] >= limit
+            self._running_by_type[task_type] -= 1
+            stats.end(success)
+            if was_capped:
+                # Idle workers may be skipping queued tasks of this type
+                self._queue.notify()
+
+    async def _maintenance_loop(self):
+        """Re-queue due retries and expire overdue tasks every TASK_RETRY_CHECK_SECONDS, recover expired leases every half lease"""
+        recover_every = timedelta(seconds=max(settings.TASK_LEASE_SECONDS // 2, 1))
+        next_recovery = datetime.now()
+        while True:
+            try:
+                if datetime.now() >= next_recovery:
+                    await self._queue.recover()
+                    next_recovery = datetime.now() + recover_every
+                await self._queue.requeue_due()
+                await self._queue.expire_overdue()
+            except Exception as e:
+                print(f"❌ Task queue maintenance failed: {e}")
+            await asyncio.sleep(max(settings.TASK_RETRY_CHECK_SECONDS, 1))
+
+    async def stop_processing(self, timeout: Optional[float] = None):
+        """
+        Stop claiming tasks and drain the pool
+
+        Running tasks get up to AGENT_DRAIN_TIMEOUT_SECONDS to finish; any
+        still running then are cancelled and handed back to the queue.
+
+        Args:
+            timeout: Drain timeout override in seconds
+        """
+        if not self._processing:
+            return
+
         self._processing = False
+        self._queue.notify()  # Wake idle workers so they exit
+
+        running = [worker for worker in self._workers if not worker.done()]
+        if running:
+            print(f"⏳ Draining {sum(1 for s in self._worker_stats if s.current_task_id)} running task(s)...")
+            _, unfinished = await asyncio.wait(
+                running,
+                timeout=timeout if timeout is not None else settings.AGENT_DRAIN_TIMEOUT_SECONDS
+            )
+            if unfinished:
+                held = [s.current_task_id for s in self._worker_stats if s.current_task_id]
+                for worker in unfinished:
+                    worker.cancel()
+                await asyncio.gather(*unfinished, return_exceptions=True)
+                released = await self._queue.release(held)
+                print(f"⚠️ Drain timed out: {released} running task(s) returned to the queue")
+
         print("🛑 Agent service stopped processing tasks")
 
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """
+        Worker pool utilization
+
+        Returns:
+            Per-worker busy time, utilization and counts, plus running
+            tasks per capped type
+        """
+        now = datetime.now()
+        workers = [stats.snapshot(now) for stats in self._worker_stats]
+        task_types = {
+            task_type.value: {"running": self._running_by_type.get(task_type, 0), "limit": limit}
+            for task_type, limit in self._type_limits.items()
+        }
+        for task_type, running in self._running_by_type.items():
+            task_types.setdefault(task_type.value, {"running": running, "limit": None})
+
+        return {
+            "processing": self._processing,
+            "worker_id": self._queue.worker_id if self._queue else None,
+            "size": len(workers),
+            "busy": sum(1 for worker in workers if worker["current_task_id"]),
+            "utilization": round(sum(w["utilization"] for w in workers) / len(workers), 3) if workers else 0.0,
+            "workers": workers,
+            "task_types": task_types,
+        }
+
 
 # Global instance (will be initialized with LLM service on startup)
 agent_service: Optional[AgentService] = None
@@ -0,0 +1,288 @@
+# backend/services/availability.py
+"""
+Appointment Availability Engine
+
+Computes free appointment slots for a day or a range of days from:
+- BusinessHours rows (open/close and an optional break per weekday; days
+  without a row fall back to BUSINESS_HOURS_START/END)
+- the ServiceType's duration and advance-booking limits
+- the active (scheduled/confirmed) appointments in the range
+
+The appointments for the whole range are loaded with one query and merged
+into a sorted list of disjoint busy intervals, so checking a candidate
+slot is a binary search instead of a COUNT query. Two intervals overlap
+when each starts before the other ends; back-to-back appointments don't.
+"""
+
+import bisect
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import Appointment, AppointmentStatus, BusinessHours, ServiceType
+
+# Appointment statuses that block a slot
+BLOCKING_STATUSES = (AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED)
+
+# Appointments starting this long before the range can still run into it
+MAX_APPOINTMENT_LOOKBACK = timedelta(days=1)
+
+
+def _parse_time(value: Optional[str]) -> Optional[time]:
+    """HH:MM (or HH:MM:SS) to a time, None if empty"""
+    if not value:
+        return None
+    return time.fromisoformat(value)
+
+
+@dataclass
+class DaySchedule:
+    """Working hours for one weekday"""
+    is_open: bool
+    open_time: Optional[time] = None
+    close_time: Optional[time] = None
+    break_start: Optional[time] = None
+    break_end: Optional[time] = None
+
+    def windows(self, day: date) -> List[Tuple[datetime, datetime]]:
+        """Bookable windows on a date (the day minus the break)"""
+        if not self.is_open or not self.open_time or not self.close_time:
+            return []
+
+        opens = datetime.combine(day, self.open_time)
+        closes = datetime.combine(day, self.close_time)
+        if self.break_start and self.break_end and self.break_start < self.break_end:
+            break_start = datetime.combine(day, self.break_start)
+            break_end = datetime.combine(day, self.break_end)
+            return [(start, end) for start, end in ((opens, break_start), (break_end, closes)) if start < end]
+        return [(opens, closes)] if opens < closes else []
+
+
+@dataclass
+class BookingRules:
+    """Duration and advance-booking limits for a booking"""
+    duration_minutes: int
+    advance_booking_hours: int
+    max_advance_booking_days: int
+    service_type: Optional[str] = None
+
+
+@dataclass
+class DayAvailability:
+    """Free slots on one date"""
+    date: date
+    is_open: bool
+    slots: List[datetime] = field(default_factory=list)
+
+
+class BusyIntervals:
+    """Sorted, merged [start, end) intervals with O(log n) overlap checks"""
+
+    def __init__(self, intervals: List[Tuple[datetime, datetime]]):
+        merged: List[List[datetime]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def conflict(self, start: datetime, end: datetime) -> Optional[datetime]:
+        """
+        Check [start, end) against the busy intervals
+
+        Returns:
+            End of the overlapping busy interval, or None if the span is free
+        """
+        # Last busy interval starting before `end` is the only candidate,
+        # since merged intervals are disjoint and sorted
+        index = bisect.bisect_left(self.starts, end) - 1
+        if index >= 0 and self.ends[index] > start:
+            return self.ends[index]
+        return None
+
+
+class AvailabilityEngine:
+    """Free-slot computation shared by the appointments API and the LLM tools"""
+
+    # ==================== Loading ====================
+
+    def load_schedule(self, db: Session) -> Dict[int, DaySchedule]:
+        """Working hours per weekday (0=Monday)"""
+        default = DaySchedule(
+            is_open=True,
+            open_time=_parse_time(settings.BUSINESS_HOURS_START),
+            close_time=_parse_time(settings.BUSINESS_HOURS_END)
+        )
+        schedule = {day: default for day in range(7)}
+
+        for row in db.query(BusinessHours).all():
+            schedule[row.day_of_week] = DaySchedule(
+                is_open=bool(row.is_open),
+                open_time=_parse_time(row.open_time),
+                close_time=_parse_time(row.close_time),
+                break_start=_parse_time(row.break_start),
+                break_end=_parse_time(row.break_end)
+            )
+        return schedule
+
+    def booking_rules(
+        self,
+        db: Session,
+        service_type: Optional[str] = None,
+        duration_minutes: Optional[int] = None
+    ) -> Optional[BookingRules]:
+        """
+        Resolve the duration and advance limits for a booking
+
+        An explicit duration overrides the service's.
+
+        Args:
+            db: Database session
+            service_type: ServiceType name, or None for the defaults
+            duration_minutes: Explicit duration
+
+        Returns:
+            BookingRules, or None if the service type doesn't exist or is inactive
+        """
+        if not service_type:
+            return BookingRules(
+                duration_minutes=duration_minutes or settings.DEFAULT_APPOINTMENT_DURATION,
+                advance_booking_hours=settings.DEFAULT_ADVANCE_BOOKING_HOURS,
+                max_advance_booking_days=settings.DEFAULT_MAX_ADVANCE_BOOKING_DAYS
+            )
+
+        service = db.query(ServiceType).filter(
+            ServiceType.name == service_type,
+            ServiceType.is_active == True
+        ).first()
+        if not service:
+            return None
+
+        return BookingRules(
+            duration_minutes=duration_minutes or service.duration_minutes or settings.DEFAULT_APPOINTMENT_DURATION,
+            advance_booking_hours=service.advance_booking_hours or 0,
+            max_advance_booking_days=service.max_advance_booking_days or settings.DEFAULT_MAX_ADVANCE_BOOKING_DAYS,
+            service_type=service.name
+        )
+
+    def load_busy(
+        self,
+        db: Session,
+        start: datetime,
+        end: datetime,
+        exclude_appointment_id: Optional[int] = None
+    ) -> BusyIntervals:
+        """
+        Busy intervals of the active appointments overlapping [start, end), in one query
+
+        Args:
+            db: Database session
+            start: Range start
+            end: Range end
+            exclude_appointment_id: Appointment to ignore (when rescheduling it)
+        """
+        query = db.query(Appointment.appointment_date, Appointment.duration_minutes).filter(
+            Appointment.appointment_date >= start - MAX_APPOINTMENT_LOOKBACK,
+            Appointment.appointment_date < end,
+            Appointment.status.in_(BLOCKING_STATUSES)
+        )
+        if exclude_appointment_id is not None:
+            query = query.filter(Appointment.id != exclude_appointment_id)
+
+        default_minutes = settings.DEFAULT_APPOINTMENT_DURATION
+        return BusyIntervals([
+            (starts_at, starts_at + timedelta(minutes=minutes or default_minutes))
+            for starts_at, minutes in query.all()
+        ])
+
+    # ==================== Slots ====================
+
+    def free_slots(
+        self,
+        day: date,
+        day_schedule: DaySchedule,
+        busy: BusyIntervals,
+        rules: BookingRules,
+        earliest: datetime,
+        latest: datetime
+    ) -> List[datetime]:
+        """Free slot start times on one date"""
+        duration = timedelta(minutes=rules.duration_minutes)
+        step = timedelta(minutes=settings.AVAILABILITY_SLOT_INTERVAL_MINUTES or rules.duration_minutes)
+        slots = []
+
+        for window_start, window_end in day_schedule.windows(day):
+            candidate = window_start
+            while candidate + duration <= window_end and candidate <= latest:
+                if candidate < earliest:
+                    candidate += step
+                    continue
+                busy_until = busy.conflict(candidate, candidate + duration)
+                if busy_until is None:
+                    slots.append(candidate)
+                    candidate += step
+                else:
+                    # Skip whole steps until past the busy interval
+                    skipped = -(-(busy_until - candidate) // step)
+                    candidate += step * max(skipped, 1)
+        return slots
+
+    def get_availability(
+        self,
+        db: Session,
+        start_date: date,
+        days: int = 1,
+        rules: Optional[BookingRules] = None,
+        now: Optional[datetime] = None
+    ) -> List[DayAvailability]:
+        """
+        Free slots for each date in [start_date, start_date + days)
+
+        Args:
+            db: Database session
+            start_date: First date
+            days: Number of dates
+            rules: Booking rules (defaults when None)
+            now: Current time (for the advance-booking limits)
+
+        Returns:
+            One DayAvailability per date
+        """
+        rules = rules or self.booking_rules(db)
+        now = now or datetime.now()
+        earliest = now + timedelta(hours=rules.advance_booking_hours)
+        latest = now + timedelta(days=rules.max_advance_booking_days)
+
+        range_start = datetime.combine(start_date, time.min)
+        range_end = range_start + timedelta(days=days)
+
+        schedule = self.load_schedule(db)
+        busy = self.load_busy(db, range_start, range_end)
+
+        availability = []
+        for offset in range(days):
+            day = start_date + timedelta(days=offset)
+            day_schedule = schedule[day.weekday()]
+            availability.append(DayAvailability(
+                date=day,
+                is_open=bool(day_schedule.windows(day)),
+                slots=self.free_slots(day, day_schedule, busy, rules, earliest, latest)
+            ))
+        return availability
+
+
+# Global instance
+availability_engine = AvailabilityEngine()
+
+
+def get_availability_engine() -> AvailabilityEngine:
+    """Get the global availability engine instance"""
+    return availability_engine
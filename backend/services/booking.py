@@ -0,0 +1,311 @@
+# backend/services/booking.py
+"""
+Concurrency-Safe Appointment Booking
+
+Creating or moving an appointment checks for any overlapping active
+appointment (half-open intervals, same rule as services/availability.py)
+and writes in the same serialized section, so two near-simultaneous
+requests for overlapping times can't both succeed:
+
+- PostgreSQL: the transaction takes pg_advisory_xact_lock on every day the
+  appointment touches (in date order, so no deadlocks) before checking.
+  Two overlapping appointments always share a day, so they queue on the
+  same lock. Migration 009 also adds an exclusion constraint as a backstop;
+  a violation is reported as a conflict with the overlapping appointments
+  (looked up again after the rollback).
+- SQLite: a process-wide writer lock serializes check+write+commit (the
+  engine shares one connection, and SQLite has a single writer anyway).
+
+Transient failures (deadlock, serialization failure, "database is locked",
+a concurrent insert of the same new chat) are retried with jittered
+exponential backoff. The async wrappers always run in a worker thread, so
+lock waits and backoff sleeps never block the event loop.
+"""
+
+import asyncio
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.database import SessionLocal, is_sqlite
+from database.models import Appointment, AppointmentStatus, Chat
+from services.availability import BLOCKING_STATUSES, MAX_APPOINTMENT_LOOKBACK
+from services.reminders import reminder_dispatcher, sync_reminders
+from services.stats_service import stats_service
+
+# First key of the per-day advisory locks ("APPT")
+BOOKING_LOCK_NAMESPACE = 0x41505054
+
+# Name of the PostgreSQL exclusion constraint (migration 009)
+OVERLAP_CONSTRAINT = "ex_appointments_no_overlap"
+
+
+class BookingConflictError(Exception):
+    """Raised when the requested time overlaps an active appointment"""
+
+    def __init__(self, conflicts: List[Dict[str, Any]]):
+        self.conflicts = conflicts
+        super().__init__("The requested time slot overlaps an existing appointment")
+
+
+class BookingService:
+    """Overlap-checked appointment writes, serialized per day"""
+
+    def __init__(self):
+        self._writer_lock = threading.Lock()
+
+    # ==================== Locking ====================
+
+    def _lock_days(self, db: Session, start: datetime, end: datetime):
+        """Take the advisory lock for each day [start, end) touches (PostgreSQL)"""
+        day = start.date()
+        last_day = (end - timedelta(microseconds=1)).date()
+        while day <= last_day:
+            db.execute(
+                text("SELECT pg_advisory_xact_lock(:namespace, :day)"),
+                {"namespace": BOOKING_LOCK_NAMESPACE, "day": day.toordinal()}
+            )
+            day += timedelta(days=1)
+
+    def find_conflicts(
+        self,
+        db: Session,
+        start: datetime,
+        duration_minutes: int,
+        exclude_appointment_id: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Active appointments overlapping [start, start + duration)
+
+        Returns:
+            List of {"id", "time", "duration_minutes"}
+        """
+        end = start + timedelta(minutes=duration_minutes)
+        query = db.query(Appointment.id, Appointment.appointment_date, Appointment.duration_minutes).filter(
+            Appointment.appointment_date >= start - MAX_APPOINTMENT_LOOKBACK,
+            Appointment.appointment_date < end,
+            Appointment.status.in_(BLOCKING_STATUSES)
+        )
+        if exclude_appointment_id is not None:
+            query = query.filter(Appointment.id != exclude_appointment_id)
+
+        default_minutes = settings.DEFAULT_APPOINTMENT_DURATION
+        return [
+            {"id": row.id, "time": row.appointment_date.isoformat(), "duration_minutes": row.duration_minutes}
+            for row in query.all()
+            if row.appointment_date + timedelta(minutes=row.duration_minutes or default_minutes) > start
+        ]
+
+    def _serialized(self, write, conflicts_of: Optional[Callable[[Session], List[Dict[str, Any]]]] = None):
+        """
+        Run write(db) in its own session inside the booking critical section
+
+        Retries transient lock/serialization failures; an exclusion
+        constraint violation becomes a BookingConflictError.
+
+        Args:
+            write: Does the check and write, and commits
+            conflicts_of: Lists the appointments the write overlaps, for the
+                error raised on an exclusion constraint violation
+        """
+        attempts = max(settings.BOOKING_MAX_RETRIES, 1)
+        for attempt in range(attempts):
+            db = SessionLocal()
+            try:
+                if is_sqlite:
+                    with self._writer_lock:
+                        return write(db)
+                return write(db)
+            except (IntegrityError, OperationalError) as e:
+                db.rollback()
+                if isinstance(e, IntegrityError) and OVERLAP_CONSTRAINT in str(e.orig):
+                    # The competing booking has committed by now
+                    raise BookingConflictError(conflicts_of(db) if conflicts_of else [])
+                # Lock/serialization failures, or a concurrent insert of the same chat
+                if attempt == attempts - 1:
+                    raise
+                delay = settings.BOOKING_RETRY_BASE_MS * (2 ** attempt) / 1000
+                print(f"⚠️ Booking attempt {attempt + 1} failed ({e.orig}), retrying...")
+                time.sleep(delay + random.uniform(0, delay))
+            except BaseException:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+    # ==================== Booking ====================
+
+    def book_sync(
+        self,
+        chat_id: str,
+        customer_name: str,
+        appointment_date: datetime,
+        duration_minutes: int,
+        title: str,
+        service_type: Optional[str] = None,
+        **fields
+    ) -> Tuple[Appointment, bool]:
+        """
+        Create an appointment unless it overlaps an active one
+
+        The chat is created if it doesn't exist, and the 24 h / 1 h reminders
+        are created with the appointment.
+
+        Args:
+            chat_id: Chat the appointment belongs to
+            customer_name: Customer's name
+            appointment_date: Start time
+            duration_minutes: Length
+            title: Appointment title
+            service_type: Service name
+            **fields: Other Appointment columns (customer_phone, notes, price, ...)
+
+        Returns:
+            Tuple of (detached Appointment, whether the chat was created)
+
+        Raises:
+            BookingConflictError: If the time overlaps an active appointment
+        """
+        end = appointment_date + timedelta(minutes=duration_minutes)
+        status = fields.pop("status", None) or AppointmentStatus.SCHEDULED
+
+        def write(db: Session):
+            if not is_sqlite:
+                self._lock_days(db, appointment_date, end)
+
+            conflicts = self.find_conflicts(db, appointment_date, duration_minutes)
+            if conflicts:
+                raise BookingConflictError(conflicts)
+
+            chat_created = False
+            if not db.query(Chat.id).filter(Chat.id == chat_id).first():
+                db.add(Chat(id=chat_id, name=customer_name, phone_number=fields.get("customer_phone")))
+                db.flush()
+                chat_created = True
+
+            appointment = Appointment(
+                external_id=f"apt_{int(datetime.now().timestamp())}_{chat_id[-4:]}_{uuid.uuid4().hex[:6]}",
+                chat_id=chat_id,
+                customer_name=customer_name,
+                title=title,
+                service_type=service_type,
+                appointment_date=appointment_date,
+                duration_minutes=duration_minutes,
+                status=status,
+                **fields
+            )
+            db.add(appointment)
+            db.flush()
+            reminders = sync_reminders(db, appointment)
+            db.commit()
+
+            db.refresh(appointment)
+            scheduled = [(reminder.reminder_time, reminder.id) for reminder in reminders]
+            db.expunge(appointment)
+            return appointment, chat_created, scheduled
+
+        appointment, chat_created, scheduled = self._serialized(
+            write, lambda db: self.find_conflicts(db, appointment_date, duration_minutes)
+        )
+
+        reminder_dispatcher.schedule(scheduled)
+        if chat_created:
+            stats_service.record_chat_created()
+        stats_service.record_appointment(appointment.id, appointment.appointment_date, appointment.status)
+        return appointment, chat_created
+
+    def update_sync(self, appointment_id: int, changes: Dict[str, Any]) -> Optional[Appointment]:
+        """
+        Apply changes to an appointment, re-checking overlaps if its time moves
+
+        The check runs when the result is active and its start, duration or
+        status changed; any such change also replaces the unsent reminders.
+
+        Returns:
+            Detached updated Appointment, or None if it doesn't exist
+
+        Raises:
+            BookingConflictError: If the new time overlaps an active appointment
+        """
+        # Interval checked by the last attempt, for the constraint-violation error
+        checked: Dict[str, Any] = {}
+
+        def write(db: Session):
+            appointment = db.query(Appointment).filter(Appointment.id == appointment_id).first()
+            if not appointment:
+                return None, []
+
+            start = changes.get("appointment_date") or appointment.appointment_date
+            duration = changes.get("duration_minutes") or appointment.duration_minutes or settings.DEFAULT_APPOINTMENT_DURATION
+            status = changes.get("status") or appointment.status
+            moved = (
+                start != appointment.appointment_date
+                or duration != appointment.duration_minutes
+                or status != appointment.status
+            )
+
+            if status in BLOCKING_STATUSES and moved:
+                checked.update(start=start, duration_minutes=duration)
+                if not is_sqlite:
+                    self._lock_days(db, start, start + timedelta(minutes=duration))
+                conflicts = self.find_conflicts(db, start, duration, exclude_appointment_id=appointment_id)
+                if conflicts:
+                    raise BookingConflictError(conflicts)
+
+            for field, value in changes.items():
+                setattr(appointment, field, value)
+            appointment.updated_at = datetime.utcnow()
+
+            reminders = sync_reminders(db, appointment) if moved else []
+            db.commit()
+
+            db.refresh(appointment)
+            scheduled = [(reminder.reminder_time, reminder.id) for reminder in reminders]
+            db.expunge(appointment)
+            return appointment, scheduled
+
+        def conflicts_of(db: Session) -> List[Dict[str, Any]]:
+            if not checked:
+                return []
+            return self.find_conflicts(
+                db, checked["start"], checked["duration_minutes"], exclude_appointment_id=appointment_id
+            )
+
+        appointment, scheduled = self._serialized(write, conflicts_of)
+        reminder_dispatcher.schedule(scheduled)
+        if appointment:
+            stats_service.record_appointment(appointment.id, appointment.appointment_date, appointment.status)
+        return appointment
+
+    # ==================== Async wrappers ====================
+
+    async def book(self, **kwargs) -> Tuple[Appointment, bool]:
+        """
+        Async book_sync()
+
+        Runs in a worker thread on every backend: waiting on a day lock, the
+        SQLite writer lock or a retry backoff would otherwise block the
+        event loop.
+        """
+        return await asyncio.to_thread(self.book_sync, **kwargs)
+
+    async def update(self, appointment_id: int, changes: Dict[str, Any]) -> Optional[Appointment]:
+        """Async update_sync() (see book())"""
+        return await asyncio.to_thread(self.update_sync, appointment_id, changes)
+
+
+# Global instance
+booking_service = BookingService()
+
+
+def get_booking_service() -> BookingService:
+    """Get the global booking service instance"""
+    return booking_service
@@ -0,0 +1,130 @@
+# backend/services/chat_state.py
+"""
+Denormalized chat state
+
+Keeps Chat.message_count, Chat.unread_count, Chat.last_activity_at and the
+last-message preview columns in step with the messages table, so the chat
+list can be served without per-chat aggregate queries.
+
+All helpers run inside the caller's session; the caller commits.
+"""
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import case, func, or_, update
+from sqlalchemy.orm import Session
+
+from database.models import Chat, Message
+
+# Number of characters of the last message kept on the chat row
+PREVIEW_LENGTH = 200
+
+
+def record_message_on_chat(
+    db: Session,
+    chat_id: str,
+    body: Optional[str],
+    timestamp: datetime,
+    from_me: bool
+):
+    """
+    Update chat counters and preview for a newly inserted message
+
+    Args:
+        db: Database session
+        chat_id: Chat the message belongs to
+        body: Message text
+        timestamp: Message timestamp
+        from_me: Whether the message was sent by us
+    """
+    # Counters are updated in SQL so concurrent inserts don't lose increments
+    db.execute(
+        update(Chat)
+        .where(Chat.id == chat_id)
+        .values(
+            message_count=func.coalesce(Chat.message_count, 0) + 1,
+            unread_count=func.coalesce(Chat.unread_count, 0) + (0 if from_me else 1)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+    # Only move the preview forward (history syncs can deliver old messages)
+    db.execute(
+        update(Chat)
+        .where(
+            Chat.id == chat_id,
+            or_(Chat.last_message_at.is_(None), Chat.last_message_at <= timestamp)
+        )
+        .values(
+            last_message_body=(body or "")[:PREVIEW_LENGTH],
+            last_message_at=timestamp,
+            last_message_from_me=from_me,
+            last_activity_at=timestamp
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def mark_chat_read(db: Session, chat_id: str, read_at: Optional[datetime] = None) -> int:
+    """
+    Mark all unread incoming messages of a chat as read and reset its counter
+
+    Args:
+        db: Database session
+        chat_id: Chat ID
+        read_at: Read timestamp (defaults to now)
+
+    Returns:
+        Number of messages marked as read
+    """
+    result = db.execute(
+        update(Message)
+        .where(
+            Message.chat_id == chat_id,
+            Message.from_me == False,
+            Message.read_at.is_(None)
+        )
+        .values(read_at=read_at or datetime.now())
+        .execution_options(synchronize_session=False)
+    )
+
+    db.execute(
+        update(Chat)
+        .where(Chat.id == chat_id)
+        .values(unread_count=0)
+        .execution_options(synchronize_session=False)
+    )
+
+    return result.rowcount or 0
+
+
+def mark_message_read(db: Session, message: Message, read_at: Optional[datetime] = None) -> bool:
+    """
+    Mark a single message as read, decrementing its chat's unread counter
+
+    Args:
+        db: Database session
+        message: Message to mark
+        read_at: Read timestamp (defaults to now)
+
+    Returns:
+        True if the message was previously unread
+    """
+    if message.read_at is not None:
+        return False
+
+    message.read_at = read_at or datetime.now()
+
+    if not message.from_me:
+        db.execute(
+            update(Chat)
+            .where(Chat.id == message.chat_id)
+            .values(unread_count=case(
+                (Chat.unread_count > 0, Chat.unread_count - 1),
+                else_=0
+            ))
+            .execution_options(synchronize_session=False)
+        )
+
+    return True
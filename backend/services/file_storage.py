@@ -0,0 +1,123 @@
+# backend/services/file_storage.py
+"""
+File Storage
+
+Streams uploads to disk in fixed-size chunks, hashing (SHA-256) as it goes
+and enforcing a size cap, without ever holding the whole file in memory.
+Disk writes and hashing run in a worker thread so the event loop is free
+while large media is being stored.
+
+Also classifies files into the families (image, document, video, audio,
+other) stored in files.mime_family for filtering.
+"""
+
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import BinaryIO, Optional, Tuple
+
+from fastapi import UploadFile
+
+from core.config import settings
+
+
+# Allowed file types
+ALLOWED_EXTENSIONS = {
+    'image': ['.jpg', '.jpeg', '.png', '.gif', '.webp'],
+    'document': ['.pdf', '.doc', '.docx', '.txt', '.xls', '.xlsx'],
+    'video': ['.mp4', '.avi', '.mov', '.mkv'],
+    'audio': ['.mp3', '.wav', '.ogg', '.m4a']
+}
+
+MIME_FAMILIES = ('image', 'document', 'video', 'audio', 'other')
+
+DOCUMENT_MIME_PREFIXES = (
+    'text/',
+    'application/pdf',
+    'application/msword',
+    'application/vnd.ms-',
+    'application/vnd.openxmlformats-officedocument',
+)
+
+
+def get_file_type(filename: str) -> str:
+    """Determine file type based on extension"""
+    ext = Path(filename).suffix.lower()
+    for file_type, extensions in ALLOWED_EXTENSIONS.items():
+        if ext in extensions:
+            return file_type
+    return 'other'
+
+
+def get_mime_family(mime_type: Optional[str], filename: Optional[str] = None) -> str:
+    """
+    Classify a file into one of MIME_FAMILIES
+
+    Uses the MIME type (a full type like image/png, or a family name that
+    older uploads stored directly) and falls back to the file extension.
+    """
+    mime = (mime_type or '').lower()
+    top_level = mime.split('/', 1)[0]
+    if top_level in ('image', 'video', 'audio'):
+        return top_level
+    if mime == 'document' or mime.startswith(DOCUMENT_MIME_PREFIXES):
+        return 'document'
+    if filename:
+        return get_file_type(filename)
+    return 'other'
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size cap"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB")
+
+
+def max_upload_bytes() -> int:
+    """Configured upload size cap in bytes"""
+    return settings.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+
+
+def _write_chunk(out: BinaryIO, hasher, chunk: bytes):
+    hasher.update(chunk)
+    out.write(chunk)
+
+
+async def save_upload(upload: UploadFile, destination: Path, max_bytes: int = None) -> Tuple[int, str]:
+    """
+    Stream an upload to disk, hashing it on the way
+
+    The partial file is removed if the cap is exceeded or anything fails.
+
+    Args:
+        upload: Incoming upload
+        destination: Path to write to
+        max_bytes: Size cap (defaults to MAX_UPLOAD_SIZE_MB)
+
+    Returns:
+        Tuple of (size in bytes, hex SHA-256 digest)
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    max_bytes = max_bytes or max_upload_bytes()
+    chunk_size = settings.UPLOAD_CHUNK_SIZE_KB * 1024
+    hasher = hashlib.sha256()
+    size = 0
+
+    out = await asyncio.to_thread(open, destination, "wb")
+    try:
+        while chunk := await upload.read(chunk_size):
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(max_bytes)
+            await asyncio.to_thread(_write_chunk, out, hasher, chunk)
+    except BaseException:
+        await asyncio.to_thread(out.close)
+        destination.unlink(missing_ok=True)
+        raise
+
+    await asyncio.to_thread(out.close)
+    return size, hasher.hexdigest()
@@ -0,0 +1,96 @@
+# backend/services/file_usage.py
+"""
+Per-chat file usage
+
+Keeps the file_usage summary (file count and total bytes per chat, per
+MIME family and in total) in step with the files table, so the usage
+endpoint reads the largest chats with one index seek instead of
+aggregating every file row.
+
+The helpers run inside the caller's session; the caller commits, so the
+summary changes together with the file row.
+"""
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from database.models import FileUsage
+
+# mime_family of the row holding a chat's totals over all families
+ALL_FAMILIES = "*"
+
+
+def _chat_key(chat_id: Optional[str]) -> str:
+    return chat_id or ""
+
+
+def _add(db: Session, chat_key: str, mime_family: str, files: int, size: int):
+    """Add to one summary row, creating it on first use"""
+    where = (FileUsage.chat_key == chat_key, FileUsage.mime_family == mime_family)
+    changed = db.execute(
+        update(FileUsage)
+        .where(*where)
+        .values(file_count=FileUsage.file_count + files, total_size=FileUsage.total_size + size)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if changed:
+        if files < 0:
+            db.execute(delete(FileUsage).where(*where, FileUsage.file_count <= 0))
+        return
+    if files < 0:
+        return  # Nothing recorded for this chat (file stored before the summary existed)
+
+    try:
+        with db.begin_nested():
+            db.add(FileUsage(chat_key=chat_key, mime_family=mime_family, file_count=files, total_size=size))
+    except IntegrityError:
+        # Created concurrently: add to theirs
+        _add(db, chat_key, mime_family, files, size)
+
+
+def record_file_added(db: Session, chat_id: Optional[str], mime_family: Optional[str], size: Optional[int]):
+    """
+    Count a newly inserted file
+
+    Args:
+        db: Database session
+        chat_id: Chat the file is attached to (None if none)
+        mime_family: File's MIME family
+        size: File size in bytes
+    """
+    chat_key = _chat_key(chat_id)
+    _add(db, chat_key, mime_family or "other", 1, size or 0)
+    _add(db, chat_key, ALL_FAMILIES, 1, size or 0)
+
+
+def record_file_deleted(db: Session, chat_id: Optional[str], mime_family: Optional[str], size: Optional[int]):
+    """Uncount a deleted file (rows reaching zero files are removed)"""
+    chat_key = _chat_key(chat_id)
+    _add(db, chat_key, mime_family or "other", -1, -(size or 0))
+    _add(db, chat_key, ALL_FAMILIES, -1, -(size or 0))
+
+
+def largest_chats(db: Session, mime_family: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    """
+    Chats by total file size, largest first
+
+    Args:
+        db: Database session
+        mime_family: Only count files of this family
+        limit: Maximum chats returned
+
+    Returns:
+        chat_id (None for files not attached to a chat), file_count and
+        total_size per chat
+    """
+    rows = db.query(FileUsage.chat_key, FileUsage.file_count, FileUsage.total_size).filter(
+        FileUsage.mime_family == (mime_family or ALL_FAMILIES)
+    ).order_by(FileUsage.total_size.desc(), FileUsage.chat_key.desc()).limit(limit).all()
+
+    return [
+        {"chat_id": row.chat_key or None, "file_count": row.file_count, "total_size": row.total_size}
+        for row in rows
+    ]
@@ -9,9 +9,10 @@ import google.generativeai as genai
 from google.generativeai.types import HarmCategory, HarmBlockThreshold
 
 from core.config import settings
-from database.models import LLMProvider, ConversationHistory
+from database.models import LLMProvider
 from database.database import get_db
 from services.user_service import UserService
+from services.write_behind import conversation_history_sink
 
 class LLMService:
     """
@@ -612,11 +613,15 @@ IMPORTANT: Security is the TOP priority. When in doubt, use the unauthorized mes
         provider: LLMProvider,
         response_time_ms: int
     ):
-        """Save conversation to database"""
+        """
+        Queue conversation for the history sink
+
+        Returns immediately; the row is written in a later batch, so the reply
+        can be sent before it is durable (see services/write_behind.py for the
+        delivery guarantees).
+        """
         try:
-            db = next(get_db())
-            
-            history_record = ConversationHistory(
+            conversation_history_sink.submit(
                 chat_id=chat_id,
                 user_input=user_input,
                 llm_response=llm_response,
@@ -624,12 +629,8 @@ IMPORTANT: Security is the TOP priority. When in doubt, use the unauthorized mes
                 model_name=self.ollama_model if provider == LLMProvider.OLLAMA else self.gemini_model,
                 response_time_ms=response_time_ms
             )
-            
-            db.add(history_record)
-            db.commit()
-            
         except Exception as e:
-            print(f"Error saving conversation history: {e}")
+            print(f"Error queueing conversation history: {e}")
     
     async def get_status(self) -> Dict[str, Any]:
         """Get LLM service status"""
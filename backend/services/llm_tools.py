@@ -10,7 +10,9 @@ from datetime import datetime
 
 from services.authorization_service import AuthorizationService
 from database.database import SessionLocal
-from database.models import Appointment, Chat, Message, SystemConfig
+from services.availability import availability_engine
+from services.booking import booking_service, BookingConflictError
+from database.models import Chat, Message, SystemConfig
 
 
 class SecureLLMTools:
@@ -209,55 +211,30 @@ class SecureLLMTools:
         Returns:
             Dictionary with status and appointment details or error
         """
-        db = SessionLocal()
         try:
             # Combine date and time into datetime
             appointment_datetime = datetime.fromisoformat(f"{appointment_date}T{appointment_time}:00")
 
-            # Check for conflicts
-            from database.models import AppointmentStatus
-            conflicts = db.query(Appointment).filter(
-                Appointment.appointment_date == appointment_datetime,
-                Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-            ).all()
-
-            if conflicts:
+            # Overlap check and insert are serialized (see services/booking.py)
+            try:
+                appointment, _ = await booking_service.book(
+                    chat_id=chat_id,
+                    customer_name=customer_name,
+                    customer_phone=customer_phone,
+                    title=f"{service_type} Appointment",
+                    service_type=service_type,
+                    appointment_date=appointment_datetime,
+                    duration_minutes=duration_minutes,
+                    notes=notes
+                )
+            except BookingConflictError as e:
                 # Suggest alternative times
                 return {
                     "status": "conflict",
                     "message": f"⚠️ The requested time slot is not available. Please choose a different time.",
-                    "conflicting_appointments": [{"id": apt.id, "time": apt.appointment_date.isoformat()} for apt in conflicts]
+                    "conflicting_appointments": [{"id": apt["id"], "time": apt["time"]} for apt in e.conflicts]
                 }
 
-            # Ensure chat exists
-            chat = db.query(Chat).filter(Chat.id == chat_id).first()
-            if not chat:
-                chat = Chat(
-                    id=chat_id,
-                    name=customer_name,
-                    phone_number=customer_phone
-                )
-                db.add(chat)
-                db.flush()
-
-            # Create appointment
-            appointment = Appointment(
-                external_id=f"apt_{int(datetime.now().timestamp())}_{chat_id[-4:]}",
-                chat_id=chat_id,
-                customer_name=customer_name,
-                customer_phone=customer_phone,
-                title=f"{service_type} Appointment",
-                service_type=service_type,
-                appointment_date=appointment_datetime,
-                duration_minutes=duration_minutes,
-                notes=notes,
-                status=AppointmentStatus.SCHEDULED
-            )
-
-            db.add(appointment)
-            db.commit()
-            db.refresh(appointment)
-
             return {
                 "status": "success",
                 "message": f"✅ Appointment confirmed for {appointment_date} at {appointment_time}",
@@ -278,62 +255,45 @@ class SecureLLMTools:
                 "message": f"❌ Invalid date/time format: {str(e)}"
             }
         except Exception as e:
-            db.rollback()
             return {
                 "status": "error",
                 "message": f"❌ Failed to create appointment: {str(e)}"
             }
-        finally:
-            db.close()
 
     async def check_availability(
         self,
         date: str,
-        duration_minutes: int = 60
+        duration_minutes: Optional[int] = None,
+        service_type: Optional[str] = None
     ) -> Dict[str, Any]:
         """
         Check available time slots for a date (NO AUTH REQUIRED)
 
         Args:
             date: Date in YYYY-MM-DD format
-            duration_minutes: Appointment duration to check
+            duration_minutes: Appointment duration to check (defaults to the service's)
+            service_type: Service name; unknown services use the default rules
 
         Returns:
             Dictionary with available time slots
         """
         db = SessionLocal()
         try:
-            from datetime import timedelta
-            from database.models import AppointmentStatus
-
-            # Business hours
-            start_hour = 9
-            end_hour = 17
-
-            # Generate all possible slots
-            available_slots = []
-            date_obj = datetime.fromisoformat(date)
-            current_datetime = date_obj.replace(hour=start_hour, minute=0, second=0)
-            end_datetime = date_obj.replace(hour=end_hour, minute=0, second=0)
-
-            while current_datetime < end_datetime:
-                # Check if slot is available
-                conflicts = db.query(Appointment).filter(
-                    Appointment.appointment_date <= current_datetime,
-                    Appointment.appointment_date >= current_datetime - timedelta(minutes=duration_minutes),
-                    Appointment.status.in_([AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED])
-                ).count()
-
-                if conflicts == 0:
-                    available_slots.append(current_datetime.strftime("%H:%M"))
+            rules = availability_engine.booking_rules(db, service_type, duration_minutes)
+            if rules is None:
+                rules = availability_engine.booking_rules(db, None, duration_minutes)
 
-                current_datetime += timedelta(minutes=duration_minutes)
+            day = availability_engine.get_availability(
+                db, datetime.fromisoformat(date).date(), days=1, rules=rules
+            )[0]
+            available_slots = [slot.strftime("%H:%M") for slot in day.slots]
 
             return {
                 "status": "success",
                 "date": date,
                 "available_slots": available_slots,
-                "total_slots": len(available_slots)
+                "total_slots": len(available_slots),
+                "duration_minutes": rules.duration_minutes
             }
 
         except Exception as e:
@@ -426,7 +386,7 @@ TOOL_REGISTRY = {
             "name": "check_availability",
             "description": "Check available time slots for a specific date",
             "requires_auth": False,
-            "parameters": ["date", "duration_minutes?"]
+            "parameters": ["date", "duration_minutes?", "service_type?"]
         }
     ],
     "protected_tools": [
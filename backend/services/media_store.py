@@ -0,0 +1,184 @@
+# backend/services/media_store.py
+"""
+Content-Addressed Media Store
+
+Every uploaded file and every piece of media downloaded by the WhatsApp
+bridge is stored once, under its SHA-256:
+
+    <MEDIA_STORE_PATH>/ab/cd/abcdef0123...
+
+Storing content that is already present just drops the new copy, so a PDF
+forwarded into ten chats occupies disk once. FileRecord.file_path and
+Message.media_path point at the shared blob.
+
+Blobs are reference counted from the database: a blob is referenced by
+files rows with its content_hash and by messages rows whose media_path is
+its path. release() removes it only when neither remains. Deriving the
+count from the rows (rather than a stored counter) means it can't drift.
+
+Callers must hold `media_store.lock` from storing a blob until the row
+referencing it is committed, and from deleting a row until release()
+returns, so a blob can't be released between being deduplicated against
+and being referenced. The lock is per process.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.models import FileRecord, Message
+from services.file_storage import save_upload
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+@dataclass
+class StoredBlob:
+    """Result of storing content in the media store"""
+    digest: str
+    size: int
+    path: Path
+    deduplicated: bool  # True if the content was already stored
+
+
+def hash_file(path: Path) -> str:
+    """Hex SHA-256 of a file, read in chunks"""
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+class MediaStore:
+    """SHA-256 sharded, single-copy blob store"""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.tmp_dir = self.root / "tmp"
+        self._lock: Optional[asyncio.Lock] = None
+
+    @property
+    def lock(self) -> asyncio.Lock:
+        """Serializes store+commit against delete+release (see module docstring)"""
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def blob_path(self, digest: str) -> Path:
+        """Path of the blob for a digest"""
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def is_blob_path(self, path: str) -> bool:
+        """Whether a stored path already points into the store"""
+        try:
+            Path(path).relative_to(self.root)
+            return True
+        except ValueError:
+            return False
+
+    # ==================== Storing ====================
+
+    def adopt(self, source: Path, digest: str) -> StoredBlob:
+        """
+        Move a file into the store under its digest (single copy)
+
+        If the blob already exists the source is deleted instead. The source
+        is renamed into place when it is on the same filesystem, otherwise
+        copied and then removed.
+
+        Args:
+            source: File to take ownership of
+            digest: Its hex SHA-256
+
+        Returns:
+            StoredBlob
+        """
+        blob = self.blob_path(digest)
+        size = source.stat().st_size
+
+        if blob.exists():
+            source.unlink()
+            return StoredBlob(digest=digest, size=size, path=blob, deduplicated=True)
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(source, blob)
+        except OSError:
+            # Different filesystem: copy next to the blob, then rename atomically
+            staging = blob.with_name(f".{digest}.{uuid.uuid4().hex}")
+            shutil.copyfile(source, staging)
+            os.replace(staging, blob)
+            source.unlink()
+
+        return StoredBlob(digest=digest, size=size, path=blob, deduplicated=False)
+
+    def store_path(self, source: Path) -> StoredBlob:
+        """Hash a file already on disk and move it into the store"""
+        return self.adopt(source, hash_file(source))
+
+    async def store_file(self, source: Path) -> StoredBlob:
+        """Async store_path(): hashing and moving run in a worker thread"""
+        return await asyncio.to_thread(self.store_path, source)
+
+    async def store_upload(self, upload: UploadFile, max_bytes: int = None) -> StoredBlob:
+        """
+        Stream an upload into the store
+
+        The upload is written (and hashed) into the store's tmp directory
+        first, so adopting it is a same-filesystem rename.
+
+        Raises:
+            UploadTooLargeError: If the upload exceeds the size cap
+        """
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        staging = self.tmp_dir / uuid.uuid4().hex
+        _, digest = await save_upload(upload, staging, max_bytes)
+        return await asyncio.to_thread(self.adopt, staging, digest)
+
+    # ==================== Reference counting ====================
+
+    def references(self, db: Session, digest: str) -> int:
+        """Number of files/messages rows referencing a blob"""
+        blob = str(self.blob_path(digest))
+        files = db.query(func.count(FileRecord.id)).filter(FileRecord.content_hash == digest).scalar()
+        messages = db.query(func.count(Message.id)).filter(Message.media_path == blob).scalar()
+        return (files or 0) + (messages or 0)
+
+    def release(self, db: Session, digest: str) -> bool:
+        """
+        Remove a blob if nothing references it any more
+
+        Call after the referencing row's deletion is committed.
+
+        Returns:
+            True if the blob was removed
+        """
+        if self.references(db, digest) > 0:
+            return False
+
+        blob = self.blob_path(digest)
+        if blob.exists():
+            blob.unlink()
+            print(f"🗑️ Released media blob {digest[:12]}…")
+            return True
+        return False
+
+
+# Global instance
+media_store = MediaStore(settings.MEDIA_STORE_PATH)
+
+
+def get_media_store() -> MediaStore:
+    """Get the global media store instance"""
+    return media_store
@@ -0,0 +1,445 @@
+# backend/services/reminders.py
+"""
+Appointment Reminder Dispatcher
+
+Booking an appointment creates its AppointmentReminder rows (24 h and 1 h
+before, skipping any already in the past); moving or cancelling it replaces
+the unsent ones (appointments booked before reminders existed get theirs
+from migration 018). The dispatcher sends them:
+
+- Only reminders due within the next REMINDER_WINDOW_MINUTES are held in
+  memory, in a heap ordered by due time. The window is refilled from the
+  (is_sent, reminder_time) index every half window, so the appointments
+  table is never scanned.
+- A reminder created after a refill but due inside the window is pushed
+  onto the heap directly (schedule()).
+- Due reminders are sent through the WhatsApp send path in batches of
+  REMINDER_BATCH_SIZE, paced to REMINDER_SENDS_PER_MINUTE. The batch is
+  claimed first with one conditional UPDATE (is_sent false -> true,
+  RETURNING the claimed ids), so when several processes run a dispatcher
+  only one sends each reminder; failed sends are handed back for a retry
+  together. A crash between claim and send loses those reminders rather
+  than sending them twice. The appointments' reminder_*_sent flags are set
+  for delivered reminders only, once per batch.
+- Restart recovery: the first refill also picks up unsent reminders whose
+  time has passed. Ones for appointments that have already started (or are
+  no longer active), and ones whose later reminder is already due (a 24h
+  reminder with the appointment under an hour away), are skipped: retired
+  with is_sent set and sent_at left empty, without touching the
+  appointment's reminder_*_sent flags.
+
+Heap entries aren't removed when a reminder is replaced; the row is gone
+or already sent by the time it fires, so the entry is simply ignored.
+"""
+
+import asyncio
+import heapq
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.database import SessionLocal, is_sqlite
+from database.models import Appointment, AppointmentReminder
+from services.availability import BLOCKING_STATUSES
+
+# reminder_type -> how long before the appointment it is sent
+REMINDER_OFFSETS = {
+    "24h": timedelta(hours=24),
+    "1h": timedelta(hours=1),
+}
+
+# reminder_type -> Appointment flag set once it was sent
+REMINDER_SENT_FLAGS = {
+    "24h": Appointment.reminder_24h_sent,
+    "1h": Appointment.reminder_1h_sent,
+}
+
+SendFunction = Callable[[str, str], Awaitable[dict]]
+
+
+def is_superseded(reminder_type: str, appointment_date: datetime, now: datetime) -> bool:
+    """
+    Whether a later reminder of the appointment is already due
+
+    After downtime an overdue 24h reminder ("tomorrow") would otherwise go
+    out back to back with the 1h one.
+    """
+    offset = REMINDER_OFFSETS.get(reminder_type)
+    if offset is None:
+        return False
+    return any(later < offset and appointment_date - later <= now for later in REMINDER_OFFSETS.values())
+
+
+def sync_reminders(db: Session, appointment: Appointment, now: Optional[datetime] = None) -> List[AppointmentReminder]:
+    """
+    Replace an appointment's unsent reminders to match its current time/status
+
+    Call inside the transaction that creates or changes the appointment
+    (after a flush, so it has an id), then pass the returned rows to
+    reminder_dispatcher.schedule() once committed.
+
+    Returns:
+        The newly created reminders
+    """
+    now = now or datetime.now()
+    db.query(AppointmentReminder).filter(
+        AppointmentReminder.appointment_id == appointment.id,
+        AppointmentReminder.is_sent == False
+    ).delete(synchronize_session=False)
+
+    if appointment.status not in BLOCKING_STATUSES:
+        return []
+
+    reminders = [
+        AppointmentReminder(
+            appointment_id=appointment.id,
+            reminder_type=reminder_type,
+            reminder_time=appointment.appointment_date - offset
+        )
+        for reminder_type, offset in REMINDER_OFFSETS.items()
+        if appointment.appointment_date - offset > now
+    ]
+    db.add_all(reminders)
+    return reminders
+
+
+def format_reminder(appointment, reminder_type: str, template: Optional[str] = None) -> str:
+    """Reminder text (message_template may use {title}, {date}, {time}, {customer_name})"""
+    values = {
+        "title": appointment.title,
+        "customer_name": appointment.customer_name,
+        "date": appointment.appointment_date.strftime("%Y-%m-%d"),
+        "time": appointment.appointment_date.strftime("%H:%M"),
+    }
+    if template:
+        return template.format(**values)
+
+    when = "tomorrow" if reminder_type == "24h" else "in 1 hour"
+    return f"""⏰ **Appointment Reminder**
+
+Your {values['title']} is {when}.
+
+📅 Date: {values['date']}
+⏰ Time: {values['time']}
+
+Reply here if you need to reschedule. See you soon! 🙏"""
+
+
+class ReminderDispatcher:
+    """Sliding-window heap of due reminders with a rate-limited sender"""
+
+    def __init__(self):
+        self._heap: List[Tuple[datetime, int]] = []
+        self._queued: Set[int] = set()
+        self._window_end: Optional[datetime] = None
+        self._next_refill: Optional[datetime] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._send: Optional[SendFunction] = None
+
+        self.stats = {"sent": 0, "failed": 0, "skipped": 0, "refills": 0}
+
+    # ==================== Lifecycle ====================
+
+    def start(self, send: SendFunction):
+        """
+        Start dispatching on the running event loop
+
+        Args:
+            send: async (chat_id, message) -> {"success": bool, ...},
+                e.g. WhatsAppService.send_message
+        """
+        if self._running:
+            return
+
+        self._send = send
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._next_refill = None  # Refill (and recover missed reminders) right away
+        self._task = asyncio.create_task(self._run())
+        print("⏰ Reminder dispatcher started")
+
+    async def stop(self):
+        """Stop dispatching (unsent reminders stay in the database)"""
+        if not self._running:
+            return
+
+        self._running = False
+        self._wakeup.set()
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=10)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+        self._task = None
+        print("⏰ Reminder dispatcher stopped")
+
+    def schedule(self, reminders: List[Tuple[datetime, int]]):
+        """
+        Add just-committed reminders that fall inside the loaded window
+
+        Later ones are picked up by a future refill. Safe to call from
+        worker threads.
+
+        Args:
+            reminders: (reminder_time, reminder id) pairs
+        """
+        if not self._running or not reminders:
+            return
+
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._schedule(reminders)
+        else:
+            self._loop.call_soon_threadsafe(self._schedule, reminders)
+
+    def _schedule(self, reminders: List[Tuple[datetime, int]]):
+        if self._window_end is None:
+            return  # The first refill will load them
+
+        added = False
+        for due, reminder_id in reminders:
+            if due <= self._window_end:
+                added |= self._push(due, reminder_id)
+        if added:
+            self._wakeup.set()
+
+    def pending(self) -> int:
+        """Number of reminders held in memory"""
+        return len(self._queued)
+
+    # ==================== Loop ====================
+
+    def _push(self, due: datetime, reminder_id: int) -> bool:
+        if reminder_id in self._queued:
+            return False
+        heapq.heappush(self._heap, (due, reminder_id))
+        self._queued.add(reminder_id)
+        return True
+
+    async def _db(self, fn, *args):
+        """Run a DB function (in a worker thread on PostgreSQL)"""
+        if is_sqlite:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    async def _run(self):
+        while self._running:
+            try:
+                now = datetime.now()
+                if self._next_refill is None or now >= self._next_refill:
+                    await self._refill(now)
+
+                due: List[int] = []
+                while self._heap and self._heap[0][0] <= now and len(due) < settings.REMINDER_BATCH_SIZE:
+                    _, reminder_id = heapq.heappop(self._heap)
+                    self._queued.discard(reminder_id)
+                    due.append(reminder_id)
+
+                if due:
+                    await self._dispatch(due)
+                    continue
+
+                wake_at = self._next_refill
+                if self._heap:
+                    wake_at = min(wake_at, self._heap[0][0])
+                timeout = max((wake_at - datetime.now()).total_seconds(), 0.05)
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+            except Exception as e:
+                print(f"❌ Reminder dispatcher error: {e}")
+                await asyncio.sleep(5)
+
+    async def _refill(self, now: datetime):
+        """Load unsent reminders due before the end of the next window"""
+        window = timedelta(minutes=settings.REMINDER_WINDOW_MINUTES)
+        window_end = now + window
+
+        def load():
+            db = SessionLocal()
+            try:
+                return db.query(AppointmentReminder.id, AppointmentReminder.reminder_time).filter(
+                    AppointmentReminder.is_sent == False,
+                    AppointmentReminder.reminder_time <= window_end
+                ).order_by(AppointmentReminder.reminder_time).all()
+            finally:
+                db.close()
+
+        rows = await self._db(load)
+        added = sum(self._push(due, reminder_id) for reminder_id, due in rows)
+
+        self._window_end = window_end
+        self._next_refill = now + window / 2
+        self.stats["refills"] += 1
+        if added:
+            print(f"⏰ Loaded {added} reminder(s) due before {window_end.strftime('%H:%M')}")
+
+    async def _dispatch(self, reminder_ids: List[int]):
+        """Send a batch of due reminders and mark them sent"""
+        now = datetime.now()
+
+        def load():
+            db = SessionLocal()
+            try:
+                return db.query(AppointmentReminder, Appointment).join(
+                    Appointment, Appointment.id == AppointmentReminder.appointment_id
+                ).filter(
+                    AppointmentReminder.id.in_(reminder_ids),
+                    AppointmentReminder.is_sent == False
+                ).all()
+            finally:
+                db.close()
+
+        rows = await self._db(load)
+
+        skipped: List[int] = []
+        to_send = []
+        for reminder, appointment in rows:
+            if (appointment.status not in BLOCKING_STATUSES or appointment.appointment_date <= now
+                    or is_superseded(reminder.reminder_type, appointment.appointment_date, now)):
+                # Missed while down, overtaken by a later reminder, or no
+                # longer relevant: don't send
+                skipped.append(reminder.id)
+            else:
+                to_send.append((reminder, appointment))
+
+        # Another process may be dispatching the same reminders: only the
+        # ones this claim returns are ours to send
+        claimed = await self._db(self._claim, [reminder.id for reminder, _ in to_send], skipped, now)
+        self.stats["skipped"] += len(skipped)
+
+        delivered: Dict[str, List[int]] = {}
+        failed: List[int] = []
+        interval = 60.0 / max(settings.REMINDER_SENDS_PER_MINUTE, 1)
+
+        for reminder, appointment in to_send:
+            if reminder.id not in claimed:
+                continue
+
+            message = format_reminder(appointment, reminder.reminder_type, reminder.message_template)
+            try:
+                result = await self._send(appointment.chat_id, message)
+            except Exception as e:
+                result = {"success": False, "error": str(e)}
+
+            if result and result.get("success"):
+                delivered.setdefault(reminder.reminder_type, []).append(appointment.id)
+                self.stats["sent"] += 1
+            else:
+                self.stats["failed"] += 1
+                failed.append(reminder.id)
+                retry_at = datetime.now() + timedelta(minutes=settings.REMINDER_RETRY_MINUTES)
+                if retry_at < appointment.appointment_date:
+                    self._push(retry_at, reminder.id)
+
+            await asyncio.sleep(interval)
+
+        if delivered or failed:
+            await self._db(self._finish, delivered, failed)
+
+    def _claim(self, reminder_ids: List[int], skipped_ids: List[int], claimed_at: datetime) -> Set[int]:
+        """
+        Claim a batch of reminders for sending, and retire the skipped ones
+
+        One conditional UPDATE (is_sent false -> true) per kind, in one
+        transaction. Skipped reminders keep sent_at empty.
+
+        Returns:
+            IDs of the reminders this process claimed (others were taken by
+            another process first)
+        """
+        db = SessionLocal()
+        try:
+            if skipped_ids:
+                db.execute(
+                    update(AppointmentReminder)
+                    .where(AppointmentReminder.id.in_(skipped_ids), AppointmentReminder.is_sent == False)
+                    .values(is_sent=True, sent_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+
+            claimed: Set[int] = set()
+            if reminder_ids:
+                claim = (
+                    update(AppointmentReminder)
+                    .where(AppointmentReminder.id.in_(reminder_ids), AppointmentReminder.is_sent == False)
+                    .values(is_sent=True, sent_at=claimed_at)
+                    .execution_options(synchronize_session=False)
+                )
+                if db.get_bind().dialect.update_returning:
+                    claimed = set(db.execute(claim.returning(AppointmentReminder.id)).scalars())
+                else:
+                    # SQLite before 3.35: the write lock is held until commit,
+                    # so the rows stamped with this claim time are ours
+                    db.execute(claim)
+                    claimed = {
+                        row.id for row in db.query(AppointmentReminder.id).filter(
+                            AppointmentReminder.id.in_(reminder_ids),
+                            AppointmentReminder.sent_at == claimed_at
+                        )
+                    }
+            db.commit()
+            return claimed
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _finish(self, delivered: Dict[str, List[int]], failed_ids: List[int]):
+        """
+        Record the outcome of a claimed batch
+
+        Sets the appointments' reminder_*_sent flags for delivered reminders
+        only, and hands failed ones back (unsent) for a retry.
+
+        Args:
+            delivered: reminder_type -> appointment IDs whose reminder was sent
+            failed_ids: Reminders whose send failed
+        """
+        db = SessionLocal()
+        try:
+            if failed_ids:
+                db.execute(
+                    update(AppointmentReminder)
+                    .where(AppointmentReminder.id.in_(failed_ids))
+                    .values(is_sent=False, sent_at=None)
+                    .execution_options(synchronize_session=False)
+                )
+            for reminder_type, appointment_ids in delivered.items():
+                flag = REMINDER_SENT_FLAGS.get(reminder_type)
+                if flag is not None:
+                    db.execute(
+                        update(Appointment)
+                        .where(Appointment.id.in_(appointment_ids))
+                        .values({flag.key: True})
+                        .execution_options(synchronize_session=False)
+                    )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"❌ Failed to record reminder batch: {e}")
+        finally:
+            db.close()
+
+
+# Global instance
+reminder_dispatcher = ReminderDispatcher()
+
+
+def get_reminder_dispatcher() -> ReminderDispatcher:
+    """Get the global reminder dispatcher instance"""
+    return reminder_dispatcher
@@ -0,0 +1,316 @@
+# backend/services/stats_service.py
+"""
+Dashboard Statistics Snapshot
+
+Keeps the dashboard counters in memory so /api/whatsapp/stats and
+/api/conversations/stats are O(1) reads instead of a handful of COUNT
+queries per refresh.
+
+The snapshot is built once from the database (lazily, on first read) and
+then kept current by the write paths calling the record_* methods after a
+successful commit. Anything that changes rows without going through those
+hooks (bulk cleanup, manual SQL, another process) is corrected by the
+periodic reconcile() run from the scheduler. Hooks that fire while a
+reconcile is querying are journaled and replayed on top of its result, so
+the rebuild doesn't overwrite them (one committed just before the queries
+but recorded after they started may be counted twice until the next run).
+
+Counters are per process; with several workers each keeps its own snapshot.
+"""
+
+import asyncio
+import bisect
+import threading
+from datetime import datetime, date
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import Select, func, select, text
+from sqlalchemy.orm import Session
+
+from database.database import SessionLocal, engine
+from database.models import Chat, Message, Appointment, AppointmentStatus, FileRecord
+
+# Appointment statuses that count as "upcoming"
+ACTIVE_APPOINTMENT_STATUSES = (AppointmentStatus.SCHEDULED, AppointmentStatus.CONFIRMED)
+
+
+class StatsService:
+    """In-memory, incrementally maintained dashboard statistics"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        # One journal per reconcile in progress: hook updates to replay on
+        # top of the rebuilt snapshot
+        self._journals: List[List[Tuple[Callable, tuple]]] = []
+
+        self.counters: Dict[str, int] = {}
+        self.oldest_message: Optional[datetime] = None
+        self.newest_message: Optional[datetime] = None
+        self.database_size_bytes: int = 0
+        self.reconciled_at: Optional[datetime] = None
+
+        # Messages with timestamp >= start of _today (rolled over on read)
+        self._today: date = date.today()
+        self._messages_today: int = 0
+
+        # Sorted (appointment_date, id) of active appointments not yet past,
+        # plus id -> date so a rescheduled/cancelled one can be removed
+        self._upcoming: List[Tuple[datetime, int]] = []
+        self._upcoming_by_id: Dict[int, datetime] = {}
+
+    # ==================== Reconciliation ====================
+
+    def reconcile(self, db: Optional[Session] = None):
+        """
+        Rebuild the snapshot from the database
+
+        Args:
+            db: Optional session; a new one is opened and closed otherwise
+        """
+        own_session = db is None
+        db = db or SessionLocal()
+        journal: List[Tuple[Callable, tuple]] = []
+        with self._lock:
+            self._journals.append(journal)
+        try:
+            now = datetime.now()
+            today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            queries = reconcile_queries(now)
+
+            chat_counts = db.execute(queries["chats"]).one()
+            total_messages = db.execute(queries["total_messages"]).scalar() or 0
+            archived_messages = db.execute(queries["archived_messages"]).scalar() or 0
+            message_range = db.execute(queries["message_range"]).one()
+            messages_today = db.execute(queries["messages_today"]).scalar() or 0
+            upcoming = db.execute(queries["upcoming_appointments"]).all()
+            total_files = db.execute(queries["total_files"]).scalar() or 0
+            database_size_bytes = get_database_size_bytes(db)
+
+            with self._lock:
+                self.counters = {
+                    "total_chats": chat_counts[0],
+                    "active_chats": chat_counts[1],
+                    "ai_enabled_chats": chat_counts[2],
+                    "archived_chats": chat_counts[3],
+                    "total_messages": total_messages,
+                    "archived_messages": archived_messages,
+                    "total_files": total_files
+                }
+                self.oldest_message = message_range[0]
+                self.newest_message = message_range[1]
+                self._today = today.date()
+                self._messages_today = messages_today
+                self._upcoming = [(row[0], row[1]) for row in upcoming]
+                self._upcoming_by_id = {row[1]: row[0] for row in upcoming}
+                self.database_size_bytes = database_size_bytes
+                self.reconciled_at = now
+                self._loaded = True
+
+                for apply, args in journal:
+                    apply(*args)
+
+        finally:
+            with self._lock:
+                self._journals.remove(journal)
+            if own_session:
+                db.close()
+
+    async def reconcile_async(self):
+        """Reconcile in a worker thread, without blocking the event loop"""
+        await asyncio.to_thread(self.reconcile)
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.reconcile()
+
+    # ==================== Write-path hooks ====================
+
+    def _record(self, apply: Callable, *args):
+        with self._lock:
+            for journal in self._journals:
+                journal.append((apply, args))
+            if self._loaded:
+                apply(*args)
+
+    def _add(self, counter: str, delta: int):
+        self.counters[counter] = self.counters.get(counter, 0) + delta
+
+    def record_message_created(self, timestamp: datetime):
+        """Call after a new message row is committed"""
+        self._record(self._message_created, timestamp)
+
+    def _message_created(self, timestamp: datetime):
+        self._add("total_messages", 1)
+        self._roll_day()
+        if timestamp.date() >= self._today:
+            self._messages_today += 1
+        if self.oldest_message is None or timestamp < self.oldest_message:
+            self.oldest_message = timestamp
+        if self.newest_message is None or timestamp > self.newest_message:
+            self.newest_message = timestamp
+
+    def record_chat_created(self, ai_enabled: bool = False, is_active: bool = True, count: int = 1):
+        """Call after new chat rows are committed"""
+        self._record(self._chat_created, ai_enabled, is_active, count)
+
+    def _chat_created(self, ai_enabled: bool, is_active: bool, count: int):
+        self._add("total_chats", count)
+        if is_active:
+            self._add("active_chats", count)
+            if ai_enabled:
+                self._add("ai_enabled_chats", count)
+
+    def record_chat_ai_toggled(self, ai_enabled: bool, is_active: bool = True):
+        """Call after an active chat's ai_enabled flag flipped"""
+        if is_active:
+            self._record(self._add, "ai_enabled_chats", 1 if ai_enabled else -1)
+
+    def record_chats_archived(self, chats: int, messages: int):
+        """Call after chats/messages were marked archived"""
+        self._record(self._archived, chats, messages)
+
+    def record_chat_unarchived(self, messages: int):
+        """Call after a chat and its messages were unarchived"""
+        self._record(self._archived, -1, -messages)
+
+    def _archived(self, chats: int, messages: int):
+        self._add("archived_chats", chats)
+        self._add("archived_messages", messages)
+
+    def record_appointment(self, appointment_id: int, appointment_date: datetime, status: AppointmentStatus):
+        """
+        Call after an appointment is created or its date/status changed
+
+        Args:
+            appointment_id: Appointment primary key
+            appointment_date: Current appointment date
+            status: Current appointment status
+        """
+        self._record(self._appointment, appointment_id, appointment_date, status)
+
+    def _appointment(self, appointment_id: int, appointment_date: datetime, status: AppointmentStatus):
+        previous = self._upcoming_by_id.pop(appointment_id, None)
+        if previous is not None:
+            index = bisect.bisect_left(self._upcoming, (previous, appointment_id))
+            if index < len(self._upcoming) and self._upcoming[index] == (previous, appointment_id):
+                del self._upcoming[index]
+
+        if status in ACTIVE_APPOINTMENT_STATUSES and appointment_date >= datetime.now():
+            bisect.insort(self._upcoming, (appointment_date, appointment_id))
+            self._upcoming_by_id[appointment_id] = appointment_date
+
+    def record_file_added(self, count: int = 1):
+        """Call after file records are committed"""
+        self._record(self._add, "total_files", count)
+
+    def record_file_deleted(self, count: int = 1):
+        """Call after file records are deleted"""
+        self._record(self._add, "total_files", -count)
+
+    # ==================== Reads ====================
+
+    def _roll_day(self):
+        if date.today() != self._today:
+            self._today = date.today()
+            self._messages_today = 0
+
+    def _upcoming_appointments(self, now: datetime) -> int:
+        # Appointments slide into the past on their own; trim lazily
+        cutoff = bisect.bisect_left(self._upcoming, (now, -1))
+        if cutoff:
+            for _, appointment_id in self._upcoming[:cutoff]:
+                self._upcoming_by_id.pop(appointment_id, None)
+            del self._upcoming[:cutoff]
+        return len(self._upcoming)
+
+    def get_dashboard_stats(self) -> Dict[str, int]:
+        """Counters for /api/whatsapp/stats"""
+        self._ensure_loaded()
+        now = datetime.now()
+        with self._lock:
+            self._roll_day()
+            return {
+                "active_chats": self.counters["active_chats"],
+                "messages_today": self._messages_today,
+                "upcoming_appointments": self._upcoming_appointments(now),
+                "total_files": self.counters["total_files"],
+                "ai_enabled_chats": self.counters["ai_enabled_chats"]
+            }
+
+    def get_database_stats(self) -> Dict[str, Any]:
+        """Counters for /api/conversations/stats"""
+        self._ensure_loaded()
+        with self._lock:
+            return {
+                "total_chats": self.counters["total_chats"],
+                "total_messages": self.counters["total_messages"],
+                "archived_chats": self.counters["archived_chats"],
+                "archived_messages": self.counters["archived_messages"],
+                "database_size_mb": round(self.database_size_bytes / (1024 * 1024), 2),
+                "oldest_message": self.oldest_message,
+                "newest_message": self.newest_message
+            }
+
+
+def reconcile_queries(now: datetime) -> Dict[str, Select]:
+    """
+    The aggregate statements reconcile() runs, by name
+
+    Apart from the exact totals, each one is an index range or endpoint
+    read (benchmarks/benchmark_indexes.py checks the plans): archived
+    messages on ix_messages_archived_at, today's messages and the
+    oldest/newest message on ix_messages_timestamp, upcoming appointments
+    on ix_appointments_date_status.
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return {
+        "chats": select(
+            func.count(Chat.id),
+            func.count(Chat.id).filter(Chat.is_active == True),
+            func.count(Chat.id).filter(Chat.is_active == True, Chat.ai_enabled == True),
+            func.count(Chat.archived_at)
+        ),
+        # COUNT(*), not COUNT(id): messages.id isn't in the indexes, so
+        # counting it would read every matching table row
+        "total_messages": select(func.count()).select_from(Message),
+        "archived_messages": select(func.count()).select_from(Message).where(Message.archived_at.isnot(None)),
+        # Separate subqueries, so each MIN/MAX is a single index endpoint read
+        "message_range": select(
+            select(func.min(Message.timestamp)).scalar_subquery(),
+            select(func.max(Message.timestamp)).scalar_subquery()
+        ),
+        "messages_today": select(func.count()).select_from(Message).where(Message.timestamp >= today),
+        "upcoming_appointments": select(Appointment.appointment_date, Appointment.id).where(
+            Appointment.appointment_date >= now,
+            Appointment.status.in_(ACTIVE_APPOINTMENT_STATUSES)
+        ).order_by(Appointment.appointment_date, Appointment.id),
+        "total_files": select(func.count(FileRecord.id)),
+    }
+
+
+def get_database_size_bytes(db: Session) -> int:
+    """
+    Actual on-disk size of the database
+
+    SQLite: page_count * page_size. PostgreSQL: pg_database_size().
+    """
+    try:
+        if engine.dialect.name == "postgresql":
+            return db.execute(text("SELECT pg_database_size(current_database())")).scalar() or 0
+
+        page_count = db.execute(text("PRAGMA page_count")).scalar() or 0
+        page_size = db.execute(text("PRAGMA page_size")).scalar() or 0
+        return page_count * page_size
+    except Exception as e:
+        print(f"⚠️ Could not determine database size: {e}")
+        return 0
+
+
+# Global instance
+stats_service = StatsService()
+
+
+def get_stats_service() -> StatsService:
+    """Get the global stats service instance"""
+    return stats_service
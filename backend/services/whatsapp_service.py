@@ -1,5 +1,6 @@
 # backend/app/services/whatsapp_service.py
 import asyncio
+import contextlib
 import json
 import subprocess
 import os
@@ -15,6 +16,9 @@ from database.models import Chat, Message, MessageType
 from database.database import get_db
 from services.llm_service import LLMService
 from services.authorization_service import AuthorizationService
+from services.chat_state import record_message_on_chat
+from services.stats_service import stats_service
+from services.media_store import media_store
 
 class WhatsAppService:
     """
@@ -454,6 +458,7 @@ class WhatsAppService:
                         saved_count += 1
 
                 db.commit()
+                stats_service.record_chat_created(ai_enabled=True, count=saved_count)
                 print(f"✅ Saved/updated {saved_count} new chats to database")
 
                 # Broadcast chats_updated event to connected clients
@@ -537,6 +542,7 @@ class WhatsAppService:
 
                 # Check if chat exists
                 chat = db.query(Chat).filter(Chat.id == chat_id).first()
+                chat_created = chat is None
 
                 if not chat:
                     # Create new chat
@@ -568,20 +574,40 @@ class WhatsAppService:
                 except (ValueError, TypeError) as e:
                     print(f"⚠️ Invalid timestamp {message_data.get('timestamp')}, using current time")
 
-                # Create message
-                message = Message(
-                    id=message_id,  # Use the WhatsApp message ID
-                    chat_id=chat.id,
-                    body=message_data.get("body", ""),
-                    message_type=MessageType.TEXT,
-                    from_me=message_data.get("fromMe", False),
-                    timestamp=timestamp,
-                    has_media=message_data.get("hasMedia", False),
-                    llm_processed=False
-                )
+                # Downloaded media moves into the content-addressed store; the
+                # store lock is held until the message referencing it is committed
+                media_source = message_data.get("mediaPath")
+                media_lock = media_store.lock if media_source else contextlib.nullcontext()
+                async with media_lock:
+                    media_path = None
+                    if media_source and Path(media_source).exists():
+                        blob = await media_store.store_file(Path(media_source))
+                        media_path = str(blob.path)
+
+                    # Create message
+                    message = Message(
+                        id=message_id,  # Use the WhatsApp message ID
+                        chat_id=chat.id,
+                        body=message_data.get("body", ""),
+                        message_type=MessageType.TEXT,
+                        from_me=message_data.get("fromMe", False),
+                        timestamp=timestamp,
+                        has_media=message_data.get("hasMedia", False),
+                        media_path=media_path,
+                        llm_processed=False
+                    )
 
-                db.add(message)
-                db.commit()
+                    db.add(message)
+                    db.flush()
+
+                    # Keep the chat list's denormalized counters and preview current
+                    record_message_on_chat(db, chat.id, message.body, timestamp, message.from_me)
+
+                    db.commit()
+
+                if chat_created:
+                    stats_service.record_chat_created(ai_enabled=True)
+                stats_service.record_message_created(timestamp)
                 print(f"💾 Message saved to database: {message_data.get('body', '')[:30]}...")
 
             except Exception as e:
@@ -650,28 +676,15 @@ class WhatsAppService:
 
             # For now, return what we have in database
             from database.database import SessionLocal
-            from database.models import Message
+            from database.serializers import MESSAGE_COLUMNS, message_to_dict
 
             db = SessionLocal()
             try:
-                messages = db.query(Message).filter(
+                rows = db.query(*MESSAGE_COLUMNS).filter(
                     Message.chat_id == chat_id
                 ).order_by(Message.timestamp.desc()).limit(limit).all()
 
-                return [
-                    {
-                        "id": msg.id,
-                        "chat_id": msg.chat_id,
-                        "body": msg.body,
-                        "message_type": msg.message_type.value if msg.message_type else "text",
-                        "from_me": msg.from_me,
-                        "timestamp": msg.timestamp.isoformat() if msg.timestamp else None,
-                        "has_media": msg.has_media,
-                        "llm_processed": msg.llm_processed,
-                        "llm_response": msg.llm_response
-                    }
-                    for msg in messages
-                ]
+                return [message_to_dict(row) for row in rows]
             finally:
                 db.close()
 
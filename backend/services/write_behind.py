@@ -0,0 +1,229 @@
+# backend/services/write_behind.py
+"""
+Write-Behind Sink
+
+Buffers ORM rows in memory and inserts them in batches from a background
+coroutine, so request handlers never wait on an INSERT + COMMIT.
+
+Delivery guarantees (read before relying on a sink for anything critical):
+- Best effort, at-most-once. A row is durable only after the batch that
+  contains it has been committed; callers get no acknowledgement.
+- Rows accepted but not yet flushed are lost if the process crashes. On a
+  clean shutdown ``stop()`` drains the buffer before returning.
+- If the database is unavailable, rows stay in a bounded retry buffer and
+  the batch is retried with exponential backoff. When the buffer is full the
+  OLDEST rows are dropped (and counted in ``stats['dropped']``) so memory
+  stays bounded during long outages.
+- Rows are written in submission order; a failed batch is retried before
+  any newer rows.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+
+from core.config import settings
+from database.database import SessionLocal
+from database.models import ConversationHistory
+
+
+class WriteBehindSink:
+    """
+    Batches inserts for a single ORM model
+    """
+
+    def __init__(
+        self,
+        model,
+        name: str,
+        batch_size: int = 100,
+        flush_interval: float = 1.0,
+        max_buffer: int = 5000,
+        max_retry_delay: float = 30.0
+    ):
+        self.model = model
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_retry_delay = max_retry_delay
+
+        self._buffer: Deque[Dict[str, Any]] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+        self._retry_delay = 0.0
+        # One batch at a time per sink (SQLite shares a single connection)
+        self._write_lock = threading.Lock()
+
+        self.stats = {
+            'submitted': 0,
+            'written': 0,
+            'dropped': 0,
+            'failed_flushes': 0
+        }
+
+    def submit(self, **row: Any) -> None:
+        """
+        Queue a row for insertion (never blocks, never raises on DB errors)
+
+        Args:
+            **row: Column values for the model
+        """
+        self._buffer.append(row)
+        self.stats['submitted'] += 1
+
+        # Keep memory bounded: drop the oldest rows first
+        while len(self._buffer) > self.max_buffer:
+            self._buffer.popleft()
+            self.stats['dropped'] += 1
+
+        self._ensure_started()
+
+        # While a failed flush is backing off, the retry waits for its delay
+        if len(self._buffer) >= self.batch_size and self._wakeup and self._retry_delay == 0:
+            self._wakeup.set()
+
+    def start(self):
+        """Start the background flusher on the running event loop"""
+        if self._running:
+            return
+
+        self._wakeup = asyncio.Event()
+        self._running = True
+        self._task = asyncio.create_task(self._run())
+        print(f"📝 Write-behind sink started: {self.name}")
+
+    async def stop(self, timeout: float = 10.0):
+        """
+        Stop the flusher and drain whatever is still buffered
+
+        Args:
+            timeout: Maximum seconds to spend draining
+        """
+        if not self._running:
+            return
+
+        self._running = False
+        if self._wakeup:
+            self._wakeup.set()
+
+        if self._task:
+            try:
+                await asyncio.wait_for(self._task, timeout=timeout)
+            except asyncio.TimeoutError:
+                self._task.cancel()
+                print(f"⚠️ Sink {self.name} stopped with {len(self._buffer)} unflushed rows")
+
+        self._task = None
+        print(f"📝 Write-behind sink stopped: {self.name}")
+
+    def pending(self) -> int:
+        """Number of rows waiting to be written"""
+        return len(self._buffer)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Sink counters for monitoring"""
+        return {**self.stats, 'pending': len(self._buffer), 'running': self._running}
+
+    def _ensure_started(self):
+        """Lazily start the flusher when first used inside an event loop"""
+        if self._running:
+            return
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self.start()
+
+    async def _run(self):
+        """Background loop: flush on interval, on full batch, and on shutdown"""
+        while self._running:
+            try:
+                await asyncio.wait_for(
+                    self._wakeup.wait(),
+                    timeout=max(self.flush_interval, self._retry_delay)
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+            while self._buffer and self._running:
+                if not await self.flush_once():
+                    # Drop wakeups from full batches meanwhile: back off first
+                    self._wakeup.clear()
+                    break
+
+        # Final drain on shutdown
+        while self._buffer:
+            if not await self.flush_once():
+                break
+
+    async def flush_once(self) -> bool:
+        """
+        Write one batch from the head of the buffer
+
+        Returns:
+            True if the batch was committed
+        """
+        if not self._buffer:
+            return True
+
+        count = min(self.batch_size, len(self._buffer))
+        batch: List[Dict[str, Any]] = [self._buffer.popleft() for _ in range(count)]
+
+        try:
+            # Off the event loop on every backend: the INSERT + COMMIT is the
+            # latency the sink exists to hide
+            await asyncio.to_thread(self._write_batch, batch)
+
+            self.stats['written'] += len(batch)
+            self._retry_delay = 0.0
+            return True
+
+        except Exception as e:
+            self.stats['failed_flushes'] += 1
+            self._retry_delay = min(
+                self.max_retry_delay,
+                max(self.flush_interval, self._retry_delay * 2 or 1.0)
+            )
+
+            # Put the batch back at the head, preserving order, then re-apply the bound
+            self._buffer.extendleft(reversed(batch))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.stats['dropped'] += 1
+
+            print(f"❌ Sink {self.name} flush failed ({len(batch)} rows, retry in {self._retry_delay:.0f}s): {e}")
+            return False
+
+    def _write_batch(self, rows: List[Dict[str, Any]]):
+        """Insert rows in one transaction with a short-lived session"""
+        with self._write_lock:
+            db = SessionLocal()
+            try:
+                db.execute(insert(self.model), rows)
+                db.commit()
+            except Exception:
+                db.rollback()
+                raise
+            finally:
+                db.close()
+
+
+# Global instance
+conversation_history_sink = WriteBehindSink(
+    ConversationHistory,
+    name="conversation_history",
+    batch_size=settings.HISTORY_SINK_BATCH_SIZE,
+    flush_interval=settings.HISTORY_SINK_FLUSH_INTERVAL_SECONDS,
+    max_buffer=settings.HISTORY_SINK_MAX_BUFFER
+)
+
+
+def get_conversation_history_sink() -> WriteBehindSink:
+    """Get the global conversation history sink"""
+    return conversation_history_sink
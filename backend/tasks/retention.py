@@ -0,0 +1,185 @@
+# backend/tasks/retention.py
+"""
+Task and Agent Log Retention
+
+Deletes old rows in bounded chunks rather than one unbounded DELETE, so
+SQLite's write lock (or PostgreSQL's row locks) is only held for one short
+transaction at a time:
+
+1. agent_logs older than AGENT_LOG_RETENTION_DAYS (they grow fastest)
+2. completed, cancelled, dead-lettered and expired tasks older than
+   TASK_RETENTION_DAYS, each chunk together with its remaining agent_logs
+   (deleted first, the foreign key has no cascade). Tasks that still have
+   subtasks are kept until the subtasks are gone.
+
+Each chunk is its own transaction, and the loop yields to the event loop
+between chunks. A run stops once RETENTION_TIME_BUDGET_SECONDS is spent;
+the rest is picked up by the next run.
+"""
+
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session, aliased
+
+from core.config import settings
+from database.database import SessionLocal
+from database.models import AgentLog, Task, TaskStatus
+from tasks.task_stats import task_stats
+
+RETAINED_UNTIL_DELETED = (TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.DEAD_LETTER, TaskStatus.EXPIRED)
+
+
+class RetentionEngine:
+    """Chunked, time-budgeted deletion of old tasks and agent logs"""
+
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    async def _db(self, fn, *args):
+        """Run a blocking chunk in a worker thread (chunks run one at a time under _lock)"""
+        return await asyncio.to_thread(fn, *args)
+
+    # ==================== Chunks ====================
+
+    def delete_agent_logs_chunk(self, cutoff: datetime, chunk_size: int) -> int:
+        """Delete up to chunk_size agent_logs rows created before cutoff"""
+        db = SessionLocal()
+        try:
+            ids = select(AgentLog.id).where(AgentLog.created_at < cutoff).order_by(AgentLog.id).limit(chunk_size)
+            deleted = db.query(AgentLog).filter(
+                AgentLog.id.in_(ids.scalar_subquery())
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def delete_tasks_chunk(self, cutoff: datetime, chunk_size: int) -> Dict[str, int]:
+        """
+        Delete up to chunk_size finished tasks created before cutoff, with their agent_logs
+
+        Returns:
+            Rows deleted per table
+        """
+        db = SessionLocal()
+        try:
+            ids = self._expired_task_ids(db, cutoff, chunk_size)
+            if not ids:
+                return {"agent_logs": 0, "tasks": 0}
+
+            logs = db.query(AgentLog).filter(AgentLog.task_id.in_(ids)).delete(synchronize_session=False)
+            tasks = db.query(Task).filter(Task.id.in_(ids)).delete(synchronize_session=False)
+            db.commit()
+            return {"agent_logs": logs, "tasks": tasks}
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _expired_task_ids(self, db: Session, cutoff: datetime, chunk_size: int):
+        subtask = aliased(Task)
+        rows = db.query(Task.id).filter(
+            Task.status.in_(RETAINED_UNTIL_DELETED),
+            Task.created_at < cutoff,
+            ~exists().where(subtask.parent_task_id == Task.id)
+        ).order_by(Task.id).limit(chunk_size).all()
+        return [row.id for row in rows]
+
+    # ==================== Runs ====================
+
+    async def run(
+        self,
+        task_days: Optional[int] = None,
+        log_days: Optional[int] = None,
+        budget_seconds: Optional[float] = None,
+        chunk_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Delete expired agent logs, then expired tasks, until done or out of time
+
+        Args:
+            task_days: Task retention override (default TASK_RETENTION_DAYS)
+            log_days: Agent log retention override (default AGENT_LOG_RETENTION_DAYS)
+            budget_seconds: Time budget override (default RETENTION_TIME_BUDGET_SECONDS)
+            chunk_size: Rows per transaction (default RETENTION_CHUNK_SIZE)
+
+        Returns:
+            Report with rows deleted per table, chunks, elapsed seconds and
+            whether everything expired was removed
+        """
+        task_days = task_days if task_days is not None else settings.TASK_RETENTION_DAYS
+        log_days = log_days if log_days is not None else settings.AGENT_LOG_RETENTION_DAYS
+        budget = budget_seconds if budget_seconds is not None else settings.RETENTION_TIME_BUDGET_SECONDS
+        chunk_size = chunk_size or settings.RETENTION_CHUNK_SIZE
+
+        async with self._lock:
+            started = time.monotonic()
+            now = datetime.now()
+            deleted = {"agent_logs": 0, "tasks": 0}
+            chunks = 0
+            complete = False
+
+            def out_of_time() -> bool:
+                return time.monotonic() - started >= budget
+
+            # 1. Old agent logs
+            log_cutoff = now - timedelta(days=log_days)
+            logs_done = False
+            while not out_of_time():
+                count = await self._db(self.delete_agent_logs_chunk, log_cutoff, chunk_size)
+                chunks += 1
+                deleted["agent_logs"] += count
+                if count < chunk_size:
+                    logs_done = True
+                    break
+                await asyncio.sleep(settings.RETENTION_PAUSE_SECONDS)
+
+            # 2. Old finished tasks and their logs. A short chunk isn't the
+            # end: parents whose subtasks it removed qualify on the next one.
+            task_cutoff = now - timedelta(days=task_days)
+            while logs_done and not out_of_time():
+                counts = await self._db(self.delete_tasks_chunk, task_cutoff, chunk_size)
+                chunks += 1
+                for table, count in counts.items():
+                    deleted[table] += count
+                if counts["tasks"] == 0:
+                    complete = True
+                    break
+                await asyncio.sleep(settings.RETENTION_PAUSE_SECONDS)
+
+            if deleted["tasks"]:
+                task_stats.invalidate()
+
+            report = {
+                "deleted": deleted,
+                "chunks": chunks,
+                "elapsed_seconds": round(time.monotonic() - started, 3),
+                "complete": complete,
+                "task_retention_days": task_days,
+                "agent_log_retention_days": log_days,
+                "finished_at": datetime.now().isoformat(),
+            }
+            self.last_report = report
+
+        status = "done" if complete else "time budget spent, continuing next run"
+        print(f"🧹 Retention: deleted {deleted['tasks']} tasks and {deleted['agent_logs']} agent logs "
+              f"in {chunks} chunks, {report['elapsed_seconds']}s ({status})")
+        return report
+
+
+# Global instance
+retention_engine = RetentionEngine()
+
+
+def get_retention_engine() -> RetentionEngine:
+    """Get the global retention engine"""
+    return retention_engine
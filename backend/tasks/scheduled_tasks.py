@@ -7,6 +7,8 @@ Manages periodic background tasks:
 - Auto-sync messages with WhatsApp
 - Database cleanup and maintenance
 - Metadata updates
+- Dashboard stats reconciliation
+- Task and agent log retention
 """
 
 import asyncio
@@ -18,6 +20,8 @@ from apscheduler.triggers.interval import IntervalTrigger
 from tasks.task_manager import TaskManager
 from database.models import TaskType, TaskPriority
 from core.config import settings
+from services.stats_service import stats_service
+from tasks.retention import retention_engine
 
 
 class ScheduledTasksManager:
@@ -43,6 +47,8 @@ class ScheduledTasksManager:
         self._register_sync_task()
         self._register_cleanup_task()
         self._register_metadata_task()
+        self._register_stats_task()
+        self._register_retention_task()
 
         # Start the scheduler
         self.scheduler.start()
@@ -145,6 +151,39 @@ class ScheduledTasksManager:
 
         print("🏷️ Metadata updates scheduled: Weekly on Sunday at 04:00")
 
+    def _register_stats_task(self):
+        """Register dashboard stats reconciliation"""
+        interval_minutes = settings.STATS_RECONCILE_INTERVAL_MINUTES
+
+        self.scheduler.add_job(
+            self.reconcile_stats,
+            trigger=IntervalTrigger(minutes=interval_minutes),
+            id='stats_reconcile',
+            name='Reconcile dashboard stats',
+            replace_existing=True
+        )
+
+        print(f"📊 Stats reconciliation scheduled: Every {interval_minutes} minutes")
+
+    def _register_retention_task(self):
+        """Register chunked deletion of old tasks and agent logs"""
+        if not settings.CLEANUP_ENABLED:
+            print("ℹ️ Task retention is disabled")
+            return
+
+        interval_minutes = settings.RETENTION_INTERVAL_MINUTES
+
+        self.scheduler.add_job(
+            self.apply_retention,
+            trigger=IntervalTrigger(minutes=interval_minutes),
+            id='retention',
+            name='Delete old tasks and agent logs',
+            replace_existing=True,
+            max_instances=1
+        )
+
+        print(f"🗑️ Task retention scheduled: Every {interval_minutes} minutes")
+
     # ==================== Scheduled Task Handlers ====================
 
     async def auto_archive_conversations(self):
@@ -166,7 +205,8 @@ class ScheduledTasksManager:
                         "reason": "Scheduled auto-archive"
                     }
                 },
-                priority=TaskPriority.BACKGROUND.value
+                priority=TaskPriority.BACKGROUND.value,
+                dedup_key="conversation_archive"
             )
 
             if task:
@@ -192,7 +232,8 @@ class ScheduledTasksManager:
                     "chat_id": None,  # Sync all chats
                     "mode": "incremental"
                 },
-                priority=TaskPriority.NORMAL.value
+                priority=TaskPriority.NORMAL.value,
+                dedup_key="message_sync:all"  # Merges into a sync still waiting to run
             )
 
             if task:
@@ -221,7 +262,8 @@ class ScheduledTasksManager:
                         "optimize_tables": settings.OPTIMIZE_TABLES
                     }
                 },
-                priority=TaskPriority.BACKGROUND.value
+                priority=TaskPriority.BACKGROUND.value,
+                dedup_key="database_cleanup"
             )
 
             if task:
@@ -249,7 +291,8 @@ class ScheduledTasksManager:
                     "auto_analyze": True,
                     "batch_mode": True
                 },
-                priority=TaskPriority.LOW.value
+                priority=TaskPriority.LOW.value,
+                dedup_key="metadata_update:message"
             )
 
             if task:
@@ -260,6 +303,30 @@ class ScheduledTasksManager:
         except Exception as e:
             print(f"❌ [SCHEDULED] Metadata update error: {e}")
 
+    async def reconcile_stats(self):
+        """
+        Scheduled task: Rebuild the dashboard stats snapshot from the database
+
+        Runs in-process rather than through the task queue: the snapshot
+        lives in this process's memory.
+        """
+        try:
+            await stats_service.reconcile_async()
+        except Exception as e:
+            print(f"❌ [SCHEDULED] Stats reconciliation error: {e}")
+
+    async def apply_retention(self):
+        """
+        Scheduled task: Delete old tasks and agent logs in chunks
+
+        Runs in-process rather than through the task queue: it is bounded
+        by its own time budget and would otherwise compete for a worker.
+        """
+        try:
+            await retention_engine.run()
+        except Exception as e:
+            print(f"❌ [SCHEDULED] Retention error: {e}")
+
     def get_next_run_times(self):
         """Get next run times for all scheduled jobs"""
         jobs_info = []
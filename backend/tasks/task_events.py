@@ -0,0 +1,160 @@
+# backend/tasks/task_events.py
+"""
+Task Events
+
+In-process hub for task state changes:
+- Completion futures: wait() returns as soon as a task reaches a final
+  state (completed, dead-lettered, cancelled or expired), so callers can
+  long-poll instead of re-reading the task every second.
+- Subscribers (the WebSocket connection manager) receive a "task_update"
+  message for every published change.
+
+Events only cover changes made by this process. Tasks processed by
+another process are noticed by the caller's periodic database re-check
+(see TaskManager.wait_for_task).
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from database.models import TaskStatus, TaskType
+
+# States a task doesn't leave on its own
+FINAL_STATUSES = frozenset({
+    TaskStatus.COMPLETED, TaskStatus.DEAD_LETTER, TaskStatus.CANCELLED, TaskStatus.EXPIRED
+})
+
+Subscriber = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+class TaskEventHub:
+    """Completion futures and change notifications for tasks"""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: Dict[int, List[asyncio.Future]] = {}
+        self._subscribers: List[Subscriber] = []
+        self._deliveries: Set[asyncio.Task] = set()
+
+    def subscribe(self, callback: Subscriber):
+        """
+        Receive a message for every task state change
+
+        Args:
+            callback: Coroutine function called with
+                {"type": "task_update", "data": {...}}
+        """
+        self._bind_loop()
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Subscriber):
+        """Stop receiving task state changes"""
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    # ==================== Publishing ====================
+
+    def publish(
+        self,
+        task_id: int,
+        status: TaskStatus,
+        task_type: Optional[TaskType] = None,
+        **data: Any
+    ):
+        """
+        Announce a committed task state change
+
+        Safe to call from worker threads (delivery moves to the event loop).
+
+        Args:
+            task_id: Task ID
+            status: New status
+            task_type: Task type, if known
+            **data: Extra fields for subscribers (error_message, agent, ...)
+        """
+        event = {
+            "task_id": task_id,
+            "status": status.value,
+            "type": task_type.value if task_type else None,
+            "final": status in FINAL_STATUSES,
+            "at": datetime.now().isoformat(),
+            **data,
+        }
+
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Worker thread: hand over to the loop, if one has been seen
+            if self._loop is not None and not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._dispatch, event)
+            return
+
+        self._bind_loop()
+        self._dispatch(event)
+
+    def _dispatch(self, event: Dict[str, Any]):
+        """Resolve waiters and notify subscribers (on the event loop)"""
+        if event["final"]:
+            for future in self._waiters.pop(event["task_id"], []):
+                if not future.done():
+                    future.set_result(event)
+
+        message = {"type": "task_update", "data": event}
+        for callback in list(self._subscribers):
+            delivery = asyncio.ensure_future(self._deliver(callback, message))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, callback: Subscriber, message: Dict[str, Any]):
+        try:
+            await callback(message)
+        except Exception as e:
+            print(f"⚠️ Task event delivery failed: {e}")
+
+    # ==================== Waiting ====================
+
+    async def wait(self, task_id: int, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Wait for a task to reach a final state in this process
+
+        Args:
+            task_id: Task ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The final event, or None on timeout
+        """
+        self._bind_loop()
+        future = self._loop.create_future()
+        self._waiters.setdefault(task_id, []).append(future)
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            waiters = self._waiters.get(task_id)
+            if waiters and future in waiters:
+                waiters.remove(future)
+                if not waiters:
+                    del self._waiters[task_id]
+
+    def waiting(self) -> int:
+        """Number of tasks with a pending waiter"""
+        return len(self._waiters)
+
+    def _bind_loop(self):
+        """Remember the event loop events are delivered on"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+
+
+# Global instance
+task_events = TaskEventHub()
+
+
+def get_task_events() -> TaskEventHub:
+    """Get the global task event hub"""
+    return task_events
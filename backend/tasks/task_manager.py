@@ -3,19 +3,28 @@
 Task Manager
 
 Central service for managing tasks in the agentic system:
-- Create and queue tasks
+- Create and queue tasks (the queue is the tasks table, see tasks/task_queue.py)
 - Route tasks to appropriate agents
 - Monitor task execution
-- Handle task failures and retries
+- Handle task failures, retries and dead-lettered tasks
 """
 
-import asyncio
 from typing import Dict, Any, Optional, List
-from datetime import datetime, timedelta
+from datetime import datetime
 import json
+import time
 
+from sqlalchemy import case, update
+from sqlalchemy.exc import IntegrityError
+
+from core.config import settings
 from database.database import SessionLocal
 from database.models import Task, TaskType, TaskStatus, TaskPriority, Message, Chat
+from tasks.task_events import FINAL_STATUSES, task_events
+from tasks.retention import retention_engine
+from tasks.task_queue import TaskQueue, task_queue
+from tasks.task_stats import task_stats
+from tasks.workflow import workflow_engine
 
 
 class TaskManager:
@@ -25,7 +34,7 @@ class TaskManager:
 
     def __init__(self):
         self.db = None
-        self.task_queue: asyncio.Queue = asyncio.Queue()
+        self.task_queue: TaskQueue = task_queue
         self._processing = False
 
     def get_db(self):
@@ -47,11 +56,19 @@ class TaskManager:
         message_id: Optional[str] = None,
         input_data: Optional[Dict[str, Any]] = None,
         priority: int = TaskPriority.NORMAL.value,
-        deadline: Optional[datetime] = None
+        deadline: Optional[datetime] = None,
+        dedup_key: Optional[str] = None,
+        replace_payload: bool = False
     ) -> Optional[Task]:
         """
         Create a new task
 
+        With a dedup_key, a task still queued (PENDING) under the same key
+        absorbs the request instead: it keeps the more urgent of the two
+        priorities and, with replace_payload, takes the new input_data and
+        deadline ("latest wins"). A task that is already running doesn't
+        hold its key, so the new one is queued behind it.
+
         Args:
             task_type: Type of task to create
             chat_id: WhatsApp chat ID
@@ -59,9 +76,11 @@ class TaskManager:
             input_data: Input data for the task (will be stored as JSON)
             priority: Task priority (1-10, lower is higher priority)
             deadline: Optional deadline for task completion
+            dedup_key: Optional coalescing key (e.g. "message_sync:all")
+            replace_payload: Replace a coalesced task's input_data and deadline
 
         Returns:
-            Created Task object or None if failed
+            Created (or coalesced) Task object or None if failed
         """
         db = self.get_db()
 
@@ -69,25 +88,42 @@ class TaskManager:
             # Prepare input data
             input_json = json.dumps(input_data) if input_data else None
 
-            # Create task
-            task = Task(
-                task_type=task_type,
-                status=TaskStatus.PENDING,
-                priority=priority,
-                chat_id=chat_id,
-                message_id=message_id,
-                input_data=input_json,
-                deadline=deadline
-            )
-
-            db.add(task)
-            db.commit()
+            for attempt in range(2):
+                if dedup_key:
+                    existing = self._coalesce(db, dedup_key, priority, input_json, deadline, replace_payload)
+                    if existing:
+                        print(f"🔁 Coalesced {task_type.value} into pending task #{existing.id} ({dedup_key})")
+                        return existing
+
+                # Create task
+                task = Task(
+                    task_type=task_type,
+                    status=TaskStatus.PENDING,
+                    priority=priority,
+                    chat_id=chat_id,
+                    message_id=message_id,
+                    input_data=input_json,
+                    deadline=deadline,
+                    dedup_key=dedup_key
+                )
+
+                db.add(task)
+                try:
+                    db.commit()
+                    break
+                except IntegrityError:
+                    # Another creator queued the same key first: coalesce into theirs
+                    db.rollback()
+                    if not dedup_key or attempt:
+                        raise
+
             db.refresh(task)
 
             print(f"📋 Created task #{task.id}: {task_type.value} (priority: {priority})")
 
-            # Add to queue for processing
-            await self.task_queue.put(task.id)
+            # Committed as PENDING, so it is queued; wake a local worker
+            self.task_queue.notify()
+            task_events.publish(task.id, TaskStatus.PENDING, task_type)
 
             return task
 
@@ -98,6 +134,36 @@ class TaskManager:
         finally:
             self.close_db()
 
+    def _coalesce(
+        self,
+        db,
+        dedup_key: str,
+        priority: int,
+        input_json: Optional[str],
+        deadline: Optional[datetime],
+        replace_payload: bool
+    ) -> Optional[Task]:
+        """Merge into the pending task holding dedup_key, if any (single UPDATE)"""
+        values = {"priority": case((Task.priority > priority, priority), else_=Task.priority)}
+        if replace_payload:
+            values["input_data"] = input_json
+            values["deadline"] = deadline
+
+        task = db.scalars(
+            update(Task)
+            .where(Task.dedup_key == dedup_key, Task.status == TaskStatus.PENDING)
+            .values(**values)
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if task is None:
+            db.rollback()
+            return None
+
+        db.commit()
+        db.refresh(task)
+        return task
+
     async def create_task_from_message(
         self,
         message_data: Dict[str, Any],
@@ -148,7 +214,8 @@ class TaskManager:
             task_id: Task ID
 
         Returns:
-            Task object or None
+            Detached Task object or None. Changes to it are only saved once
+            it's added to a session (BaseAgent.execute() does this).
         """
         db = self.get_db()
         try:
@@ -156,6 +223,39 @@ class TaskManager:
         finally:
             self.close_db()
 
+    async def wait_for_task(self, task_id: int, timeout: float) -> Optional[TaskStatus]:
+        """
+        Wait until a task is completed, dead-lettered, cancelled or expired
+
+        Completion in this process resolves the wait immediately (see
+        tasks/task_events.py); the status is also re-read every
+        TASK_WAIT_POLL_SECONDS for tasks processed by other processes.
+
+        Args:
+            task_id: Task ID
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The task's status when the wait ended, or None if it doesn't exist
+        """
+        deadline = time.monotonic() + timeout
+        while True:
+            db = self.get_db()
+            try:
+                row = db.query(Task.status).filter(Task.id == task_id).first()
+            finally:
+                self.close_db()
+
+            if row is None:
+                return None
+            remaining = deadline - time.monotonic()
+            if row.status in FINAL_STATUSES or remaining <= 0:
+                return row.status
+
+            event = await task_events.wait(task_id, min(remaining, settings.TASK_WAIT_POLL_SECONDS))
+            if event is not None:
+                return TaskStatus(event["status"])
+
     async def get_pending_tasks(
         self,
         limit: int = 10,
@@ -249,7 +349,9 @@ class TaskManager:
             if status == TaskStatus.COMPLETED:
                 task.completed_at = datetime.now()
 
+            task_type = task.task_type
             db.commit()
+            task_events.publish(task_id, status, task_type, error_message=error_message)
             return True
 
         except Exception as e:
@@ -261,38 +363,42 @@ class TaskManager:
 
     async def retry_failed_task(self, task_id: int) -> bool:
         """
-        Retry a failed task
+        Retry a failed or dead-lettered task now
+
+        Failed tasks are otherwise retried automatically after their
+        backoff (see tasks/task_queue.py); this skips the wait. A
+        dead-lettered task gets a fresh set of retries.
 
         Args:
             task_id: Task ID
 
         Returns:
-            True if retry was scheduled
+            True if the task was re-queued
         """
         db = self.get_db()
         try:
             task = db.query(Task).filter(Task.id == task_id).first()
 
-            if not task or task.status != TaskStatus.FAILED:
-                return False
-
-            if task.retry_count >= task.max_retries:
-                print(f"⚠️ Task #{task_id} exceeded max retries ({task.max_retries})")
+            if not task or task.status not in (TaskStatus.FAILED, TaskStatus.DEAD_LETTER):
                 return False
 
             # Reset task for retry
+            task.retry_count = 0 if task.status == TaskStatus.DEAD_LETTER else task.retry_count + 1
             task.status = TaskStatus.PENDING
-            task.retry_count += 1
             task.error_message = None
+            task.next_retry_at = None
             task.started_at = None
             task.completed_at = None
+            task.heartbeat_at = None
+            task.lease_owner = None
 
+            task_type = task.task_type
             db.commit()
 
-            # Re-queue the task
-            await self.task_queue.put(task_id)
+            self.task_queue.notify()
+            task_events.publish(task_id, TaskStatus.PENDING, task_type)
 
-            print(f"🔄 Retrying task #{task_id} (attempt {task.retry_count + 1}/{task.max_retries})")
+            print(f"🔄 Retrying task #{task_id} (attempt {task.retry_count + 1}/{task.max_retries + 1})")
             return True
 
         except Exception as e:
@@ -302,6 +408,63 @@ class TaskManager:
         finally:
             self.close_db()
 
+    async def replay_dead_letters(
+        self,
+        task_ids: Optional[List[int]] = None,
+        task_type: Optional[TaskType] = None,
+        limit: int = 100
+    ) -> List[int]:
+        """
+        Re-queue dead-lettered tasks with a fresh set of retries
+
+        Args:
+            task_ids: Specific tasks to replay (others in the list are ignored
+                unless dead-lettered)
+            task_type: Only replay this type
+            limit: Maximum number of tasks to replay
+
+        Returns:
+            IDs of the replayed tasks
+        """
+        db = self.get_db()
+        try:
+            query = db.query(Task.id).filter(Task.status == TaskStatus.DEAD_LETTER)
+            if task_ids:
+                query = query.filter(Task.id.in_(task_ids))
+            if task_type:
+                query = query.filter(Task.task_type == task_type)
+            ids = [row.id for row in query.order_by(Task.id).limit(limit).all()]
+
+            if ids:
+                db.query(Task).filter(
+                    Task.id.in_(ids),
+                    Task.status == TaskStatus.DEAD_LETTER
+                ).update({
+                    Task.status: TaskStatus.PENDING,
+                    Task.retry_count: 0,
+                    Task.error_message: None,
+                    Task.next_retry_at: None,
+                    Task.started_at: None,
+                    Task.completed_at: None,
+                    Task.heartbeat_at: None,
+                    Task.lease_owner: None
+                }, synchronize_session=False)
+                db.commit()
+
+                self.task_queue.notify()
+                for task_id in ids:
+                    task_events.publish(task_id, TaskStatus.PENDING)
+                print(f"🔄 Replayed {len(ids)} dead-lettered task(s)")
+
+            return ids
+
+        except Exception as e:
+            print(f"❌ Failed to replay dead-lettered tasks: {e}")
+            db.rollback()
+            return []
+        finally:
+            self.close_db()
+
     async def cancel_task(self, task_id: int, reason: str = "") -> bool:
         """
         Cancel a task
@@ -324,7 +487,13 @@ class TaskManager:
             task.error_message = f"Cancelled: {reason}" if reason else "Cancelled by user"
             task.completed_at = datetime.now()
 
+            # Cancelling a workflow step fails its workflow
+            workflow_changes = workflow_engine.on_task_finished(db, task)
+            task_type, error_message = task.task_type, task.error_message
             db.commit()
+            task_events.publish(task_id, TaskStatus.CANCELLED, task_type, error_message=error_message)
+            for changed_id, status in workflow_changes:
+                task_events.publish(changed_id, status)
 
             print(f"🚫 Cancelled task #{task_id}: {reason}")
             return True
@@ -336,53 +505,29 @@ class TaskManager:
         finally:
             self.close_db()
 
-    async def get_task_stats(self) -> Dict[str, Any]:
+    async def get_task_stats(self, refresh: bool = False) -> Dict[str, Any]:
         """
-        Get task statistics
+        Get task statistics (see tasks/task_stats.py)
+
+        Args:
+            refresh: Bypass the short-lived cache
 
         Returns:
-            Dictionary with task stats
+            Dictionary with counts per status and processing-time
+            percentiles per task type and agent
         """
         db = self.get_db()
         try:
-            total = db.query(Task).count()
-            pending = db.query(Task).filter(Task.status == TaskStatus.PENDING).count()
-            in_progress = db.query(Task).filter(Task.status == TaskStatus.IN_PROGRESS).count()
-            completed = db.query(Task).filter(Task.status == TaskStatus.COMPLETED).count()
-            failed = db.query(Task).filter(Task.status == TaskStatus.FAILED).count()
-
-            # Get average completion time for completed tasks
-            completed_tasks = db.query(Task).filter(
-                Task.status == TaskStatus.COMPLETED,
-                Task.started_at.isnot(None),
-                Task.completed_at.isnot(None)
-            ).all()
-
-            avg_duration = 0
-            if completed_tasks:
-                durations = [
-                    (t.completed_at - t.started_at).total_seconds()
-                    for t in completed_tasks
-                ]
-                avg_duration = sum(durations) / len(durations)
-
-            return {
-                'total': total,
-                'pending': pending,
-                'in_progress': in_progress,
-                'completed': completed,
-                'failed': failed,
-                'cancelled': db.query(Task).filter(Task.status == TaskStatus.CANCELLED).count(),
-                'avg_completion_seconds': round(avg_duration, 2),
-                'queue_size': self.task_queue.qsize()
-            }
-
+            return task_stats.get(db, refresh=refresh)
         finally:
             self.close_db()
 
     async def cleanup_old_tasks(self, days: int = 30) -> int:
         """
-        Clean up old completed/failed tasks
+        Clean up old completed/cancelled/dead-lettered tasks and their agent logs
+
+        Deletes in chunks within the retention time budget (see
+        tasks/retention.py); whatever is left goes on the next run.
 
         Args:
             days: Delete tasks older than this many days
@@ -390,23 +535,9 @@ class TaskManager:
         Returns:
             Number of tasks deleted
         """
-        db = self.get_db()
         try:
-            cutoff_date = datetime.now() - timedelta(days=days)
-
-            deleted = db.query(Task).filter(
-                Task.status.in_([TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.CANCELLED]),
-                Task.created_at < cutoff_date
-            ).delete()
-
-            db.commit()
-
-            print(f"🧹 Cleaned up {deleted} old tasks (older than {days} days)")
-            return deleted
-
+            report = await retention_engine.run(task_days=days)
+            return report["deleted"]["tasks"]
         except Exception as e:
             print(f"❌ Failed to cleanup tasks: {e}")
-            db.rollback()
             return 0
-        finally:
-            self.close_db()
@@ -0,0 +1,569 @@
+# backend/tasks/task_queue.py
+"""
+Durable Task Queue
+
+The queue is the tasks table itself: a PENDING row is a queued task, so
+nothing is lost on restart and any number of worker processes can consume
+it.
+
+- claim(): one UPDATE ... RETURNING moves the next PENDING task to
+  IN_PROGRESS and stamps it with this worker's lease. On PostgreSQL the
+  candidate row is picked with FOR UPDATE SKIP LOCKED, so concurrent
+  workers claim different tasks without waiting on each other; on SQLite
+  the single statement runs under the database write lock.
+- Priority with aging: the claim picks the priority class whose head
+  (oldest task) is most urgent once its waiting time is credited
+  (TASK_PRIORITY_AGING_SECONDS per level). An URGENT task is claimed next
+  whatever the backlog, and BACKGROUND work still runs under sustained
+  urgent load.
+- Deadlines: within a class the task with the earliest deadline is
+  claimed first, then tasks without one, oldest first. expire_overdue()
+  moves PENDING tasks whose deadline has passed to EXPIRED instead of
+  running them late.
+- Leases: while a task runs, its worker refreshes heartbeat_at every
+  TASK_HEARTBEAT_SECONDS. recover() puts IN_PROGRESS tasks whose heartbeat
+  is older than TASK_LEASE_SECONDS (the worker died or hung) back to
+  PENDING, or fails them once they are out of retries.
+- Retries: a failed task is re-queued after an exponential backoff with
+  jitter (record_failure() sets next_retry_at, requeue_due() moves due
+  ones back to PENDING) until it has been retried max_retries times; then
+  it is moved to DEAD_LETTER with its last error, for replay by an admin.
+- Coalescing: a claim clears the task's dedup_key, so a new task with the
+  same key is queued behind the running one (see TaskManager.create_task),
+  and a task put back to PENDING never collides with a queued duplicate.
+- Doorbell: creating a task rings an in-process event so a local idle
+  worker claims it immediately. Workers in other processes find it on
+  their next poll (TASK_QUEUE_POLL_SECONDS).
+"""
+
+import asyncio
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Callable, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Select, Update, func, or_, select, update
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.database import SessionLocal, is_sqlite
+from database.models import Task, TaskStatus, TaskType
+from tasks.task_events import task_events
+from tasks.workflow import workflow_engine
+
+
+def retry_delay(retry_count: int) -> timedelta:
+    """
+    Backoff before retry number retry_count + 1
+
+    TASK_RETRY_BASE_SECONDS doubled per earlier retry, capped at
+    TASK_RETRY_MAX_SECONDS, with the upper half jittered so tasks that
+    failed together don't all retry at once.
+    """
+    delay = min(settings.TASK_RETRY_BASE_SECONDS * (2 ** retry_count), settings.TASK_RETRY_MAX_SECONDS)
+    return timedelta(seconds=delay / 2 + random.uniform(0, delay / 2))
+
+
+def record_failure(task: Task, error_message: str, now: Optional[datetime] = None):
+    """
+    Mark a task failed: schedule its retry, or dead-letter it if it is out of retries
+
+    Updates the instance only; the caller commits.
+    """
+    now = now or datetime.now()
+    task.error_message = error_message
+    task.completed_at = now
+    if (task.retry_count or 0) < (task.max_retries or 0):
+        task.status = TaskStatus.FAILED
+        task.next_retry_at = now + retry_delay(task.retry_count or 0)
+    else:
+        task.status = TaskStatus.DEAD_LETTER
+        task.next_retry_at = None
+
+
+class TaskQueue:
+    """Claims, heartbeats and recovers tasks stored in the tasks table"""
+
+    def __init__(self, worker_id: Optional[str] = None):
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._doorbell: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _db(self, fn, *args):
+        """Run a DB function (in a worker thread on PostgreSQL)"""
+        if is_sqlite:
+            return fn(*args)
+        return await asyncio.to_thread(fn, *args)
+
+    # ==================== Doorbell ====================
+
+    def notify(self):
+        """Wake a local idle worker (a task was queued). Safe to call from worker threads."""
+        if self._doorbell is None:
+            return  # No worker waiting in this process yet
+
+        try:
+            on_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            on_loop = False
+
+        if on_loop:
+            self._doorbell.set()
+        else:
+            self._loop.call_soon_threadsafe(self._doorbell.set)
+
+    async def wait(self, timeout: Optional[float] = None):
+        """Sleep until notify() or the poll interval elapses"""
+        if self._doorbell is None:
+            self._loop = asyncio.get_running_loop()
+            self._doorbell = asyncio.Event()
+
+        try:
+            await asyncio.wait_for(self._doorbell.wait(), timeout=timeout or settings.TASK_QUEUE_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            self._doorbell.clear()
+
+    # ==================== Claiming ====================
+
+    def _claimable(self, exclude_types: List[TaskType], now: datetime) -> list:
+        """
+        Conditions a task must meet to be claimed
+
+        Shared by priority_heads() and _claim(), so aging only ever picks a
+        class that has a claimable task. Overdue tasks are left for
+        expire_overdue() and a retry isn't due before its next_retry_at.
+        """
+        claimable = [
+            Task.status == TaskStatus.PENDING,
+            or_(Task.deadline.is_(None), Task.deadline >= now),
+            or_(Task.next_retry_at.is_(None), Task.next_retry_at <= now),
+        ]
+        if exclude_types:
+            claimable.append(Task.task_type.notin_(exclude_types))
+        return claimable
+
+    def priority_heads(
+        self, db: Session, exclude_types: List[TaskType] = (), now: Optional[datetime] = None
+    ) -> List[Tuple[int, datetime]]:
+        """
+        Oldest claimable task per priority class
+
+        Walks the distinct priorities with a recursive CTE (a "loose index
+        scan" on ix_tasks_status_priority_created), so the cost is a few
+        index seeks per class however many tasks are queued.
+
+        Args:
+            db: Session
+            exclude_types: Task types not to consider
+            now: Current time, for the same deadline/retry filter as the claim
+
+        Returns:
+            (priority, created_at of its oldest claimable task) per class
+        """
+        query = self.priority_heads_statement(list(exclude_types), now or datetime.now())
+        return [(row.priority, row.oldest) for row in db.execute(query)]
+
+    def priority_heads_statement(self, exclude_types: List[TaskType], now: datetime) -> Select:
+        """The recursive-CTE SELECT behind priority_heads()"""
+        claimable = self._claimable(exclude_types, now)
+
+        classes = (
+            select(func.min(Task.priority).label("priority"))
+            .where(*claimable)
+            .cte("classes", recursive=True)
+        )
+        next_class = select(func.min(Task.priority)).where(*claimable, Task.priority > classes.c.priority)
+        classes = classes.union_all(
+            select(next_class.scalar_subquery()).where(classes.c.priority.isnot(None))
+        )
+        oldest = select(func.min(Task.created_at)).where(*claimable, Task.priority == classes.c.priority)
+
+        return select(
+            classes.c.priority,
+            oldest.scalar_subquery().label("oldest")
+        ).where(classes.c.priority.isnot(None))
+
+    def pick_priority(self, heads: List[Tuple[int, datetime]], now: datetime) -> Optional[int]:
+        """
+        Priority class to dispatch from next, with aging
+
+        A class's head counts one priority level more urgent for every
+        TASK_PRIORITY_AGING_SECONDS it has waited, so low-priority work is
+        delayed by a steady stream of urgent tasks but never starved. Ties
+        go to the older head.
+        """
+        if not heads:
+            return None
+
+        aging = settings.TASK_PRIORITY_AGING_SECONDS
+
+        def effective(head: Tuple[int, datetime]):
+            priority, oldest = head
+            waited = max((now - oldest).total_seconds(), 0) if oldest else 0
+            return (priority - waited / aging if aging > 0 else priority, oldest or now)
+
+        return min(heads, key=effective)[0]
+
+    def claim_sync(self, exclude_types: Iterable[TaskType] = (), now: Optional[datetime] = None) -> Optional[Task]:
+        """
+        Atomically claim the next pending task
+
+        The priority class comes from pick_priority() (priority with
+        aging); within a class tasks are claimed earliest deadline first,
+        then oldest first (see _claim()). If another
+        worker empties the class in between, the most urgent pending task
+        is claimed instead.
+
+        Args:
+            exclude_types: Task types not to claim (e.g. ones at their
+                concurrency limit)
+            now: Current time (for aging)
+
+        Returns:
+            The claimed Task (detached), or None if nothing is pending
+        """
+        now = now or datetime.now()
+        exclude_types = list(exclude_types)
+
+        db = SessionLocal()
+        try:
+            priority = None
+            if settings.TASK_PRIORITY_AGING_SECONDS > 0:
+                priority = self.pick_priority(self.priority_heads(db, exclude_types, now), now)
+                if priority is None:
+                    db.rollback()
+                    return None  # Nothing pending
+
+            task = self._claim(db, exclude_types, priority, now)
+            if task is None and priority is not None:
+                task = self._claim(db, exclude_types, None, now)
+            if task is not None:
+                db.expunge(task)  # Keep the RETURNING values (commit would expire them)
+            db.commit()
+            return task
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _claim(self, db: Session, exclude_types: List[TaskType], priority: Optional[int], now: datetime) -> Optional[Task]:
+        """Claim the next pending task of a priority class (see claim_statement())"""
+        return db.scalars(self.claim_statement(exclude_types, priority, now)).first()
+
+    def claim_statement(self, exclude_types: List[TaskType], priority: Optional[int], now: datetime) -> Update:
+        """
+        Single-statement claim of the next pending task of a priority class
+
+        Within the class (the given one, else the most urgent) the earliest
+        deadline goes first; tasks without a deadline follow, oldest first.
+        Both candidates are single seeks on ix_tasks_status_priority_deadline
+        (tasks without a deadline are its deadline IS NULL range, in
+        created_at order), where one ORDER BY deadline NULLS LAST couldn't
+        use an index on SQLite. See _claimable() for
+        which tasks qualify.
+        """
+        claimable = self._claimable(exclude_types, now)
+        if priority is None:
+            priority = select(func.min(Task.priority)).where(*claimable).scalar_subquery()
+
+        candidates = select(Task.id).where(*claimable, Task.priority == priority)
+        earliest_deadline = (
+            candidates
+            .where(Task.deadline.isnot(None))
+            .order_by(Task.deadline.asc(), Task.created_at.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)  # Not rendered on SQLite
+            .scalar_subquery()
+        )
+        oldest = (
+            candidates
+            .where(Task.deadline.is_(None))
+            .order_by(Task.created_at.asc())
+            .limit(1)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        next_pending = func.coalesce(earliest_deadline, oldest)
+
+        return (
+            update(Task)
+            .where(Task.id == next_pending, Task.status == TaskStatus.PENDING)
+            .values(
+                status=TaskStatus.IN_PROGRESS,
+                lease_owner=self.worker_id,
+                started_at=now,
+                heartbeat_at=now,
+                dedup_key=None
+            )
+            .returning(Task)
+            .execution_options(synchronize_session=False)
+        )
+
+    async def claim(self, exclude_types: Iterable[TaskType] = ()) -> Optional[Task]:
+        """Async claim_sync()"""
+        return await self._db(self.claim_sync, list(exclude_types))
+
+    def release_sync(self, task_ids: List[int]) -> int:
+        """
+        Hand tasks this worker still holds back to the queue (e.g. on shutdown)
+
+        Returns:
+            Number of tasks put back to PENDING
+        """
+        if not task_ids:
+            return 0
+
+        db = SessionLocal()
+        try:
+            released = db.execute(
+                update(Task)
+                .where(
+                    Task.id.in_(task_ids),
+                    Task.lease_owner == self.worker_id,
+                    Task.status == TaskStatus.IN_PROGRESS
+                )
+                .values(status=TaskStatus.PENDING, started_at=None, heartbeat_at=None, lease_owner=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+            return released
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def release(self, task_ids: List[int]) -> int:
+        """Async release_sync()"""
+        return await self._db(self.release_sync, task_ids)
+
+    # ==================== Leases ====================
+
+    def heartbeat_sync(self, task_id: int) -> bool:
+        """
+        Extend this worker's lease on a task
+
+        Returns:
+            False if the lease is gone (recovered by another worker, or the
+            task was cancelled)
+        """
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                update(Task)
+                .where(
+                    Task.id == task_id,
+                    Task.lease_owner == self.worker_id,
+                    Task.status == TaskStatus.IN_PROGRESS
+                )
+                .values(heartbeat_at=datetime.now())
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            return result.rowcount > 0
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def keep_alive(self, task_id: int, on_lost: Optional[Callable[[], object]] = None):
+        """
+        Heartbeat a task until cancelled (run as a background task while it is processed)
+
+        Args:
+            task_id: Task being processed
+            on_lost: Called once if the lease is lost, to stop the work
+                (e.g. the agent coroutine's Task.cancel); another worker may
+                already be running the task
+        """
+        interval = max(settings.TASK_HEARTBEAT_SECONDS, 1)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if not await self._db(self.heartbeat_sync, task_id):
+                    print(f"⚠️ Lost lease on task #{task_id}")
+                    if on_lost is not None:
+                        on_lost()
+                    return
+            except Exception as e:
+                print(f"❌ Heartbeat failed for task #{task_id}: {e}")
+
+    def recover_sync(self, now: Optional[datetime] = None) -> int:
+        """
+        Re-queue IN_PROGRESS tasks whose lease has expired
+
+        Tasks out of retries are dead-lettered instead, failing the workflow
+        they are a step of (see tasks/workflow.py). Rows claimed before
+        leases existed have no heartbeat; their started_at is used.
+
+        Returns:
+            Number of tasks recovered (re-queued or dead-lettered)
+        """
+        now = now or datetime.now()
+        expired = (
+            Task.status == TaskStatus.IN_PROGRESS,
+            func.coalesce(Task.heartbeat_at, Task.started_at, Task.created_at)
+            < now - timedelta(seconds=settings.TASK_LEASE_SECONDS)
+        )
+
+        db = SessionLocal()
+        try:
+            dead = db.query(Task).filter(
+                *expired, Task.retry_count >= Task.max_retries
+            ).with_for_update(skip_locked=True).all()
+
+            changes = []
+            for task in dead:
+                task.status = TaskStatus.DEAD_LETTER
+                task.error_message = "Lease expired: worker stopped responding"
+                task.completed_at = now
+                task.lease_owner = None
+                changes.append((task.id, TaskStatus.DEAD_LETTER, task.task_type, task.error_message))
+            for task in dead:
+                changes.extend(
+                    (changed_id, status, None, None)
+                    for changed_id, status in workflow_engine.on_task_finished(db, task)
+                )
+            failed = len(dead)
+            db.flush()
+
+            requeued = db.execute(
+                update(Task)
+                .where(*expired)
+                .values(
+                    status=TaskStatus.PENDING,
+                    retry_count=Task.retry_count + 1,
+                    started_at=None,
+                    heartbeat_at=None,
+                    lease_owner=None
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for task_id, status, task_type, error_message in changes:
+            task_events.publish(task_id, status, task_type, error_message=error_message)
+        if failed or requeued:
+            print(f"♻️ Recovered abandoned tasks: {requeued} re-queued, {failed} dead-lettered")
+        if requeued:
+            self.notify()
+        return failed + requeued
+
+    async def recover(self) -> int:
+        """Async recover_sync()"""
+        return await self._db(self.recover_sync)
+
+    # ==================== Retries ====================
+
+    def requeue_due_sync(self, now: Optional[datetime] = None) -> int:
+        """
+        Move FAILED tasks whose retry time has come back to PENDING
+
+        Returns:
+            Number of tasks re-queued
+        """
+        now = now or datetime.now()
+        db = SessionLocal()
+        try:
+            requeued = db.execute(
+                update(Task)
+                .where(Task.status == TaskStatus.FAILED, Task.next_retry_at <= now)
+                .values(
+                    status=TaskStatus.PENDING,
+                    retry_count=Task.retry_count + 1,
+                    next_retry_at=None,
+                    error_message=None,
+                    started_at=None,
+                    completed_at=None,
+                    heartbeat_at=None,
+                    lease_owner=None
+                )
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        if requeued:
+            print(f"🔄 Re-queued {requeued} failed task(s) for retry")
+            self.notify()
+        return requeued
+
+    async def requeue_due(self) -> int:
+        """Async requeue_due_sync()"""
+        return await self._db(self.requeue_due_sync)
+
+    # ==================== Deadlines ====================
+
+    def expire_overdue_sync(self, now: Optional[datetime] = None, limit: int = 500) -> int:
+        """
+        Move PENDING tasks whose deadline has passed to EXPIRED
+
+        Workflows an expired step belongs to fail (see tasks/workflow.py).
+
+        Args:
+            now: Current time
+            limit: Most tasks expired per call
+
+        Returns:
+            Number of tasks expired
+        """
+        now = now or datetime.now()
+        db = SessionLocal()
+        try:
+            overdue = db.query(Task).filter(
+                Task.status == TaskStatus.PENDING,
+                Task.deadline < now
+            ).order_by(Task.deadline).limit(limit).with_for_update(skip_locked=True).all()
+
+            changes = []
+            for task in overdue:
+                task.status = TaskStatus.EXPIRED
+                task.error_message = f"Deadline {task.deadline.isoformat()} passed before the task started"
+                task.completed_at = now
+                task.dedup_key = None
+                changes.append((task.id, TaskStatus.EXPIRED, task.task_type, task.error_message))
+            for task in overdue:
+                changes.extend(
+                    (changed_id, status, None, None)
+                    for changed_id, status in workflow_engine.on_task_finished(db, task)
+                )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        for task_id, status, task_type, error_message in changes:
+            task_events.publish(task_id, status, task_type, error_message=error_message)
+        if overdue:
+            print(f"⌛ Expired {len(overdue)} overdue pending task(s)")
+        return len(overdue)
+
+    async def expire_overdue(self) -> int:
+        """Async expire_overdue_sync()"""
+        return await self._db(self.expire_overdue_sync)
+
+
+# Global instance (one worker identity per process)
+task_queue = TaskQueue()
+
+
+def get_task_queue() -> TaskQueue:
+    """Get the global task queue instance"""
+    return task_queue
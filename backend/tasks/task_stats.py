@@ -0,0 +1,219 @@
+# backend/tasks/task_stats.py
+"""
+Task Statistics
+
+Status counts come from one GROUP BY over the tasks table. Processing
+times (completed_at - started_at) are aggregated per task type and agent
+for tasks completed in the last TASK_STATS_WINDOW_HOURS, on the
+(status, completed_at) index, without loading rows into Python:
+
+- PostgreSQL: exact p50/p95/p99 with percentile_cont.
+- SQLite (no percentile functions): the database buckets durations into
+  a geometric histogram (~19% wide buckets) and percentiles are
+  interpolated from the bucket counts.
+
+The result is cached for TASK_STATS_CACHE_SECONDS, so dashboards polling
+it don't rescan a large table on every refresh.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, func, literal_column
+from sqlalchemy.orm import Session
+
+from core.config import settings
+from database.database import is_sqlite
+from database.models import Task, TaskStatus
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+# Histogram bucket upper bounds in seconds: 10 ms to ~12 h, ratio 1.19
+HISTOGRAM_BOUNDS: List[float] = [0.01 * (1.19 ** i) for i in range(89)]
+
+
+def _percentile_from_histogram(counts: Dict[int, int], q: float) -> float:
+    """Linear interpolation inside the bucket holding the q-th duration"""
+    total = sum(counts.values())
+    target = q * total
+    seen = 0
+    for bucket in sorted(counts):
+        count = counts[bucket]
+        if seen + count >= target:
+            lower = HISTOGRAM_BOUNDS[bucket - 1] if bucket > 0 else 0.0
+            upper = HISTOGRAM_BOUNDS[bucket] if bucket < len(HISTOGRAM_BOUNDS) else HISTOGRAM_BOUNDS[-1]
+            fraction = (target - seen) / count if count else 0.0
+            return lower + (upper - lower) * fraction
+        seen += count
+    return HISTOGRAM_BOUNDS[-1]
+
+
+def _bucket_index(seconds, low: int, high: int):
+    """
+    SQL for the histogram bucket of a duration: the first index in
+    [low, high) whose bound exceeds it, else high
+
+    Nested as a binary search, so each row is compared ~7 times rather
+    than against every bound.
+    """
+    if low >= high:
+        return literal_column(str(high))
+    middle = (low + high) // 2
+    return case(
+        (seconds < HISTOGRAM_BOUNDS[middle], _bucket_index(seconds, low, middle)),
+        else_=_bucket_index(seconds, middle + 1, high)
+    )
+
+
+class TaskStatsCollector:
+    """Aggregate task statistics with a short-lived cache"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cached: Optional[Dict[str, Any]] = None
+        self._cached_until = 0.0
+
+    def get(self, db: Session, refresh: bool = False) -> Dict[str, Any]:
+        """
+        Task statistics, from the cache when fresh
+
+        Args:
+            db: Database session
+            refresh: Recompute even if the cached result is fresh
+        """
+        with self._lock:
+            if not refresh and self._cached is not None and time.monotonic() < self._cached_until:
+                return self._cached
+
+        stats = self.compute(db)
+        with self._lock:
+            self._cached = stats
+            self._cached_until = time.monotonic() + settings.TASK_STATS_CACHE_SECONDS
+        return stats
+
+    def invalidate(self):
+        """Drop the cached result"""
+        with self._lock:
+            self._cached = None
+
+    # ==================== Queries ====================
+
+    def compute(self, db: Session, now: Optional[datetime] = None) -> Dict[str, Any]:
+        """Run the aggregate queries"""
+        now = now or datetime.now()
+        by_status = {
+            status.value: count
+            for status, count in db.query(Task.status, func.count(Task.id)).group_by(Task.status).all()
+            if status is not None
+        }
+
+        since = now - timedelta(hours=settings.TASK_STATS_WINDOW_HOURS)
+        durations = self._durations_postgresql(db, since) if not is_sqlite else self._durations_sqlite(db, since)
+
+        completed_in_window = sum(row["count"] for row in durations)
+        avg_completion = (
+            sum(row["avg_seconds"] * row["count"] for row in durations) / completed_in_window
+            if completed_in_window else 0
+        )
+
+        pending = by_status.get(TaskStatus.PENDING.value, 0)
+        return {
+            'total': sum(by_status.values()),
+            'pending': pending,
+            'in_progress': by_status.get(TaskStatus.IN_PROGRESS.value, 0),
+            'completed': by_status.get(TaskStatus.COMPLETED.value, 0),
+            'failed': by_status.get(TaskStatus.FAILED.value, 0),  # Awaiting automatic retry
+            'dead_letter': by_status.get(TaskStatus.DEAD_LETTER.value, 0),
+            'cancelled': by_status.get(TaskStatus.CANCELLED.value, 0),
+            'expired': by_status.get(TaskStatus.EXPIRED.value, 0),
+            'by_status': by_status,
+            'avg_completion_seconds': round(avg_completion, 2),
+            'queue_size': pending,
+            'durations': durations,
+            'window_hours': settings.TASK_STATS_WINDOW_HOURS,
+            'generated_at': now.isoformat(),
+        }
+
+    def _completed_since(self, query, since: datetime):
+        return query.filter(
+            Task.status == TaskStatus.COMPLETED,
+            Task.completed_at >= since,
+            Task.started_at.isnot(None)
+        )
+
+    def _durations_postgresql(self, db: Session, since: datetime) -> List[Dict[str, Any]]:
+        """Exact percentiles per (task type, agent) with percentile_cont"""
+        seconds = func.extract("epoch", Task.completed_at - Task.started_at)
+        percentiles = [
+            func.percentile_cont(q).within_group(seconds).label(f"p{int(q * 100)}")
+            for q in PERCENTILES
+        ]
+        query = self._completed_since(
+            db.query(
+                Task.task_type,
+                Task.assigned_agent,
+                func.count(Task.id).label("count"),
+                func.avg(seconds).label("avg_seconds"),
+                *percentiles
+            ),
+            since
+        ).group_by(Task.task_type, Task.assigned_agent)
+
+        return [
+            {
+                "task_type": row.task_type.value,
+                "agent": row.assigned_agent,
+                "count": row.count,
+                "avg_seconds": round(float(row.avg_seconds or 0), 3),
+                **{f"p{int(q * 100)}": round(float(getattr(row, f"p{int(q * 100)}") or 0), 3) for q in PERCENTILES},
+            }
+            for row in query.all()
+        ]
+
+    def _durations_sqlite(self, db: Session, since: datetime) -> List[Dict[str, Any]]:
+        """Histogram per (task type, agent), percentiles interpolated from it"""
+        seconds = (func.julianday(Task.completed_at) - func.julianday(Task.started_at)) * 86400.0
+        bucket = _bucket_index(seconds, 0, len(HISTOGRAM_BOUNDS)).label("bucket")
+
+        query = self._completed_since(
+            db.query(
+                Task.task_type,
+                Task.assigned_agent,
+                bucket,
+                func.count(Task.id).label("count"),
+                func.sum(seconds).label("total_seconds")
+            ),
+            since
+        ).group_by(Task.task_type, Task.assigned_agent, bucket)
+
+        groups: Dict[Tuple[Any, Optional[str]], Dict[str, Any]] = {}
+        for row in query.all():
+            group = groups.setdefault((row.task_type, row.assigned_agent), {"buckets": {}, "count": 0, "total": 0.0})
+            group["buckets"][row.bucket] = row.count
+            group["count"] += row.count
+            group["total"] += float(row.total_seconds or 0)
+
+        return [
+            {
+                "task_type": task_type.value,
+                "agent": agent,
+                "count": group["count"],
+                "avg_seconds": round(group["total"] / group["count"], 3),
+                **{
+                    f"p{int(q * 100)}": round(_percentile_from_histogram(group["buckets"], q), 3)
+                    for q in PERCENTILES
+                },
+            }
+            for (task_type, agent), group in groups.items()
+        ]
+
+
+# Global instance
+task_stats = TaskStatsCollector()
+
+
+def get_task_stats_collector() -> TaskStatsCollector:
+    """Get the global task statistics collector"""
+    return task_stats
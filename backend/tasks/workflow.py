@@ -0,0 +1,290 @@
+# backend/tasks/workflow.py
+"""
+Task Workflows
+
+An agent can split a task into a DAG of subtasks (BaseAgent.start_workflow):
+
+- Every step becomes a child task (parent_task_id = the parent). Steps
+  without dependencies are queued (PENDING) straight away, so independent
+  branches run concurrently on the worker pool; the others wait in
+  WAITING_INPUT. The DAG is stored in the tasks' extra_data:
+      child:  {"workflow": {"parent": 12, "step": "fetch", "depends_on": [13]}}
+      parent: {"workflow": {"steps": {"fetch": 13, ...}, "state": "running"}}
+- The parent waits in WAITING_INPUT. Each time a step finishes (in the
+  same transaction as its final status), waiting steps whose dependencies
+  have all completed are queued. When every step has completed the parent
+  is queued again; its agent reads the step outputs with
+  BaseAgent.get_workflow_results() and finishes.
+- If a step is dead-lettered, cancelled or expired the workflow fails: the parent is
+  dead-lettered and steps still waiting are cancelled.
+- Only the steps listed in the parent's state take part. When a parent is
+  replayed and starts a new workflow, steps left over from the earlier run
+  (and plain subtasks) are ignored.
+
+Step completions lock the parent row, so siblings finishing at the same
+time don't both miss releasing a shared dependent.
+"""
+
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy.orm import Session
+
+from database.models import Task, TaskStatus, TaskType
+
+# Step outcomes that fail the whole workflow
+FAILED_STEP_STATUSES = (TaskStatus.DEAD_LETTER, TaskStatus.CANCELLED, TaskStatus.EXPIRED)
+
+
+@dataclass
+class WorkflowStep:
+    """One node of a workflow DAG"""
+    name: str
+    task_type: TaskType
+    input_data: Dict[str, Any] = field(default_factory=dict)
+    depends_on: Sequence[str] = ()
+    priority: Optional[int] = None  # Default: the parent's priority
+
+
+def _load(extra_data: Optional[str]) -> Dict[str, Any]:
+    try:
+        return json.loads(extra_data) if extra_data else {}
+    except (TypeError, ValueError):
+        return {}
+
+
+def workflow_of(task: Task) -> Optional[Dict[str, Any]]:
+    """The task's workflow state from extra_data, if it is part of one"""
+    return _load(task.extra_data).get("workflow")
+
+
+def _set_workflow(task: Task, state: Dict[str, Any]):
+    extra = _load(task.extra_data)
+    extra["workflow"] = state
+    task.extra_data = json.dumps(extra)
+
+
+class WorkflowEngine:
+    """Creates workflow DAGs and advances them as steps finish"""
+
+    def start(self, db: Session, parent: Task, steps: List[WorkflowStep]) -> Dict[str, int]:
+        """
+        Create the step tasks of a workflow (flushed; the caller commits)
+
+        Args:
+            db: Session the parent's result is committed in
+            parent: Task that owns the workflow (set to WAITING_INPUT by the caller)
+            steps: DAG nodes; dependencies must name other steps
+
+        Returns:
+            Step name -> task ID
+
+        Raises:
+            ValueError: On an empty workflow (the parent would wait forever),
+                duplicate names, unknown dependencies or a cycle; checked
+                before anything is inserted
+        """
+        if not steps:
+            raise ValueError("A workflow needs at least one step")
+        ordered = self._topological_order(steps)
+
+        ids: Dict[str, int] = {}
+        for step in ordered:
+            child = Task(
+                task_type=step.task_type,
+                status=TaskStatus.WAITING_INPUT if step.depends_on else TaskStatus.PENDING,
+                priority=step.priority if step.priority is not None else parent.priority,
+                chat_id=parent.chat_id,
+                message_id=parent.message_id,
+                input_data=json.dumps(step.input_data),
+                parent_task_id=parent.id,
+                step_number=len(ids) + 1,
+                total_steps=len(ordered),
+                extra_data=json.dumps({"workflow": {
+                    "parent": parent.id,
+                    "step": step.name,
+                    "depends_on": [ids[name] for name in step.depends_on],
+                }})
+            )
+            db.add(child)
+            db.flush()
+            ids[step.name] = child.id
+
+        # Keep "parent"/"step" if this task is itself a step of another workflow
+        _set_workflow(parent, {**(workflow_of(parent) or {}), "steps": ids, "state": "running"})
+        return ids
+
+    def _topological_order(self, steps: List[WorkflowStep]) -> List[WorkflowStep]:
+        by_name = {}
+        for step in steps:
+            if step.name in by_name:
+                raise ValueError(f"Duplicate workflow step: {step.name}")
+            by_name[step.name] = step
+        for step in steps:
+            for dependency in step.depends_on:
+                if dependency not in by_name:
+                    raise ValueError(f"Step {step.name} depends on unknown step {dependency}")
+
+        ordered: List[WorkflowStep] = []
+        placed = set()
+        while len(ordered) < len(steps):
+            ready = [s for s in steps if s.name not in placed and all(d in placed for d in s.depends_on)]
+            if not ready:
+                raise ValueError("Workflow steps have a dependency cycle")
+            for step in ready:
+                ordered.append(step)
+                placed.add(step.name)
+        return ordered
+
+    # ==================== Advancing ====================
+
+    def on_task_finished(self, db: Session, task: Task) -> List[Tuple[int, TaskStatus]]:
+        """
+        Advance the workflow a finished step belongs to (the caller commits)
+
+        Call with the step's final status set, before committing it. Tasks
+        outside a workflow, and steps that are only awaiting a retry, are
+        ignored.
+
+        Returns:
+            (task ID, new status) of every other task this changed
+        """
+        state = workflow_of(task)
+        if not state or "parent" not in state:
+            return []
+        if task.status != TaskStatus.COMPLETED and task.status not in FAILED_STEP_STATUSES:
+            return []
+
+        # Serializes sibling completions (no-op on SQLite, which has one writer)
+        parent = db.query(Task).filter(Task.id == state["parent"]).with_for_update().first()
+        if parent is None or parent.status != TaskStatus.WAITING_INPUT:
+            return []
+
+        # Only the parent's current steps count: children of an earlier run
+        # of the parent, or plain subtasks, don't hold the workflow up
+        parent_state = workflow_of(parent) or {}
+        step_ids = list(parent_state.get("steps", {}).values())
+        if task.id not in step_ids:
+            return []
+
+        db.flush()
+        siblings = db.query(Task).filter(Task.id.in_(step_ids)).all()
+        statuses = {sibling.id: sibling.status for sibling in siblings}
+        now = datetime.now()
+        changes: List[Tuple[int, TaskStatus]] = []
+
+        # Steps waiting on their dependencies (not on a workflow of their own)
+        blocked = [
+            sibling for sibling in siblings
+            if sibling.status == TaskStatus.WAITING_INPUT and "steps" not in (workflow_of(sibling) or {})
+        ]
+
+        if task.status in FAILED_STEP_STATUSES:
+            for sibling in blocked:
+                sibling.status = TaskStatus.CANCELLED
+                sibling.error_message = f"Workflow step #{task.id} failed"
+                sibling.completed_at = now
+                changes.append((sibling.id, TaskStatus.CANCELLED))
+            parent.status = TaskStatus.DEAD_LETTER
+            parent.error_message = (
+                f"Workflow step '{state.get('step')}' (#{task.id}) {task.status.value}: {task.error_message}"
+            )
+            parent.completed_at = now
+            _set_workflow(parent, {**parent_state, "state": "failed"})
+            changes.append((parent.id, TaskStatus.DEAD_LETTER))
+            # A nested workflow fails the workflow its parent is a step of
+            return changes + self.on_task_finished(db, parent)
+
+        for sibling in blocked:
+            depends_on = (workflow_of(sibling) or {}).get("depends_on", [])
+            if all(statuses.get(dependency) == TaskStatus.COMPLETED for dependency in depends_on):
+                sibling.status = TaskStatus.PENDING
+                changes.append((sibling.id, TaskStatus.PENDING))
+
+        if all(status == TaskStatus.COMPLETED for status in statuses.values()):
+            # Resume the parent: its agent collects the step results
+            parent.status = TaskStatus.PENDING
+            parent.lease_owner = None
+            parent.heartbeat_at = None
+            _set_workflow(parent, {**parent_state, "state": "resumed"})
+            changes.append((parent.id, TaskStatus.PENDING))
+
+        return changes
+
+    # ==================== Reading ====================
+
+    def results(self, db: Session, parent: Task) -> Optional[Dict[str, Any]]:
+        """
+        Output of every step, by step name, once the workflow has completed
+
+        Returns:
+            None unless the task is being resumed after its workflow completed
+        """
+        state = workflow_of(parent)
+        if not state or state.get("state") != "resumed":
+            return None
+
+        names = {task_id: name for name, task_id in state["steps"].items()}
+        rows = db.query(Task.id, Task.output_data).filter(
+            Task.id.in_(list(names)), Task.status == TaskStatus.COMPLETED
+        ).all()
+        return {names[row.id]: _load(row.output_data) for row in rows}
+
+    def progress(self, db: Session, parent_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Status of a workflow and each of its steps
+
+        Returns:
+            None if the task doesn't exist or has no workflow
+        """
+        parent = db.query(Task).filter(Task.id == parent_id).first()
+        if parent is None:
+            return None
+        state = workflow_of(parent)
+        if not state or "steps" not in state:
+            return None
+
+        rows = db.query(
+            Task.id, Task.task_type, Task.status, Task.extra_data, Task.retry_count,
+            Task.error_message, Task.started_at, Task.completed_at
+        ).filter(Task.id.in_(list(state["steps"].values()))).order_by(Task.step_number).all()
+
+        steps = []
+        counts: Dict[str, int] = {}
+        for row in rows:
+            step = _load(row.extra_data).get("workflow", {})
+            counts[row.status.value] = counts.get(row.status.value, 0) + 1
+            steps.append({
+                "task_id": row.id,
+                "step": step.get("step"),
+                "type": row.task_type.value,
+                "status": row.status.value,
+                "depends_on": step.get("depends_on", []),
+                "retries": row.retry_count,
+                "error_message": row.error_message,
+                "started_at": row.started_at.isoformat() if row.started_at else None,
+                "completed_at": row.completed_at.isoformat() if row.completed_at else None,
+            })
+
+        completed = counts.get(TaskStatus.COMPLETED.value, 0)
+        return {
+            "task_id": parent.id,
+            "status": parent.status.value,
+            "state": state.get("state"),
+            "total_steps": len(steps),
+            "completed_steps": completed,
+            "percent": round(100 * completed / len(steps), 1) if steps else 100.0,
+            "by_status": counts,
+            "steps": steps,
+        }
+
+
+# Global instance
+workflow_engine = WorkflowEngine()
+
+
+def get_workflow_engine() -> WorkflowEngine:
+    """Get the global workflow engine"""
+    return workflow_engine
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Agent Commit Count Test
+
+Claims and processes tasks with a minimal agent that reads its context
+and logs an action, counting database commits and statements, once with
+step-by-step commits and once with AGENT_UNIT_OF_WORK. Checks that:
+1. Unit-of-work mode commits at most twice per task (claim + final commit)
+2. It commits less often than step-by-step mode
+3. Every task was completed and its 'completed' log entry was stored
+
+Commits made by the agent log sink's batch inserts are included.
+
+Usage:
+    python test_agent_commits.py                           # scratch SQLite file
+    DATABASE_URL=postgresql://... python test_agent_commits.py
+
+Never point this at a production database: it creates and deletes rows,
+and other pending tasks would be claimed by the test.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_commit_test.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from sqlalchemy import event
+
+from agents.base_agent import BaseAgent
+from core.config import settings
+from database.database import engine, Base, SessionLocal
+from database.models import AgentLog, Chat, Message, Task, TaskStatus, TaskType
+from services.agent_log import agent_log_sink
+from tasks.task_queue import TaskQueue
+
+TASKS = 50
+TEST_CHAT_ID = "commit_test_chat"
+
+counters = {"commits": 0, "statements": 0}
+
+
+@event.listens_for(engine, "commit")
+def _count_commit(conn):
+    counters["commits"] += 1
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    counters["statements"] += 1
+
+
+class ContextAgent(BaseAgent):
+    """Reads the task's chat and message, like the orchestrator does"""
+
+    def __init__(self):
+        super().__init__("Commit Test Agent")
+
+    @property
+    def agent_type(self) -> str:
+        return "commit_test"
+
+    async def can_handle(self, task: Task) -> bool:
+        return True
+
+    async def process(self, task: Task) -> Dict[str, Any]:
+        context = self.get_task_context(task)
+        self.log_action(task.id, 'analyzed', {'chars': len(context.get('message', {}).get('body', ''))})
+        return {'success': True, 'response': 'ok', 'data': {'chat': context.get('chat', {}).get('name')}}
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        task_ids = db.query(Task.id).filter(Task.chat_id == TEST_CHAT_ID)
+        db.query(AgentLog).filter(AgentLog.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.chat_id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.query(Message).filter(Message.chat_id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def setup():
+    cleanup()
+    db = SessionLocal()
+    try:
+        db.add(Chat(id=TEST_CHAT_ID, name="Commit test"))
+        db.flush()
+        for i in range(TASKS):
+            message = Message(
+                id=f"{TEST_CHAT_ID}_{i}", chat_id=TEST_CHAT_ID, body=f"Message {i}", timestamp=datetime.now()
+            )
+            db.add(message)
+            db.flush()
+            db.add(Task(
+                task_type=TaskType.TRIAGE,
+                status=TaskStatus.PENDING,
+                chat_id=TEST_CHAT_ID,
+                message_id=message.id
+            ))
+        db.commit()
+    finally:
+        db.close()
+
+
+async def run(unit_of_work: bool) -> Dict[str, Any]:
+    """Process every test task, returning commits and statements per task"""
+    setup()
+    settings.AGENT_UNIT_OF_WORK = unit_of_work
+    queue = TaskQueue(worker_id="commit-test")
+    agent = ContextAgent()
+
+    agent_log_sink.start()
+    counters.update(commits=0, statements=0)
+    processed = 0
+    while True:
+        task = queue.claim_sync()
+        if not task:
+            break
+        await agent.execute(task)
+        processed += 1
+    await agent_log_sink.stop()
+    commits, statements = counters["commits"], counters["statements"]
+
+    db = SessionLocal()
+    try:
+        completed = db.query(Task).filter(
+            Task.chat_id == TEST_CHAT_ID, Task.status == TaskStatus.COMPLETED
+        ).count()
+        task_ids = db.query(Task.id).filter(Task.chat_id == TEST_CHAT_ID)
+        logged = db.query(AgentLog).filter(
+            AgentLog.task_id.in_(task_ids), AgentLog.action == 'completed'
+        ).count()
+    finally:
+        db.close()
+
+    return {
+        "processed": processed,
+        "completed": completed,
+        "logged": logged,
+        "commits_per_task": commits / max(processed, 1),
+        "statements_per_task": statements / max(processed, 1),
+    }
+
+
+async def test_agent_commits():
+    """Compare both execution modes and verify the result"""
+
+    print("=" * 80)
+    print("AGENT COMMIT COUNT TEST")
+    print("=" * 80)
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+
+    Base.metadata.create_all(bind=engine)
+    original_mode = settings.AGENT_UNIT_OF_WORK
+
+    try:
+        step_by_step = await run(unit_of_work=False)
+        unit_of_work = await run(unit_of_work=True)
+    finally:
+        settings.AGENT_UNIT_OF_WORK = original_mode
+        cleanup()
+
+    for name, result in (("step-by-step", step_by_step), ("unit of work", unit_of_work)):
+        print(f"📋 {name:<13} {result['commits_per_task']:.2f} commits/task, "
+              f"{result['statements_per_task']:.1f} statements/task "
+              f"({result['completed']}/{TASKS} completed)")
+
+    checks = [
+        ("Unit of work: at most 2 commits per task (claim + final)", unit_of_work["commits_per_task"] <= 2),
+        ("Unit of work commits less than step-by-step",
+         unit_of_work["commits_per_task"] < step_by_step["commits_per_task"]),
+        ("Every task completed in both modes",
+         step_by_step["completed"] == TASKS and unit_of_work["completed"] == TASKS),
+        ("Every task's 'completed' entry was stored in both modes",
+         step_by_step["logged"] == TASKS and unit_of_work["logged"] == TASKS),
+    ]
+
+    print()
+    for description, ok in checks:
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print("=" * 80)
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(test_agent_commits())
+    engine.dispose()
+    if scratch_file:
+        scratch_file.unlink(missing_ok=True)
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Booking Concurrency Test
+
+Fires 200 booking requests at once for overlapping times and checks that:
+1. No two active appointments overlap afterwards
+2. Every request either succeeded or got a conflict (no errors)
+3. Every booking that succeeded was stored, and no requested time was
+   left free (a conflict always means an overlapping booking exists)
+
+Requests are 60-minute appointments starting every 15 minutes across one
+day, each time requested several times, so most of them overlap.
+
+Usage:
+    python test_booking_concurrency.py                           # scratch SQLite file
+    DATABASE_URL=postgresql://... python test_booking_concurrency.py
+
+Never point this at a production database: it creates and deletes rows.
+"""
+
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_booking_test.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from database.database import engine, Base, SessionLocal
+from database.models import Appointment, Chat
+from services.availability import BLOCKING_STATUSES
+from services.booking import booking_service, BookingConflictError
+
+REQUESTS = 200
+DURATION_MINUTES = 60
+SLOT_STEP_MINUTES = 15
+TEST_CHAT_PREFIX = "booking_test_"
+# A far-future day nothing else books
+DAY = datetime(2099, 1, 5, 8, 0)
+
+
+def request_time(i: int) -> datetime:
+    """Start time of request i: 15-minute steps over 10 hours, repeated"""
+    steps = (10 * 60) // SLOT_STEP_MINUTES
+    return DAY + timedelta(minutes=(i % steps) * SLOT_STEP_MINUTES)
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        db.query(Appointment).filter(Appointment.chat_id.like(f"{TEST_CHAT_PREFIX}%")).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id.like(f"{TEST_CHAT_PREFIX}%")).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def book(i: int) -> str:
+    """One booking attempt; returns "booked" or "conflict" """
+    try:
+        booking_service.book_sync(
+            chat_id=f"{TEST_CHAT_PREFIX}{i % 20}",
+            customer_name=f"Customer {i}",
+            title="Concurrency test",
+            appointment_date=request_time(i),
+            duration_minutes=DURATION_MINUTES
+        )
+        return "booked"
+    except BookingConflictError:
+        return "conflict"
+
+
+async def test_booking_concurrency():
+    """Run 200 bookings in parallel threads and verify the result"""
+
+    print("=" * 80)
+    print("BOOKING CONCURRENCY TEST")
+    print("=" * 80)
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+
+    Base.metadata.create_all(bind=engine)
+    cleanup()
+
+    # Each request in its own thread so they genuinely race
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(asyncio.to_thread(book, i) for i in range(REQUESTS)),
+        return_exceptions=True
+    )
+    elapsed = time.perf_counter() - started
+
+    errors = [r for r in results if isinstance(r, BaseException)]
+    booked = sum(1 for r in results if r == "booked")
+    conflicts = sum(1 for r in results if r == "conflict")
+
+    db = SessionLocal()
+    try:
+        rows = db.query(Appointment.id, Appointment.appointment_date, Appointment.duration_minutes).filter(
+            Appointment.chat_id.like(f"{TEST_CHAT_PREFIX}%"),
+            Appointment.status.in_(BLOCKING_STATUSES)
+        ).order_by(Appointment.appointment_date).all()
+    finally:
+        db.close()
+
+    overlaps = [
+        (a.id, b.id)
+        for a, b in zip(rows, rows[1:])
+        if a.appointment_date + timedelta(minutes=a.duration_minutes) > b.appointment_date
+    ]
+
+    # Nothing is cancelled, so every requested time must overlap a stored
+    # appointment: the schedule is full wherever it was asked for
+    def covered(start: datetime) -> bool:
+        end = start + timedelta(minutes=DURATION_MINUTES)
+        return any(
+            row.appointment_date < end and row.appointment_date + timedelta(minutes=row.duration_minutes) > start
+            for row in rows
+        )
+    uncovered = [i for i in range(REQUESTS) if not covered(request_time(i))]
+
+    print(f"⏱️  {REQUESTS} requests in {elapsed:.2f}s")
+    print(f"   booked: {booked}, conflicts: {conflicts}, errors: {len(errors)}")
+    for error in errors[:5]:
+        print(f"   ❌ {type(error).__name__}: {error}")
+
+    checks = [
+        ("no request failed with an error", not errors),
+        ("every request booked or conflicted", booked + conflicts == REQUESTS),
+        ("no overlapping active appointments", not overlaps),
+        (f"stored appointments match bookings ({len(rows)})", len(rows) == booked),
+        ("every requested time is taken by some booking", not uncovered),
+    ]
+
+    print()
+    for description, ok in checks:
+        print(f"{'✅' if ok else '❌'} {description}")
+    if overlaps:
+        print(f"   overlapping pairs: {overlaps[:10]}")
+
+    cleanup()
+    print("=" * 80)
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(test_booking_concurrency())
+    engine.dispose()
+    if scratch_file:
+        scratch_file.unlink(missing_ok=True)
+    sys.exit(0 if ok else 1)
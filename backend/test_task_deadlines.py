@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Task Deadline and Timeout Test
+
+Checks deadline-aware dispatch (tasks/task_queue.py) and execution
+timeouts (services/agent_service.py):
+1. Within a priority class tasks are claimed earliest deadline first, then
+   tasks without a deadline oldest first; a more urgent class still goes
+   first whatever the deadlines
+2. Overdue pending tasks are never claimed, don't count as their class's
+   head for aging, and are moved to EXPIRED
+3. A task whose agent hangs is cancelled after its timeout and marked
+   FAILED with a timeout reason, and the worker goes on to the next task
+
+Usage:
+    python test_task_deadlines.py                           # scratch SQLite file
+    DATABASE_URL=postgresql://... python test_task_deadlines.py
+
+Never point this at a production database: it creates and deletes rows,
+and other pending tasks would be claimed by the test.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_deadline_test.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from agents.base_agent import BaseAgent
+from core.config import settings
+from database.database import engine, Base, SessionLocal
+from database.models import AgentLog, Chat, Task, TaskPriority, TaskStatus, TaskType
+from services.agent_service import AgentService
+from tasks.task_queue import TaskQueue
+
+TEST_CHAT_ID = "deadline_test_chat"
+TIMEOUT_SECONDS = 1
+START = datetime(2099, 1, 5, 8, 0)
+
+
+class HangingAgent(BaseAgent):
+    """Never returns for tasks marked "hang" (like a stuck LLM call)"""
+
+    def __init__(self):
+        super().__init__("Deadline Test Agent")
+
+    @property
+    def agent_type(self) -> str:
+        return "deadline_test"
+
+    async def can_handle(self, task: Task) -> bool:
+        return True
+
+    async def process(self, task: Task) -> Dict[str, Any]:
+        if json.loads(task.input_data or "{}").get("hang"):
+            await asyncio.Event().wait()
+        return {'success': True, 'response': 'ok', 'data': {}}
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        task_ids = db.query(Task.id).filter(Task.chat_id == TEST_CHAT_ID)
+        db.query(AgentLog).filter(AgentLog.task_id.in_(task_ids)).delete(synchronize_session=False)
+        db.query(Task).filter(Task.chat_id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def setup():
+    cleanup()
+    db = SessionLocal()
+    try:
+        db.add(Chat(id=TEST_CHAT_ID, name="Deadline test"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def enqueue(label: str, priority: TaskPriority, created_at: datetime,
+            deadline: Optional[datetime] = None, **input_data) -> int:
+    db = SessionLocal()
+    try:
+        task = Task(
+            task_type=TaskType.TRIAGE,
+            status=TaskStatus.PENDING,
+            priority=priority.value,
+            chat_id=TEST_CHAT_ID,
+            input_data=json.dumps({"label": label, **input_data}),
+            created_at=created_at,
+            deadline=deadline,
+            max_retries=1
+        )
+        db.add(task)
+        db.commit()
+        return task.id
+    finally:
+        db.close()
+
+
+def load(task_id: int) -> Task:
+    db = SessionLocal()
+    try:
+        return db.query(Task).filter(Task.id == task_id).first()
+    finally:
+        db.close()
+
+
+def claim_order(queue: TaskQueue, now: datetime) -> List[str]:
+    order = []
+    while True:
+        task = queue.claim_sync(now=now)
+        if task is None:
+            return order
+        order.append(json.loads(task.input_data)["label"])
+
+
+def dispatch_order(queue: TaskQueue) -> List[str]:
+    """Claim order of one class with mixed deadlines, plus an URGENT task without one"""
+    setup()
+    # Created seconds apart, so aging doesn't lift NORMAL above URGENT
+    enqueue("no-deadline-old", TaskPriority.NORMAL, START - timedelta(seconds=30))
+    enqueue("deadline-late", TaskPriority.NORMAL, START - timedelta(seconds=20), START + timedelta(hours=3))
+    enqueue("no-deadline-new", TaskPriority.NORMAL, START - timedelta(seconds=10))
+    enqueue("deadline-soon", TaskPriority.NORMAL, START - timedelta(seconds=5), START + timedelta(minutes=15))
+    enqueue("urgent", TaskPriority.URGENT, START - timedelta(seconds=1))
+    enqueue("deadline-mid", TaskPriority.NORMAL, START - timedelta(seconds=1), START + timedelta(hours=1))
+    return claim_order(queue, START)
+
+
+def expiry(queue: TaskQueue) -> Dict[str, Any]:
+    """Overdue tasks are skipped by the claim and expired by the sweep"""
+    setup()
+    overdue = enqueue("overdue", TaskPriority.URGENT, START - timedelta(hours=1), START - timedelta(minutes=1))
+    enqueue("on-time", TaskPriority.NORMAL, START - timedelta(minutes=1), START + timedelta(minutes=5))
+    db = SessionLocal()
+    try:
+        heads = [priority for priority, _ in queue.priority_heads(db, now=START)]
+    finally:
+        db.close()
+    claimed = claim_order(queue, START)
+    expired = queue.expire_overdue_sync(now=START)
+    task = load(overdue)
+    return {"heads": heads, "claimed": claimed, "expired": expired, "status": task.status, "error": task.error_message}
+
+
+async def timeout(service: AgentService, queue: TaskQueue) -> Dict[str, Any]:
+    """One worker: a hanging task, then a normal one"""
+    setup()
+    now = datetime.now()
+    hanging = enqueue("hang", TaskPriority.HIGH, now - timedelta(seconds=2), hang=True)
+    normal = enqueue("normal", TaskPriority.NORMAL, now - timedelta(seconds=1))
+
+    started = time.monotonic()
+    pool = asyncio.create_task(service.start_processing(SimpleNamespace(task_queue=queue)))
+    while time.monotonic() - started < TIMEOUT_SECONDS + 10:
+        if load(normal).status == TaskStatus.COMPLETED:
+            break
+        await asyncio.sleep(0.1)
+    elapsed = time.monotonic() - started
+    stats = service.get_pool_stats()
+    await service.stop_processing(timeout=1)
+    await pool
+
+    hung, done = load(hanging), load(normal)
+    return {
+        "hung_status": hung.status,
+        "hung_error": hung.error_message,
+        "retry_scheduled": hung.next_retry_at is not None,
+        "normal_status": done.status,
+        "elapsed": elapsed,
+        "timed_out": sum(worker["timed_out"] for worker in stats["workers"]),
+    }
+
+
+async def test_task_deadlines():
+    """Run the deadline and timeout scenarios and verify the result"""
+
+    print("=" * 80)
+    print("TASK DEADLINE AND TIMEOUT TEST")
+    print("=" * 80)
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+
+    Base.metadata.create_all(bind=engine)
+    queue = TaskQueue(worker_id="deadline-test")
+    originals = (settings.TASK_TIMEOUT_SECONDS, settings.AGENT_WORKERS, settings.AGENT_UNIT_OF_WORK)
+
+    try:
+        order = dispatch_order(queue)
+        expired = expiry(queue)
+
+        settings.TASK_TIMEOUT_SECONDS = TIMEOUT_SECONDS
+        settings.AGENT_WORKERS = 1
+        settings.AGENT_UNIT_OF_WORK = True
+        service = AgentService()
+        service.agents = [HangingAgent()]
+        timed = await timeout(service, queue)
+    finally:
+        settings.TASK_TIMEOUT_SECONDS, settings.AGENT_WORKERS, settings.AGENT_UNIT_OF_WORK = originals
+        cleanup()
+
+    expected_order = ["urgent", "deadline-soon", "deadline-mid", "deadline-late", "no-deadline-old", "no-deadline-new"]
+    print(f"📋 Claim order: {' → '.join(order)}")
+    print(f"⌛ Overdue task: {expired['status'].value} ({expired['error']}); claimed {expired['claimed']}")
+    print(f"⏱️ Hanging task: {timed['hung_status'].value} ({timed['hung_error']}); "
+          f"next task {timed['normal_status'].value} after {timed['elapsed']:.1f}s")
+
+    checks = [
+        ("Earliest deadline first within a class, then oldest first", order == expected_order),
+        ("Overdue task is never claimed", expired["claimed"] == ["on-time"]),
+        ("Overdue task's class is not offered for dispatch", expired["heads"] == [TaskPriority.NORMAL.value]),
+        ("Overdue task is expired by the sweep",
+         expired["expired"] == 1 and expired["status"] == TaskStatus.EXPIRED),
+        ("Hanging task is failed with a timeout reason",
+         timed["hung_status"] == TaskStatus.FAILED and "Timed out" in (timed["hung_error"] or "")),
+        ("Timed-out task is scheduled for retry", timed["retry_scheduled"]),
+        ("The worker moves on to the next task", timed["normal_status"] == TaskStatus.COMPLETED),
+        ("Pool stats count the timeout", timed["timed_out"] == 1),
+    ]
+
+    print()
+    for description, ok in checks:
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print("=" * 80)
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(test_task_deadlines())
+    engine.dispose()
+    if scratch_file:
+        scratch_file.unlink(missing_ok=True)
+    sys.exit(0 if ok else 1)
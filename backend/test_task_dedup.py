@@ -0,0 +1,226 @@
+#!/usr/bin/env python3
+"""
+Task Coalescing Test
+
+Checks that recurring tasks created with a dedup_key
+(TaskManager.create_task) don't pile up behind a stalled worker:
+1. A worker claims the first MESSAGE_SYNC task and never finishes it.
+   A day of 30-minute scheduler ticks plus repeated manual /sync calls
+   then leave exactly one sync task queued behind it, carrying the latest
+   payload ("latest wins") and the most urgent priority requested
+2. Without a key the same ticks queue one task each (the old behavior)
+3. Putting the stalled task back in the queue doesn't clash with the
+   queued one, and later ticks still coalesce
+4. PostgreSQL only: concurrent creators with the same key end up with one
+   pending task
+
+Usage:
+    python test_task_dedup.py                           # scratch SQLite file
+    DATABASE_URL=postgresql://... python test_task_dedup.py
+
+Never point this at a production database: it creates and deletes rows,
+and other pending tasks would be claimed by the test.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_dedup_test.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from database.database import engine, Base, SessionLocal, is_sqlite
+from database.models import Chat, Task, TaskPriority, TaskStatus, TaskType
+from tasks.task_manager import TaskManager
+from tasks.task_queue import TaskQueue
+
+TEST_CHAT_ID = "dedup_test_chat"
+SYNC_KEY = f"message_sync:{TEST_CHAT_ID}"
+TICKS = 48  # One day of 30-minute auto-sync ticks
+MANUAL_SYNCS = 20
+CONCURRENT_CREATORS = 16
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.chat_id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def setup():
+    cleanup()
+    db = SessionLocal()
+    try:
+        db.add(Chat(id=TEST_CHAT_ID, name="Dedup test"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def sync_tasks(status: TaskStatus):
+    db = SessionLocal()
+    try:
+        return db.query(Task).filter(
+            Task.chat_id == TEST_CHAT_ID,
+            Task.task_type == TaskType.MESSAGE_SYNC,
+            Task.status == status
+        ).order_by(Task.id).all()
+    finally:
+        db.close()
+
+
+async def create_sync(manager: TaskManager, payload: dict, keyed: bool = True,
+                      priority: int = TaskPriority.NORMAL.value):
+    return await manager.create_task(
+        task_type=TaskType.MESSAGE_SYNC,
+        chat_id=TEST_CHAT_ID,
+        input_data=payload,
+        priority=priority,
+        dedup_key=SYNC_KEY if keyed else None,
+        replace_payload=keyed
+    )
+
+
+async def stalled_worker_backlog(manager: TaskManager, queue: TaskQueue) -> dict:
+    """Ticks and manual syncs while a claimed sync task never finishes"""
+    setup()
+    await create_sync(manager, {"tick": 0})
+    stalled = queue.claim_sync()
+
+    created = set()
+    for tick in range(1, TICKS + 1):
+        task = await create_sync(manager, {"tick": tick})
+        created.add(task.id)
+        if tick == TICKS // 2:
+            # One urgent manual request in the middle of the day
+            task = await create_sync(manager, {"tick": tick, "manual": True}, priority=TaskPriority.URGENT.value)
+            created.add(task.id)
+    for _ in range(MANUAL_SYNCS):
+        task = await create_sync(manager, {"tick": TICKS, "mode": "full"})
+        created.add(task.id)
+
+    pending = sync_tasks(TaskStatus.PENDING)
+    return {
+        "stalled_id": stalled.id if stalled else None,
+        "distinct_ids": len(created),
+        "pending": len(pending),
+        "in_progress": len(sync_tasks(TaskStatus.IN_PROGRESS)),
+        "payload": json.loads(pending[0].input_data) if pending else None,
+        "priority": pending[0].priority if pending else None,
+    }
+
+
+async def unkeyed_backlog(manager: TaskManager, queue: TaskQueue) -> int:
+    """The same ticks without a key"""
+    setup()
+    await create_sync(manager, {"tick": 0}, keyed=False)
+    queue.claim_sync()
+    for tick in range(1, TICKS + 1):
+        await create_sync(manager, {"tick": tick}, keyed=False)
+    return len(sync_tasks(TaskStatus.PENDING))
+
+
+async def release_stalled(manager: TaskManager, queue: TaskQueue, stalled_id: int) -> dict:
+    """Hand the stalled task back, then tick again"""
+    released = queue.release_sync([stalled_id])
+    after_release = len(sync_tasks(TaskStatus.PENDING))
+    task = await create_sync(manager, {"tick": TICKS + 1})
+    return {
+        "released": released,
+        "pending_after_release": after_release,
+        "pending_after_tick": len(sync_tasks(TaskStatus.PENDING)),
+        "tick_created": task is not None,
+    }
+
+
+def concurrent_creates() -> int:
+    """Creators racing on one key, each with its own session (PostgreSQL)"""
+    setup()
+
+    def create(i):
+        return asyncio.run(create_sync(TaskManager(), {"creator": i}))
+
+    with ThreadPoolExecutor(max_workers=CONCURRENT_CREATORS) as pool:
+        results = list(pool.map(create, range(CONCURRENT_CREATORS)))
+    if any(task is None for task in results):
+        return -1
+    return len(sync_tasks(TaskStatus.PENDING))
+
+
+async def test_task_dedup():
+    """Run the coalescing scenarios and verify the result"""
+
+    print("=" * 80)
+    print("TASK COALESCING TEST")
+    print("=" * 80)
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+
+    Base.metadata.create_all(bind=engine)
+    manager = TaskManager()
+    queue = TaskQueue(worker_id="dedup-test")
+
+    try:
+        keyed = await stalled_worker_backlog(manager, queue)
+        released = await release_stalled(manager, queue, keyed["stalled_id"])
+        unkeyed = await unkeyed_backlog(manager, queue)
+        concurrent = None if is_sqlite else concurrent_creates()
+    finally:
+        cleanup()
+
+    print(f"📋 Stalled worker, {TICKS} ticks + {MANUAL_SYNCS} manual syncs:")
+    print(f"   with key:    {keyed['pending']} pending, {keyed['in_progress']} running, "
+          f"{keyed['distinct_ids']} distinct task ID(s) returned")
+    print(f"   without key: {unkeyed} pending")
+    print(f"   queued payload: {keyed['payload']}, priority {keyed['priority']}")
+    print(f"🔓 Stalled task released: {released['pending_after_release']} pending, "
+          f"{released['pending_after_tick']} after the next tick")
+    if concurrent is None:
+        print("⏭️  Concurrent creators: skipped on SQLite (one writer)")
+    else:
+        print(f"🏁 {CONCURRENT_CREATORS} concurrent creators: {concurrent} pending")
+
+    checks = [
+        ("Stalled worker holds the first sync task", keyed["stalled_id"] is not None and keyed["in_progress"] == 1),
+        ("Backlog stays bounded: one sync task queued with a key", keyed["pending"] == 1),
+        ("Every keyed request returned the queued task", keyed["distinct_ids"] == 1),
+        ("Latest payload wins", keyed["payload"] == {"tick": TICKS, "mode": "full"}),
+        ("Coalescing keeps the most urgent priority", keyed["priority"] == TaskPriority.URGENT.value),
+        ("Without a key every tick queues a task", unkeyed == TICKS),
+        ("Released task and queued task coexist",
+         released["released"] == 1 and released["pending_after_release"] == 2),
+        ("Ticks after the release still coalesce",
+         released["tick_created"] and released["pending_after_tick"] == 2),
+    ]
+    if concurrent is not None:
+        checks.append(("Concurrent creators coalesce into one task", concurrent == 1))
+
+    print()
+    for description, ok in checks:
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print("=" * 80)
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(test_task_dedup())
+    engine.dispose()
+    if scratch_file:
+        scratch_file.unlink(missing_ok=True)
+    sys.exit(0 if ok else 1)
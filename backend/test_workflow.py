@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Task Workflow Test
+
+Drives workflow DAGs (tasks/workflow.py) through the engine the way the
+agents and the queue do, without running agents:
+1. Fan-out / fan-in: independent steps are claimable together, a step
+   depending on both is queued only once both completed, and the parent is
+   resumed with every step's output; a plain subtask doesn't hold it up
+2. A failed step fails the workflow: steps waiting on it are cancelled and
+   the parent is dead-lettered, also when the failure is a nested
+   workflow's or a lease that expired on a step out of retries
+3. Invalid workflows (no steps, or a dependency on an unknown step) are
+   rejected before any step is created
+4. Replay: a dead-lettered parent that is replayed starts a new workflow,
+   and the steps left over from its first run neither block nor fail it
+
+Usage:
+    python test_workflow.py                           # scratch SQLite file
+    DATABASE_URL=postgresql://... python test_workflow.py
+
+Never point this at a production database: it creates and deletes rows,
+and other pending tasks would be claimed by the test.
+"""
+
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+# Must be configured before the database module creates its engine
+scratch_file = None
+if not os.getenv("DATABASE_URL"):
+    scratch_file = Path(tempfile.gettempdir()) / "whatsapp_secretary_workflow_test.db"
+    if scratch_file.exists():
+        scratch_file.unlink()
+    os.environ["DATABASE_URL"] = f"sqlite:///{scratch_file}"
+
+from core.config import settings
+from database.database import engine, Base, SessionLocal
+from database.models import Chat, Task, TaskStatus, TaskType
+from tasks.task_manager import TaskManager
+from tasks.task_queue import TaskQueue
+from tasks.workflow import WorkflowStep, workflow_engine
+
+TEST_CHAT_ID = "workflow_test_chat"
+
+
+def cleanup():
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.chat_id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.query(Chat).filter(Chat.id == TEST_CHAT_ID).delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def setup():
+    cleanup()
+    db = SessionLocal()
+    try:
+        db.add(Chat(id=TEST_CHAT_ID, name="Workflow test"))
+        db.commit()
+    finally:
+        db.close()
+
+
+def new_task(status: TaskStatus = TaskStatus.IN_PROGRESS, parent_id: Optional[int] = None) -> int:
+    db = SessionLocal()
+    try:
+        task = Task(
+            task_type=TaskType.TRIAGE,
+            status=status,
+            chat_id=TEST_CHAT_ID,
+            parent_task_id=parent_id,
+            max_retries=0
+        )
+        db.add(task)
+        db.commit()
+        return task.id
+    finally:
+        db.close()
+
+
+def start(parent_id: int, steps: List[WorkflowStep]) -> Dict[str, int]:
+    """What BaseAgent.execute commits when the agent starts a workflow"""
+    db = SessionLocal()
+    try:
+        parent = db.query(Task).filter(Task.id == parent_id).first()
+        ids = workflow_engine.start(db, parent, steps)
+        parent.status = TaskStatus.WAITING_INPUT
+        db.commit()
+        return ids
+    finally:
+        db.close()
+
+
+def finish(task_id: int, status: TaskStatus, **output) -> None:
+    """What a worker commits when a task ends"""
+    db = SessionLocal()
+    try:
+        task = db.query(Task).filter(Task.id == task_id).first()
+        task.status = status
+        task.output_data = json.dumps(output)
+        task.completed_at = datetime.now()
+        if status != TaskStatus.COMPLETED:
+            task.error_message = "step failed"
+        workflow_engine.on_task_finished(db, task)
+        db.commit()
+    finally:
+        db.close()
+
+
+def statuses(**ids: int) -> Dict[str, TaskStatus]:
+    db = SessionLocal()
+    try:
+        rows = db.query(Task.id, Task.status).filter(Task.id.in_(list(ids.values()))).all()
+        by_id = {row.id: row.status for row in rows}
+        return {name: by_id[task_id] for name, task_id in ids.items()}
+    finally:
+        db.close()
+
+
+def results(parent_id: int) -> Optional[Dict[str, Any]]:
+    db = SessionLocal()
+    try:
+        parent = db.query(Task).filter(Task.id == parent_id).first()
+        return workflow_engine.results(db, parent)
+    finally:
+        db.close()
+
+
+def step(name: str, *depends_on: str) -> WorkflowStep:
+    return WorkflowStep(name=name, task_type=TaskType.TRIAGE, input_data={"step": name}, depends_on=depends_on)
+
+
+def invalid_workflows() -> Dict[str, Any]:
+    """An empty workflow and one with a dangling dependency"""
+    setup()
+    parent = new_task()
+    rejected = 0
+    for steps in ([], [step("fetch"), step("merge", "fetch", "missing")]):
+        try:
+            start(parent, steps)
+        except ValueError:
+            rejected += 1
+
+    db = SessionLocal()
+    try:
+        children = db.query(Task).filter(Task.parent_task_id == parent).count()
+    finally:
+        db.close()
+    return {"rejected": rejected, "children": children, **statuses(parent=parent)}
+
+
+def fan_out_fan_in(queue: TaskQueue) -> Dict[str, Any]:
+    """fetch_a and fetch_b in parallel, then merge"""
+    setup()
+    parent = new_task()
+    plain = new_task(TaskStatus.WAITING_INPUT, parent_id=parent)
+    ids = start(parent, [step("fetch_a"), step("fetch_b"), step("merge", "fetch_a", "fetch_b")])
+
+    claimed = set()
+    for _ in range(3):
+        task = queue.claim_sync()
+        if task is not None:
+            claimed.add(json.loads(task.input_data or "{}").get("step"))
+
+    finish(ids["fetch_a"], TaskStatus.COMPLETED, part="a")
+    after_one = statuses(**ids)["merge"]
+    finish(ids["fetch_b"], TaskStatus.COMPLETED, part="b")
+    after_both = statuses(**ids)["merge"]
+    finish(ids["merge"], TaskStatus.COMPLETED, merged="ab")
+
+    return {
+        "claimed": claimed,
+        "merge_after_one": after_one,
+        "merge_after_both": after_both,
+        "parent": statuses(parent=parent, plain=plain),
+        "results": results(parent),
+    }
+
+
+def failed_step() -> Dict[str, Any]:
+    """A dead-lettered step cancels its dependents and dead-letters the parent"""
+    setup()
+    parent = new_task()
+    ids = start(parent, [step("fetch"), step("other"), step("merge", "fetch", "other")])
+    finish(ids["fetch"], TaskStatus.DEAD_LETTER)
+    return statuses(parent=parent, **ids)
+
+
+def nested_failure() -> Dict[str, Any]:
+    """A step running a workflow of its own fails when that workflow does"""
+    setup()
+    parent = new_task()
+    ids = start(parent, [step("outer"), step("after", "outer")])
+    inner = start(ids["outer"], [step("inner")])
+    finish(inner["inner"], TaskStatus.DEAD_LETTER)
+    return statuses(parent=parent, **ids, **inner)
+
+
+def expired_lease(queue: TaskQueue) -> Dict[str, Any]:
+    """A step whose worker died, out of retries, is dead-lettered by recovery"""
+    setup()
+    parent = new_task()
+    ids = start(parent, [step("fetch"), step("merge", "fetch")])
+    db = SessionLocal()
+    try:
+        db.query(Task).filter(Task.id == ids["fetch"]).update({Task.retry_count: Task.max_retries})
+        db.commit()
+    finally:
+        db.close()
+    queue.claim_sync()
+    later = datetime.now() + timedelta(seconds=settings.TASK_LEASE_SECONDS + 60)
+    recovered = queue.recover_sync(now=later)
+    return {"recovered": recovered, **statuses(parent=parent, **ids)}
+
+
+async def replay(queue: TaskQueue) -> Dict[str, Any]:
+    """The parent's first workflow fails, it is replayed and starts a second one"""
+    setup()
+    manager = TaskManager()
+    parent = new_task()
+    first = start(parent, [step("fetch"), step("merge", "fetch")])
+    finish(first["fetch"], TaskStatus.DEAD_LETTER)
+
+    # Replay the parent (and the dead step, as a bulk replay would)
+    replayed = await manager.replay_dead_letters(task_ids=[parent, first["fetch"]])
+    claimed = queue.claim_sync()
+    second = start(claimed.id, [step("fetch"), step("merge", "fetch")])
+
+    # The old step failing again must not fail the new workflow...
+    finish(first["fetch"], TaskStatus.DEAD_LETTER)
+    after_old_failure = statuses(parent=parent)["parent"]
+
+    # ...and its cancelled step must not keep the parent waiting
+    finish(second["fetch"], TaskStatus.COMPLETED, part="new")
+    finish(second["merge"], TaskStatus.COMPLETED, merged="new")
+
+    return {
+        "replayed": sorted(replayed) == sorted([parent, first["fetch"]]),
+        "claimed_parent": claimed.id == parent,
+        "after_old_failure": after_old_failure,
+        "parent": statuses(parent=parent)["parent"],
+        "results": results(parent),
+    }
+
+
+async def test_workflow():
+    """Run the workflow scenarios and verify the result"""
+
+    print("=" * 80)
+    print("TASK WORKFLOW TEST")
+    print("=" * 80)
+    print(f"📍 Database: {str(engine.url).split('@')[-1]}")
+
+    Base.metadata.create_all(bind=engine)
+    queue = TaskQueue(worker_id="workflow-test")
+
+    try:
+        fan = fan_out_fan_in(queue)
+        failed = failed_step()
+        nested = nested_failure()
+        invalid = invalid_workflows()
+        lease = expired_lease(queue)
+        replayed = await replay(queue)
+    finally:
+        cleanup()
+
+    print(f"🔀 Claimed in parallel: {', '.join(sorted(fan['claimed']))}; "
+          f"merge {fan['merge_after_one'].value} → {fan['merge_after_both'].value}; "
+          f"parent {fan['parent']['parent'].value}")
+    print(f"💥 Failed step: {', '.join(f'{name} {status.value}' for name, status in failed.items())}")
+    print(f"🪆 Nested failure: {', '.join(f'{name} {status.value}' for name, status in nested.items())}")
+    print(f"🚫 Invalid workflows: {invalid['rejected']} rejected, {invalid['children']} step(s) created")
+    print(f"♻️ Expired lease: {lease['recovered']} recovered, parent {lease['parent'].value}")
+    print(f"🔄 Replay: parent {replayed['after_old_failure'].value} after the old step failed again, "
+          f"then {replayed['parent'].value}")
+
+    checks = [
+        ("Independent steps are claimed in parallel", fan["claimed"] == {"fetch_a", "fetch_b"}),
+        ("A dependent step waits for all of its dependencies",
+         fan["merge_after_one"] == TaskStatus.WAITING_INPUT and fan["merge_after_both"] == TaskStatus.PENDING),
+        ("The parent is resumed with every step's output",
+         fan["parent"]["parent"] == TaskStatus.PENDING
+         and fan["results"] == {"fetch_a": {"part": "a"}, "fetch_b": {"part": "b"}, "merge": {"merged": "ab"}}),
+        ("A plain subtask doesn't hold the workflow up", fan["parent"]["plain"] == TaskStatus.WAITING_INPUT),
+        ("A failed step dead-letters the parent and cancels its dependents",
+         failed["parent"] == TaskStatus.DEAD_LETTER and failed["merge"] == TaskStatus.CANCELLED
+         and failed["other"] == TaskStatus.PENDING),
+        ("A nested workflow's failure fails the outer workflow",
+         nested["outer"] == TaskStatus.DEAD_LETTER and nested["parent"] == TaskStatus.DEAD_LETTER
+         and nested["after"] == TaskStatus.CANCELLED),
+        ("Empty and dangling-dependency workflows are rejected without creating steps",
+         invalid["rejected"] == 2 and invalid["children"] == 0 and invalid["parent"] == TaskStatus.IN_PROGRESS),
+        ("A step dead-lettered by lease recovery fails the workflow",
+         lease["recovered"] == 1 and lease["fetch"] == TaskStatus.DEAD_LETTER
+         and lease["parent"] == TaskStatus.DEAD_LETTER and lease["merge"] == TaskStatus.CANCELLED),
+        ("The replayed parent starts a new workflow", replayed["replayed"] and replayed["claimed_parent"]),
+        ("A step from the earlier run doesn't fail the new workflow",
+         replayed["after_old_failure"] == TaskStatus.WAITING_INPUT),
+        ("The replayed workflow completes despite the earlier run's steps",
+         replayed["parent"] == TaskStatus.PENDING
+         and replayed["results"] == {"fetch": {"part": "new"}, "merge": {"merged": "new"}}),
+    ]
+
+    print()
+    for description, ok in checks:
+        print(f"{'✅' if ok else '❌'} {description}")
+
+    print("=" * 80)
+    return all(ok for _, ok in checks)
+
+
+if __name__ == "__main__":
+    ok = asyncio.run(test_workflow())
+    engine.dispose()
+    if scratch_file:
+        scratch_file.unlink(missing_ok=True)
+    sys.exit(0 if ok else 1)
@@ -24,7 +24,7 @@ class ConnectionManager:
     
     async def broadcast(self, message: dict):
         """Broadcast message to all active connections"""
-        for connection in self.active_connections:
+        for connection in list(self.active_connections):
             try:
                 await connection.send_json(message)
             except: